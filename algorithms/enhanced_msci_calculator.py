@@ -12,17 +12,86 @@ from datetime import datetime
 import logging
 
 # 导入原始MSCI计算函数
-from .msci_calculator import _calculate_daily_msci, _determine_market_state, _assess_risk_level, _calculate_msci_trend, _calculate_market_volatility, _calculate_volume_ratio, _get_insufficient_msci_data_result
+from .msci_calculator import _determine_market_state, _assess_risk_level, _calculate_msci_trend, _calculate_market_volatility, _calculate_volume_ratio, _get_insufficient_msci_data_result
+from .msci_calculator import _calculate_rating_histogram, _calculate_msci_from_histogram, _build_daily_msci_record
 
 logger = logging.getLogger(__name__)
 
+# 指数评级映射（线性映射：0级=12.5分，7级=100分）
+# 公式：分数 = 12.5 + 级别 × 12.5
+INDEX_RATING_SCORE_MAP = {
+    '大多': 100.0,  # 7级 = 12.5 + 7×12.5 = 100.0
+    '中多': 87.5,   # 6级 = 12.5 + 6×12.5 = 87.5
+    '小多': 75.0,   # 5级 = 12.5 + 5×12.5 = 75.0
+    '微多': 62.5,   # 4级 = 12.5 + 4×12.5 = 62.5
+    '微空': 50.0,   # 3级 = 12.5 + 3×12.5 = 50.0（中性）
+    '小空': 37.5,   # 2级 = 12.5 + 2×12.5 = 37.5
+    '中空': 25.0,   # 1级 = 12.5 + 1×12.5 = 25.0
+    '大空': 12.5,   # 0级 = 12.5 + 0×12.5 = 12.5
+    '-': None
+}
+
+
+def get_index_stock_mask(data: pd.DataFrame) -> np.ndarray:
+    """
+    指数行业行的布尔掩码（每个数据集只需计算一次）
+    
+    Args:
+        data: 股票数据
+        
+    Returns:
+        np.ndarray: 属于'指数'行业的行为True；没有'行业'列时全部为False
+    """
+    if '行业' not in data.columns:
+        return np.zeros(len(data), dtype=bool)
+    return data['行业'].str.contains('指数', na=False).to_numpy(dtype=bool)
+
+
+def calculate_index_rating_series(data: pd.DataFrame, date_columns: List[str],
+                                  index_mask: np.ndarray = None) -> tuple:
+    """
+    一次性计算所有日期的指数评级平均分（方案D最终版）
+    
+    对指数行的分数矩阵做一次掩码均值，结果与逐日调用
+    calculate_index_average_rating 一致。
+    
+    Args:
+        data: 股票数据（已插值）
+        date_columns: 日期列
+        index_mask: 预先计算的指数行掩码，为None时自动计算
+        
+    Returns:
+        (指数评级分数数组 (12.5-100，无效日期为50.0), 是否有效的布尔数组)
+    """
+    n_dates = len(date_columns)
+    if index_mask is None:
+        index_mask = get_index_stock_mask(data)
+    
+    if n_dates == 0 or not index_mask.any():
+        return np.full(n_dates, 50.0), np.zeros(n_dates, dtype=bool)
+    
+    # 评级 -> 分数矩阵（无效评级为NaN）
+    labels = [rating for rating, score in INDEX_RATING_SCORE_MAP.items() if score is not None]
+    score_lookup = np.append(np.array([INDEX_RATING_SCORE_MAP[r] for r in labels]), np.nan)
+    values = data.loc[index_mask, date_columns].to_numpy(dtype=object)
+    codes = pd.Index(labels).get_indexer(values.ravel()).reshape(values.shape)
+    scores = score_lookup[codes]  # -1 命中末尾的NaN
+    
+    valid_counts = np.sum(codes >= 0, axis=0)
+    valid = valid_counts > 0
+    with np.errstate(invalid='ignore'):
+        avg_score = np.nansum(scores, axis=0) / np.where(valid, valid_counts, 1)
+    
+    final_score = np.where(valid, np.clip(avg_score, 12.5, 100.0), 50.0)
+    return final_score, valid
+
 
 def calculate_index_average_rating(data: pd.DataFrame, date_col: str) -> tuple:
     """
     计算指数评级平均分（方案D最终版）
     
     注意：此函数应该在插值后的数据上调用，所以理论上不应该有'-'
-    但为了兼容性，仍然保留检查
+    但为了兼容性，仍然保留检查。批量计算请使用 calculate_index_rating_series。
     
     Args:
         data: 股票数据（已插值）
@@ -32,64 +101,20 @@ def calculate_index_average_rating(data: pd.DataFrame, date_col: str) -> tuple:
         (指数评级分数 (0-100), 是否有效)
     """
     try:
-        # 1. 筛选指数行业的股票
         if '行业' not in data.columns:
             logger.warning(f"[指数评级] 数据中没有'行业'列，使用默认中性值")
             return (50.0, False)
         
-        index_stocks = data[data['行业'].str.contains('指数', na=False)]
-        
-        if len(index_stocks) == 0:
-            logger.warning(f"[指数评级] 未找到指数行业数据，使用默认中性值")
-            return (50.0, False)
-        
-        # 2. 评级映射（线性映射：0级=12.5分，7级=100分）
-        # 公式：分数 = 12.5 + 级别 × 12.5
-        rating_map = {
-            '大多': 100.0,  # 7级 = 12.5 + 7×12.5 = 100.0
-            '中多': 87.5,   # 6级 = 12.5 + 6×12.5 = 87.5
-            '小多': 75.0,   # 5级 = 12.5 + 5×12.5 = 75.0
-            '微多': 62.5,   # 4级 = 12.5 + 4×12.5 = 62.5
-            '微空': 50.0,   # 3级 = 12.5 + 3×12.5 = 50.0（中性）
-            '小空': 37.5,   # 2级 = 12.5 + 2×12.5 = 37.5
-            '中空': 25.0,   # 1级 = 12.5 + 1×12.5 = 25.0
-            '大空': 12.5,   # 0级 = 12.5 + 0×12.5 = 12.5
-            '-': None
-        }
-        
-        # 3. 提取该日期的评级
         if date_col not in data.columns:
             logger.warning(f"[指数评级] 日期列{date_col}不存在")
             return (50.0, False)
         
-        ratings = index_stocks[date_col]
-        
-        # 4. 先检查是否所有指数评级都是'-'（插值失败的情况）
-        valid_ratings = [r for r in ratings if r in rating_map and rating_map[r] is not None]
-        if len(valid_ratings) == 0:
-            logger.warning(f"[指数评级] 日期{date_col}无有效评级数据（可能是数据初期）")
-            return (50.0, False)  # 返回False表示无有效评级
-        
-        # 5. 计算平均分数（直接使用分数平均，无需额外归一化）
-        total_score = 0
-        total_count = 0
-        
-        for rating in ratings:
-            if rating in rating_map and rating_map[rating] is not None:
-                total_score += rating_map[rating]  # 直接累加分数
-                total_count += 1
-        
-        if total_count == 0:
-            logger.warning(f"[指数评级] 日期{date_col}计算后仍无有效数据")
+        ratings, valid = calculate_index_rating_series(data, [date_col])
+        if not valid[0]:
+            logger.warning(f"[指数评级] 日期{date_col}无有效评级数据")
             return (50.0, False)
         
-        avg_score = total_score / total_count  # 已经是12.5-100范围
-        
-        # 6. 确保在有效范围内
-        final_score = max(12.5, min(avg_score, 100.0))
-        
-        logger.debug(f"[指数评级] 日期{date_col}: 平均分数={avg_score:.2f}, 最终分数={final_score:.2f}")
-        return (round(final_score, 2), True)  # 返回True表示有有效评级
+        return (round(float(ratings[0]), 2), True)  # 返回True表示有有效评级
         
     except Exception as e:
         logger.error(f"[指数评级] 计算失败: {e}")
@@ -123,9 +148,74 @@ def calculate_enhanced_msci(original_msci: float, index_rating: float) -> float:
     return round(enhanced, 2)
 
 
+def calculate_enhanced_msci_series(original_msci: np.ndarray, index_rating: np.ndarray) -> np.ndarray:
+    """
+    批量计算改进的MSCI，口径与 calculate_enhanced_msci 一致（未做四舍五入）
+    
+    Args:
+        original_msci: 原始MSCI数组
+        index_rating: 指数评级分数数组
+        
+    Returns:
+        np.ndarray: 改进的MSCI数组
+    """
+    base_enhanced = np.asarray(original_msci, dtype=np.float64) * 0.2 + np.asarray(index_rating, dtype=np.float64) * 0.8
+    return np.minimum(base_enhanced * 1.15, 80.0)
+
+
+def build_enhanced_msci_history(interpolated_data: pd.DataFrame, date_columns: List[str],
+                                index_mask: np.ndarray = None) -> List[Dict]:
+    """
+    构建全部日期的改进MSCI历史
+    
+    原始MSCI、指数评级和改进MSCI都以整列数组计算；
+    指数评级无效的日期沿用上一次有效评级（此前无有效评级时为50.0）。
+    
+    Args:
+        interpolated_data: 插值后的股票数据
+        date_columns: 已排序的日期列
+        index_mask: 预先计算的指数行掩码
+        
+    Returns:
+        list: 与逐日计算格式相同的改进MSCI历史记录
+    """
+    total_stocks = len(interpolated_data)
+    counts = _calculate_rating_histogram(interpolated_data, date_columns)
+    metrics = _calculate_msci_from_histogram(counts, total_stocks)
+    positions = np.flatnonzero(metrics['valid'])
+    if len(positions) == 0:
+        return []
+    
+    daily_records = [_build_daily_msci_record(date_columns[i], metrics, i, total_stocks) for i in positions]
+    original_msci = np.array([record['msci'] for record in daily_records])
+    
+    # 指数评级：一次掩码均值 + 向前沿用上一次有效评级
+    index_rating, index_valid = calculate_index_rating_series(
+        interpolated_data, [date_columns[i] for i in positions], index_mask)
+    index_rating = np.array([round(float(value), 2) for value in index_rating])
+    last_valid = np.maximum.accumulate(np.where(index_valid, np.arange(len(positions)), -1))
+    index_rating = np.where(last_valid >= 0, index_rating[np.maximum(last_valid, 0)], 50.0)
+    
+    carried = int(np.sum(~index_valid & (last_valid >= 0)))
+    if carried:
+        logger.info(f"[指数评级] {carried}个日期无评级数据，沿用上一次有效评级")
+    
+    enhanced_msci = calculate_enhanced_msci_series(original_msci, index_rating)
+    
+    history = []
+    for record, original, rating, enhanced in zip(daily_records, original_msci, index_rating, enhanced_msci):
+        record['original_msci'] = float(original)
+        record['index_rating'] = float(rating)
+        record['msci'] = round(float(enhanced), 2)  # 替换为改进后的MSCI
+        record['enhanced'] = True
+        history.append(record)
+    return history
+
+
 def calculate_enhanced_market_sentiment(all_data: pd.DataFrame, 
                                        language: str = 'zh_CN',
-                                       enable_quality_adjustment: bool = True) -> Dict[str, Union[float, str, int, List, Dict]]:
+                                       enable_quality_adjustment: bool = True,
+                                       prepared=None) -> Dict[str, Union[float, str, int, List, Dict]]:
     """
     增强版市场情绪综合指数计算（方案D最终版）
     
@@ -143,6 +233,7 @@ def calculate_enhanced_market_sentiment(all_data: pd.DataFrame,
         all_data: 全市场股票数据
         language: 语言设置
         enable_quality_adjustment: 是否启用质量调整
+        prepared: 引擎预处理阶段的共享结果（PreparedMarket），提供时复用其插值矩阵和指数掩码
         
     Returns:
         dict: 包含改进后的MSCI及相关分析
@@ -152,57 +243,27 @@ def calculate_enhanced_market_sentiment(all_data: pd.DataFrame,
     
     try:
         # 1. 对评级数据进行插值处理（关键修改：所有评级都使用最后一次有效数据）
-        logger.info("[增强MSCI] 开始对评级数据进行插值...")
-        from .msci_calculator import _interpolate_ratings
-        interpolated_data = _interpolate_ratings(all_data)
-        logger.info(f"[增强MSCI] 插值完成，数据形状: {interpolated_data.shape}")
-        
-        # 2. 识别日期列
-        date_columns = [col for col in interpolated_data.columns if str(col).startswith('202')]
-        date_columns.sort()
+        index_mask = None
+        if prepared is not None:
+            interpolated_data = prepared.filled_frame
+            date_columns = prepared.date_columns
+            index_mask = prepared.index_mask
+        else:
+            logger.info("[增强MSCI] 开始对评级数据进行插值...")
+            from .msci_calculator import _interpolate_ratings
+            interpolated_data = _interpolate_ratings(all_data)
+            logger.info(f"[增强MSCI] 插值完成，数据形状: {interpolated_data.shape}")
+            
+            # 2. 识别日期列
+            date_columns = [col for col in interpolated_data.columns if str(col).startswith('202')]
+            date_columns.sort()
         
         if len(date_columns) < 5:
             logger.warning("[增强MSCI] 日期列不足5个，无法计算")
             return _get_insufficient_msci_data_result()
         
-        msci_history = []
-        enhanced_msci_history = []
-        last_valid_index_rating = 50.0  # 初始默认值
-        
-        # 3. 逐日计算原始MSCI和改进MSCI（使用插值后的数据）
-        for date_col in date_columns:
-            # 计算原始MSCI（使用插值后的数据）
-            daily_msci = _calculate_daily_msci(interpolated_data, date_col)
-            if not daily_msci:
-                continue
-            
-            original_msci = daily_msci['msci']
-            
-            # 计算指数评级分数（返回评级值和是否有效的标志，使用插值后的数据）
-            index_rating, is_valid = calculate_index_average_rating(interpolated_data, date_col)
-            
-            # 如果当前评级无效，使用上一次的有效评级
-            if not is_valid and last_valid_index_rating != 50.0:
-                logger.info(f"[指数评级] 日期{date_col}无评级数据，使用上一次评级={last_valid_index_rating:.2f}")
-                index_rating = last_valid_index_rating
-            elif is_valid:
-                # 更新最后有效评级
-                last_valid_index_rating = index_rating
-                logger.debug(f"[指数评级] 日期{date_col}有效评级={index_rating:.2f}")
-            
-            # 计算改进MSCI
-            enhanced_msci = calculate_enhanced_msci(original_msci, index_rating)
-            
-            # 保存历史
-            msci_history.append(daily_msci)
-            
-            enhanced_daily = daily_msci.copy()
-            enhanced_daily['original_msci'] = original_msci
-            enhanced_daily['index_rating'] = index_rating
-            enhanced_daily['msci'] = enhanced_msci  # 替换为改进后的MSCI
-            enhanced_daily['enhanced'] = True
-            
-            enhanced_msci_history.append(enhanced_daily)
+        # 3. 批量计算原始MSCI、指数评级和改进MSCI（使用插值后的数据）
+        enhanced_msci_history = build_enhanced_msci_history(interpolated_data, date_columns, index_mask)
         
         if not enhanced_msci_history:
             logger.warning("[增强MSCI] 无有效历史数据")
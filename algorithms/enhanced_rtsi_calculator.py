@@ -11,6 +11,7 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Union
+import logging
 import warnings
 from datetime import datetime
 
@@ -18,6 +19,8 @@ from datetime import datetime
 from .rtsi_calculator import calculate_rating_trend_strength_index
 from config import RTSI_CONFIG
 
+logger = logging.getLogger(__name__)
+
 # 导入国际化配置
 try:
     from config.gui_i18n import t_gui as t_rtsi, t_gui as t_common
@@ -71,9 +74,9 @@ class EnhancedRTSICalculator:
         self.last_interpolation_quality = 0.0
         self.last_interpolation_strategy = 'unknown'
         
-        print(f"rtsi 增强RTSI计算器初始化完成")
-        print(f"rtsi 配置参数: RTSI阈值={self.rtsi_threshold}, 波动性阈值={self.volatility_threshold}")
-        print(f"rtsi AI增强={self.use_ai_enhancement}, 多维度={self.use_multi_dimensional}, 时间窗口={self.time_window}天")
+        logger.debug("增强RTSI计算器初始化完成: RTSI阈值=%s, 波动性阈值=%s, AI增强=%s, 多维度=%s, 时间窗口=%s天",
+                     self.rtsi_threshold, self.volatility_threshold, self.use_ai_enhancement,
+                     self.use_multi_dimensional, self.time_window)
     
     def preprocess_stock_ratings(self, stock_data: pd.Series, date_columns: List[str]) -> List[float]:
         """
@@ -212,7 +215,7 @@ class EnhancedRTSICalculator:
             return result
             
         except Exception as e:
-            print(f"⚠️ 自适应插值失败，回退到双向插值: {e}")
+            logger.debug("⚠️ 自适应插值失败，回退到双向插值: %s", e)
             # 回退到双向插值
             return self._apply_bidirectional_interpolation(raw_ratings)
     
@@ -296,12 +299,14 @@ class EnhancedRTSICalculator:
         except Exception as e:
             return None
     
-    def batch_calculate_enhanced_rtsi(self, stock_data: pd.DataFrame, use_optimized: bool = True) -> Dict[str, Dict]:
+    def batch_calculate_enhanced_rtsi(self, stock_data: pd.DataFrame, use_optimized: bool = True,
+                                      date_columns: List[str] = None) -> Dict[str, Dict]:
         """
         批量计算增强RTSI
         
         Args:
             stock_data: 股票数据DataFrame
+            date_columns: 预先识别的日期列（为None时从stock_data中识别）
             
         Returns:
             股票代码到RTSI结果的映射字典
@@ -309,7 +314,10 @@ class EnhancedRTSICalculator:
         results = {}
         
         # 获取日期列
-        date_cols = [col for col in stock_data.columns if str(col).startswith('202')]
+        if date_columns is not None:
+            date_cols = list(date_columns)
+        else:
+            date_cols = [col for col in stock_data.columns if str(col).startswith('202')]
         if not date_cols:
             return results
         
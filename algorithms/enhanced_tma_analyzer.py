@@ -14,6 +14,8 @@ import logging
 from datetime import datetime
 import warnings
 
+from data.large_cap import is_large_cap_stock
+
 # 导入AI增强组件
 try:
     from .ai_enhanced_signal_analyzer import AIEnhancedSignalAnalyzer
@@ -487,51 +489,8 @@ class EnhancedTMAAnalyzer:
         return sorted(large_cap_stocks)[:5]  # 最多选择5只大盘股
     
     def _is_large_cap_stock(self, stock_code: str) -> bool:
-        """判断是否为大盘股（与realtime_engine.py中的逻辑保持一致）"""
-        code = str(stock_code).strip()
-        
-        # A股大盘股判断
-        if len(code) == 6 and code.isdigit():
-            # 主板股票通常是大盘股
-            if code.startswith('00') or code.startswith('60'):
-                return True
-            # 部分深市主板大盘股（001、002开头的部分股票）
-            if code.startswith('001') or code.startswith('002'):
-                return True
-        
-        # 港股大盘股判断（5位数字）
-        elif len(code) == 5 and code.isdigit():
-            # 知名港股大盘股代码
-            large_cap_hk_codes = {
-                '00700', '00939', '00388', '00005', '00001', '00002', '00003', '00004',
-                '00011', '00012', '00016', '00017', '00019', '00023', '00027', '00066',
-                '00083', '00101', '00135', '00144', '00151', '00175', '00267', '00288',
-                '00386', '00688', '00762', '00823', '00857', '00883', '00941', '00992',
-                '01038', '01044', '01088', '01093', '01109', '01113', '01171', '01177',
-                '01299', '01398', '01818', '01928', '01997', '02007', '02018', '02020',
-                '02202', '02318', '02319', '02382', '02388', '02628', '03328', '03988'
-            }
-            return code in large_cap_hk_codes
-        
-        # 美股大盘股判断（字母代码）
-        elif code.isalpha():
-            # 知名美股大盘股代码
-            large_cap_us_codes = {
-                'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
-                'BRK.A', 'BRK.B', 'UNH', 'JNJ', 'JPM', 'V', 'PG', 'HD', 'MA', 'PFE',
-                'ABBV', 'BAC', 'KO', 'AVGO', 'PEP', 'TMO', 'COST', 'DIS', 'ABT',
-                'MRK', 'ACN', 'VZ', 'CRM', 'DHR', 'ADBE', 'NKE', 'TXN', 'LIN',
-                'WMT', 'NEE', 'AMD', 'BMY', 'PM', 'RTX', 'QCOM', 'HON', 'T',
-                'UPS', 'ORCL', 'COP', 'MS', 'SCHW', 'LOW', 'CAT', 'GS', 'IBM',
-                'AXP', 'BLK', 'DE', 'ELV', 'LMT', 'SYK', 'TJX', 'MDT', 'ADP',
-                'GE', 'C', 'MDLZ', 'ISRG', 'REGN', 'CB', 'MMC', 'SO', 'PLD',
-                'NOW', 'ZTS', 'ICE', 'DUK', 'SHW', 'CMG', 'WM', 'GD', 'TGT',
-                'BDX', 'ITW', 'EOG', 'FIS', 'NSC', 'SRE', 'MU', 'BSX', 'FCX'
-            }
-            return code.upper() in large_cap_us_codes
-        
-        # 默认不是大盘股
-        return False
+        """判断是否为大盘股（共用按市场预先构建的大盘股分类表）"""
+        return is_large_cap_stock(stock_code)
     
     def _extract_market_context(self, market_data: pd.DataFrame = None) -> Dict:
         """提取市场环境信息"""
@@ -726,25 +685,33 @@ class EnhancedTMAAnalyzer:
         }
     
     def batch_analyze_industries_enhanced(self, stock_data: pd.DataFrame, 
-                                         stocks_results: Dict = None) -> Dict[str, Dict]:
+                                         stocks_results: Dict = None,
+                                         industry_groups: Dict[str, pd.DataFrame] = None) -> Dict[str, Dict]:
         """
         批量增强行业分析
         
         Args:
             stock_data: 评级数据DataFrame
             stocks_results: 股票RTSI结果 {stock_code: {'rtsi': {...}, 'name': ...}}
+            industry_groups: 预先切分好的行业数据 {行业: 行业数据}，为None时按'行业'列逐个筛选
         """
         results = {}
         
         # 获取所有行业
-        industries = stock_data['行业'].dropna().unique()
-        industries = [ind for ind in industries if ind and ind != '未分类']
+        if industry_groups is not None:
+            industries = [ind for ind in industry_groups if ind and ind != '未分类']
+        else:
+            industries = stock_data['行业'].dropna().unique()
+            industries = [ind for ind in industries if ind and ind != '未分类']
         
         self.logger.info(f"开始批量增强TMA分析: {len(industries)}个行业")
         
         for industry in industries:
             try:
-                industry_data = stock_data[stock_data['行业'] == industry]
+                if industry_groups is not None:
+                    industry_data = industry_groups[industry]
+                else:
+                    industry_data = stock_data[stock_data['行业'] == industry]
                 
                 # 取消最小股票数限制，处理所有行业
                 result = self.analyze_industry_with_enhancement(
@@ -0,0 +1,545 @@
+# -*- coding: utf-8 -*-
+"""
+增量MSCI计算器 - 持久化每日评级直方图，新交易日只计算当天
+
+核心思路：
+1. 首次运行（或状态失效）时完整计算一次，保存每日直方图计数、指数评级和MSCI值
+2. 每日更新时只对新增日期列做一次直方图统计，历史日期不再重算
+3. 趋势、波动率只依赖最近10个有效日，状态持续天数滚动维护，均为O(1)
+4. 每个已处理日期保存原始评级列的摘要，任一历史日期被改写（或换成其他文件）时完整重建
+
+状态文件为numpy的.npz格式（不使用pickle），与原版/增强版MSCI输出格式一致。
+"""
+
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .msci_calculator import (
+    _interpolate_ratings, _fill_rating_values, _calculate_rating_histogram, _calculate_msci_from_histogram,
+    _build_daily_msci_record, _get_histogram_labels, _calculate_msci_trend,
+    _calculate_market_volatility, _calculate_volume_ratio, _determine_market_state,
+    _assess_risk_level, _get_insufficient_msci_data_result, t_msci
+)
+from .enhanced_msci_calculator import (
+    get_index_stock_mask, calculate_index_rating_series, calculate_enhanced_msci_series
+)
+
+logger = logging.getLogger(__name__)
+
+# 状态文件格式版本，直方图布局或算法口径变化时递增
+STATE_VERSION = 2
+
+# 趋势/波动率计算所需的最近有效日数量
+_ROLLING_WINDOW = 10
+
+# 日期列摘要的混合乘数（64位黄金比例常数）
+_DIGEST_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _column_digests(all_data: pd.DataFrame, date_columns: List[str]) -> np.ndarray:
+    """
+    计算每个日期列原始评级的摘要
+
+    每个单元格的哈希与所在行的股票代码哈希混合后按列求和，
+    任一股票在该日期的评级变化（或股票列表变化）都会改变摘要，与行顺序无关。
+
+    Args:
+        all_data: 全市场股票数据
+        date_columns: 日期列
+
+    Returns:
+        np.ndarray: 与date_columns对齐的uint64摘要
+    """
+    if not len(date_columns) or '股票代码' not in all_data.columns:
+        return np.zeros(len(date_columns), dtype=np.uint64)
+    values = all_data[list(date_columns)].to_numpy(dtype=object)
+    hashes = pd.util.hash_array(values.ravel(order='F')).reshape(len(date_columns), -1)
+    codes = pd.util.hash_array(all_data['股票代码'].astype(str).to_numpy(dtype=object))
+    with np.errstate(over='ignore'):
+        return ((hashes ^ codes) * _DIGEST_MULTIPLIER).sum(axis=1, dtype=np.uint64)
+
+
+class IncrementalMSCICalculator:
+    """
+    增量MSCI计算器
+
+    用法：
+        calculator = IncrementalMSCICalculator(state_path='cache/msci_state_cn.npz')
+        result = calculator.update(raw_data)   # 只计算state中没有的新日期
+    """
+
+    def __init__(self, use_enhanced: bool = True, state_path: Optional[str] = None,
+                 max_history: int = 250):
+        """
+        初始化增量MSCI计算器
+
+        Args:
+            use_enhanced: 是否使用增强版MSCI（指数评级20/80加权）
+            state_path: 状态文件路径（.npz），为None时不持久化
+            max_history: 最多保留的历史日期数
+        """
+        self.use_enhanced = use_enhanced
+        self.state_path = state_path
+        self.max_history = max_history
+        self.stats = {'rebuilds': 0, 'incremental_days': 0, 'row_updates': 0, 'loaded_from_disk': False}
+        self._reset()
+
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+
+    def _reset(self):
+        """清空全部状态"""
+        n_buckets = len(_get_histogram_labels()) + 3
+        self.dates: List[str] = []
+        self.counts = np.zeros((0, n_buckets), dtype=np.int64)
+        self.total_stocks = np.zeros(0, dtype=np.int64)
+        self.index_rating = np.zeros(0, dtype=np.float64)
+        self.msci = np.zeros(0, dtype=np.float64)
+        self.valid = np.zeros(0, dtype=bool)
+
+        # 每只股票最近一次插值后的评级，用于新日期的前向填充
+        self.stock_codes = np.array([], dtype=str)
+        self.last_ratings = np.array([], dtype=str)
+        # 每个已处理日期的原始评级摘要，用于校验数据源历史是否被改写
+        self.date_digests = np.zeros(0, dtype=np.uint64)
+
+        # 滚动状态
+        self.last_valid_index_rating = 50.0
+        self.has_valid_index_rating = False
+        self.current_state = None
+        self.state_duration = 0
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+
+    def update(self, all_data: pd.DataFrame, prepared=None) -> Dict[str, Union[float, str, int, List, Dict]]:
+        """
+        用最新数据更新MSCI，只计算新增日期
+
+        Args:
+            all_data: 全市场股票数据（包含全部日期列）
+            prepared: 引擎预处理阶段的共享结果（PreparedMarket），完整重建时复用其插值矩阵
+
+        Returns:
+            dict: 与 calculate_market_sentiment_composite_index 相同格式的结果
+        """
+        calculation_start = datetime.now()
+        if prepared is not None:
+            date_columns = prepared.date_columns
+        else:
+            date_columns = sorted(col for col in all_data.columns if str(col).startswith('202'))
+        if len(date_columns) < 5:
+            return _get_insufficient_msci_data_result()
+
+        if not self._can_extend(all_data, date_columns):
+            self.rebuild(all_data, date_columns, prepared)
+        else:
+            new_dates = [col for col in date_columns if str(col) > self.dates[-1]]
+            for date_col in new_dates:
+                self.append_day(all_data, date_col)
+            if new_dates:
+                logger.info(f"[增量MSCI] 增量计算 {len(new_dates)} 个新日期")
+                self.save()
+
+        return self.get_result(calculation_start)
+
+    def rebuild(self, all_data: pd.DataFrame, date_columns: List[str] = None, prepared=None):
+        """完整重建状态（首次运行或状态失效时）"""
+        if prepared is not None:
+            date_columns = prepared.date_columns
+        elif date_columns is None:
+            date_columns = sorted(col for col in all_data.columns if str(col).startswith('202'))
+
+        logger.info(f"[增量MSCI] 完整重建状态: {len(all_data)}只股票, {len(date_columns)}个日期")
+        self._reset()
+        self.stats['rebuilds'] += 1
+
+        if prepared is not None:
+            interpolated_data, index_mask = prepared.filled_frame, prepared.index_mask
+        else:
+            interpolated_data, index_mask = _interpolate_ratings(all_data), get_index_stock_mask(all_data)
+        total_stocks = len(interpolated_data)
+        counts = _calculate_rating_histogram(interpolated_data, date_columns)
+        metrics = _calculate_msci_from_histogram(counts, total_stocks)
+        valid = metrics['valid']
+
+        # 原始MSCI（与逐日结果一样先四舍五入）
+        original = np.array([round(float(v), 2) for v in metrics['msci']])
+
+        # 指数评级：只在有效MSCI日期上向前沿用上一次有效评级
+        index_rating = np.full(len(date_columns), 50.0)
+        index_valid = np.zeros(len(date_columns), dtype=bool)
+        if self.use_enhanced:
+            ratings, index_valid = calculate_index_rating_series(interpolated_data, date_columns, index_mask)
+            index_rating = np.array([round(float(v), 2) for v in ratings])
+
+        self.dates = [str(col) for col in date_columns]
+        self.counts = counts
+        self.total_stocks = np.full(len(date_columns), total_stocks, dtype=np.int64)
+        self.index_rating = np.zeros(len(date_columns), dtype=np.float64)
+        self.msci = np.zeros(len(date_columns), dtype=np.float64)
+        self.valid = valid.astype(bool)
+
+        for i in range(len(date_columns)):
+            if not self.valid[i]:
+                continue
+            self._accept_day(i, original[i], index_rating[i], bool(index_valid[i]))
+
+        self.date_digests = _column_digests(all_data, self.dates)
+        self._remember_last_column(all_data, interpolated_data, date_columns[-1])
+        self._trim_history()
+        self.save()
+
+    def append_day(self, all_data: pd.DataFrame, date_col: str):
+        """
+        追加一个新交易日：只统计该日期列的直方图，滚动更新趋势状态
+
+        缺失评级用该股票最近一次评级前向填充（与完整插值的中段/后段规则一致）。
+        已写入状态的历史日期不再改动：新股票首次出现评级时，
+        完整插值会把该评级回填到之前的日期，增量模式不做这种回溯修改。
+        """
+        codes = all_data['股票代码'].astype(str).to_numpy(dtype=str)
+        raw = all_data[date_col].to_numpy(dtype=object)
+
+        # 对齐上一交易日的插值评级（股票列表未变化时直接按位置对齐）
+        if np.array_equal(codes, self.stock_codes):
+            previous = self.last_ratings
+        else:
+            lookup = pd.Series(self.last_ratings, index=self.stock_codes)
+            lookup = lookup[~lookup.index.duplicated()]
+            previous = lookup.reindex(codes).fillna('').to_numpy(dtype=str)
+        missing = pd.isna(raw) | (raw == '-')
+        fill = missing & (previous != '')
+        filled = raw.copy()
+        filled[fill] = previous[fill]
+
+        day_frame = pd.DataFrame({date_col: filled})
+        counts = _calculate_rating_histogram(day_frame, [date_col])
+        total_stocks = len(all_data)
+        metrics = _calculate_msci_from_histogram(counts, total_stocks)
+
+        i = len(self.dates)
+        self.dates.append(str(date_col))
+        self.counts = np.vstack([self.counts, counts])
+        self.total_stocks = np.append(self.total_stocks, total_stocks)
+        self.index_rating = np.append(self.index_rating, 0.0)
+        self.msci = np.append(self.msci, 0.0)
+        self.valid = np.append(self.valid, bool(metrics['valid'][0]))
+        self.date_digests = np.append(self.date_digests, _column_digests(all_data, [date_col]))
+
+        if self.valid[i]:
+            index_rating, index_valid = 50.0, False
+            if self.use_enhanced:
+                ratings, valid = calculate_index_rating_series(day_frame, [date_col], get_index_stock_mask(all_data))
+                index_rating, index_valid = round(float(ratings[0]), 2), bool(valid[0])
+            self._accept_day(i, round(float(metrics['msci'][0]), 2), index_rating, index_valid)
+
+        self.stock_codes = codes
+        self.last_ratings = np.array(['' if pd.isna(v) or v == '-' else str(v) for v in filled], dtype=str)
+        self.stats['incremental_days'] += 1
+        self._trim_history()
+
+    def apply_row_changes(self, old_data: pd.DataFrame, all_data: pd.DataFrame,
+                          stale_rows: pd.DataFrame, changed_rows: pd.DataFrame) -> bool:
+        """
+        部分股票的评级被改写时按差量更新（日期列不变的盘中重新导入）
+
+        只对变化的行做双向填充：从每个日期的直方图中减去旧行的计数、加上新行的计数；
+        指数评级由指数行重新计算，随后按日期顺序重放滚动状态（只涉及标量）。
+
+        Args:
+            old_data: 改写前的全市场数据（校验状态与之对应）
+            all_data: 改写后的全市场数据
+            stale_rows: 改写前被修改的股票行
+            changed_rows: 改写后对应的股票行（索引与all_data一致）
+
+        Returns:
+            bool: 是否完成差量更新；状态与数据不对应或股票列表变化时返回False，
+                调用方应改用 update()
+        """
+        date_columns = sorted(col for col in all_data.columns if str(col).startswith('202'))
+        if (not self.dates or not date_columns or self.dates[-1] != date_columns[-1]
+                or not set(self.dates) <= set(date_columns)
+                or not self._can_extend(old_data, date_columns)):
+            return False
+        codes = all_data['股票代码'].astype(str).to_numpy(dtype=str)
+        if (not np.array_equal(codes, self.stock_codes) or len(stale_rows) != len(changed_rows)
+                or not all_data.index.is_unique):
+            return False
+
+        date_index = {col: i for i, col in enumerate(date_columns)}
+        positions = [date_index[date] for date in self.dates]
+
+        def filled_frame(rows: pd.DataFrame) -> pd.DataFrame:
+            """按全部日期双向填充后，只保留状态中的日期"""
+            filled = _fill_rating_values(rows[date_columns].to_numpy(dtype=object))
+            return pd.DataFrame(filled[:, positions], columns=self.dates, dtype=object)
+
+        new_filled = filled_frame(changed_rows)
+        counts = (self.counts
+                  - _calculate_rating_histogram(filled_frame(stale_rows), self.dates)
+                  + _calculate_rating_histogram(new_filled, self.dates))
+        if (counts < 0).any():
+            return False  # 状态含增量追加的日期，与双向填充口径不一致
+
+        self.counts = counts
+        metrics = _calculate_msci_from_histogram(self.counts, self.total_stocks)
+        original = np.array([round(float(v), 2) for v in metrics['msci']])
+        self.valid = metrics['valid'].astype(bool)
+
+        index_rating = np.full(len(self.dates), 50.0)
+        index_valid = np.zeros(len(self.dates), dtype=bool)
+        if self.use_enhanced:
+            index_rows = all_data[get_index_stock_mask(all_data)]
+            index_filled = filled_frame(index_rows)
+            ratings, index_valid = calculate_index_rating_series(
+                index_filled, self.dates, np.ones(len(index_filled), dtype=bool))
+            index_rating = np.array([round(float(v), 2) for v in ratings])
+
+        # 重放滚动状态
+        self.last_valid_index_rating = 50.0
+        self.has_valid_index_rating = False
+        self.current_state = None
+        self.state_duration = 0
+        self.index_rating = np.zeros(len(self.dates), dtype=np.float64)
+        self.msci = np.zeros(len(self.dates), dtype=np.float64)
+        for i in range(len(self.dates)):
+            if self.valid[i]:
+                self._accept_day(i, original[i], index_rating[i], bool(index_valid[i]))
+
+        # 最后一个日期的插值评级只需改写变化的行
+        rows = all_data.index.get_indexer(changed_rows.index)
+        self.last_ratings = self.last_ratings.astype(object)
+        self.last_ratings[rows] = ['' if pd.isna(v) or v == '-' else str(v) for v in new_filled[self.dates[-1]]]
+        self.last_ratings = self.last_ratings.astype(str)
+        self.date_digests = _column_digests(all_data, self.dates)
+        self.stats['row_updates'] += len(changed_rows)
+        self.save()
+        return True
+
+    def get_result(self, calculation_start: datetime = None) -> Dict[str, Union[float, str, int, List, Dict]]:
+        """根据当前状态组装MSCI结果（只构建末尾历史记录）"""
+        calculation_start = calculation_start or datetime.now()
+        positions = np.flatnonzero(self.valid)
+        if len(positions) == 0:
+            return _get_insufficient_msci_data_result()
+
+        history_size = 30 if self.use_enhanced else 20
+        tail = self._build_records(positions[-max(history_size, _ROLLING_WINDOW):])
+        latest = tail[-1]
+
+        recent_trend = _calculate_msci_trend(tail[-_ROLLING_WINDOW:])
+        volatility = _calculate_market_volatility(tail[-_ROLLING_WINDOW:])
+        volume_ratio = _calculate_volume_ratio(latest)
+        market_state = self.current_state
+
+        # 平均插值比例直接由保存的直方图得到（与逐日记录中的取值一致）
+        metrics = _calculate_msci_from_histogram(self.counts[positions], self.total_stocks[positions])
+        avg_interpolation_ratio = np.mean([round(float(r), 3) for r in metrics['interpolation_ratio']])
+
+        overall_quality_warnings = []
+        if avg_interpolation_ratio > 0.3:
+            overall_quality_warnings.append(f"📊 整体数据质量提醒：平均插值比例 {avg_interpolation_ratio:.1%}")
+        if avg_interpolation_ratio > 0.5:
+            overall_quality_warnings.append("🚨 数据质量严重警告：建议检查数据源完整性")
+
+        calculation_time = f"{(datetime.now() - calculation_start).total_seconds():.3f}s"
+
+        if self.use_enhanced:
+            risk_level = _assess_risk_level(market_state, latest.get('extreme_state', ''), recent_trend)
+            return {
+                'current_msci': latest['msci'],
+                'original_msci': latest['original_msci'],
+                'index_rating': latest['index_rating'],
+                'market_state': market_state,
+                'trend_5d': recent_trend,
+                'volatility': volatility,
+                'volume_ratio': volume_ratio,
+                'latest_analysis': latest,
+                'history': tail[-history_size:],
+                'risk_level': risk_level,
+                'interpolation_ratio': avg_interpolation_ratio,
+                'data_quality_warnings': overall_quality_warnings,
+                'calculation_time': calculation_time,
+                'enhanced': True,
+                'algorithm': '方案D最终版（20/80权重 + 分段加成）',
+                'state_duration': self.state_duration,
+                'incremental': True
+            }
+
+        all_warnings = []
+        for item in tail[-5:]:
+            all_warnings.extend(item.get(t_msci('data_quality_warnings'), []))
+        risk_level = _assess_risk_level(market_state, latest[t_msci('extreme_state')], recent_trend)
+        return {
+            'current_msci': latest['msci'],
+            'market_state': market_state,
+            'trend_5d': recent_trend,
+            'volatility': volatility,
+            'volume_ratio': volume_ratio,
+            'latest_analysis': latest,
+            'history': tail[-history_size:],
+            'risk_level': risk_level,
+            'total_days': len(positions),
+            'calculation_time': calculation_time,
+            'avg_interpolation_ratio': round(avg_interpolation_ratio, 3),
+            'data_quality_warnings': list(set(all_warnings)),
+            'overall_quality_warnings': overall_quality_warnings,
+            'state_duration': self.state_duration,
+            'incremental': True
+        }
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def save(self, path: str = None) -> bool:
+        """保存状态到.npz文件"""
+        path = path or self.state_path
+        if not path:
+            return False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = path + '.tmp.npz'
+            np.savez_compressed(
+                tmp_path,
+                version=np.int64(STATE_VERSION),
+                use_enhanced=np.bool_(self.use_enhanced),
+                labels=np.array(_get_histogram_labels(), dtype=str),
+                dates=np.array(self.dates, dtype=str),
+                counts=self.counts,
+                total_stocks=self.total_stocks,
+                index_rating=self.index_rating,
+                msci=self.msci,
+                valid=self.valid,
+                stock_codes=self.stock_codes,
+                last_ratings=self.last_ratings,
+                date_digests=self.date_digests,
+                scalars=np.array([self.last_valid_index_rating, float(self.has_valid_index_rating),
+                                  float(self.state_duration)]),
+                current_state=np.array([self.current_state or ''], dtype=str)
+            )
+            os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            logger.warning(f"[增量MSCI] 保存状态失败: {e}")
+            return False
+
+    def load(self, path: str = None) -> bool:
+        """从.npz文件加载状态，版本或口径不一致时忽略"""
+        path = path or self.state_path
+        try:
+            with np.load(path, allow_pickle=False) as state:
+                if (int(state['version']) != STATE_VERSION
+                        or bool(state['use_enhanced']) != self.use_enhanced
+                        or list(state['labels']) != _get_histogram_labels()):
+                    logger.info("[增量MSCI] 状态文件版本不匹配，将完整重建")
+                    return False
+                self.dates = [str(d) for d in state['dates']]
+                self.counts = state['counts']
+                self.total_stocks = state['total_stocks']
+                self.index_rating = state['index_rating']
+                self.msci = state['msci']
+                self.valid = state['valid']
+                self.stock_codes = state['stock_codes']
+                self.last_ratings = state['last_ratings']
+                self.date_digests = state['date_digests']
+                scalars = state['scalars']
+                self.last_valid_index_rating = float(scalars[0])
+                self.has_valid_index_rating = bool(scalars[1])
+                self.state_duration = int(scalars[2])
+                self.current_state = str(state['current_state'][0]) or None
+            self.stats['loaded_from_disk'] = True
+            return True
+        except Exception as e:
+            logger.warning(f"[增量MSCI] 加载状态失败，将完整重建: {e}")
+            self._reset()
+            return False
+
+    # ------------------------------------------------------------------
+    # 内部方法
+    # ------------------------------------------------------------------
+
+    def _can_extend(self, all_data: pd.DataFrame, date_columns: List[str]) -> bool:
+        """判断现有状态能否直接增量扩展"""
+        if not self.dates or '股票代码' not in all_data.columns:
+            return False
+        last_date = self.dates[-1]
+        if last_date not in date_columns:
+            return False  # 数据与状态之间有断档
+        if date_columns[-1] < last_date:
+            return False  # 数据比状态旧（例如切换回旧文件）
+
+        # 数据覆盖范围内的已处理日期必须全部存在，且原始评级未被改写
+        # （早于数据首日的日期只保留在历史中，无法校验）
+        present = set(date_columns)
+        checked = [i for i, date in enumerate(self.dates) if date >= date_columns[0]]
+        if any(self.dates[i] not in present for i in checked):
+            return False
+        digests = _column_digests(all_data, [self.dates[i] for i in checked])
+        return np.array_equal(digests, self.date_digests[checked])
+
+    def _accept_day(self, i: int, original_msci: float, index_rating: float, index_valid: bool):
+        """登记一个有效日期并滚动更新状态（O(1)）"""
+        if self.use_enhanced:
+            # 无有效指数评级时沿用上一次有效评级（此前没有则为50.0）
+            if index_valid:
+                self.last_valid_index_rating = index_rating
+                self.has_valid_index_rating = True
+            elif self.has_valid_index_rating:
+                index_rating = self.last_valid_index_rating
+            else:
+                index_rating = 50.0
+            msci = round(float(calculate_enhanced_msci_series(original_msci, index_rating)), 2)
+        else:
+            msci = original_msci
+
+        self.index_rating[i] = index_rating
+        self.msci[i] = msci
+
+        state = _determine_market_state(msci)
+        if state == self.current_state:
+            self.state_duration += 1
+        else:
+            self.current_state = state
+            self.state_duration = 1
+
+    def _remember_last_column(self, all_data: pd.DataFrame, interpolated_data: pd.DataFrame, date_col):
+        """记录最后一个日期的插值评级，供下一次增量使用"""
+        self.stock_codes = all_data['股票代码'].astype(str).to_numpy(dtype=str) if '股票代码' in all_data.columns else np.array([], dtype=str)
+        last_column = interpolated_data[date_col].to_numpy(dtype=object)
+        self.last_ratings = np.array(['' if pd.isna(v) or v == '-' else str(v) for v in last_column], dtype=str)
+
+    def _build_records(self, positions: np.ndarray) -> List[Dict]:
+        """根据保存的直方图重建指定日期的历史记录"""
+        metrics = _calculate_msci_from_histogram(self.counts[positions], self.total_stocks[positions])
+        records = []
+        for j, i in enumerate(positions):
+            record = _build_daily_msci_record(self.dates[i], metrics, j, int(self.total_stocks[i]))
+            if self.use_enhanced:
+                record['original_msci'] = record['msci']
+                record['index_rating'] = float(self.index_rating[i])
+                record['msci'] = float(self.msci[i])
+                record['enhanced'] = True
+            records.append(record)
+        return records
+
+    def _trim_history(self):
+        """超过max_history时丢弃最早的日期（滚动状态不受影响）"""
+        excess = len(self.dates) - self.max_history
+        if excess <= 0:
+            return
+        self.dates = self.dates[excess:]
+        self.counts = self.counts[excess:]
+        self.total_stocks = self.total_stocks[excess:]
+        self.index_rating = self.index_rating[excess:]
+        self.msci = self.msci[excess:]
+        self.valid = self.valid[excess:]
+        self.date_digests = self.date_digests[excess:]
+        self.state_duration = min(self.state_duration, int(self.valid.sum()))
@@ -110,11 +110,12 @@ class CoreStrengthAnalyzer:
         # 2. 如果有龙头股RTSI数据，则增强TMA
         if industry_stocks_map:
             enhanced_tma = self._enhance_tma_with_leading_stocks(traditional_tma, industry_stocks_map)
-            self.logger.info(f"[TMA] ✅ 使用增强TMA：原始TMA×60% + 前{self.top_n_leading_stocks}龙头股RTSI×40%（{len(enhanced_tma)}个行业）")
+            self.logger.debug("[TMA] ✅ 使用增强TMA：原始TMA×60%% + 前%d龙头股RTSI×40%%（%d个行业）",
+                              self.top_n_leading_stocks, len(enhanced_tma))
             return enhanced_tma
         else:
             # 没有龙头股数据，只用原始TMA
-            self.logger.info(f"[TMA] 使用原始TMA（无龙头股数据，{len(traditional_tma)}个行业）")
+            self.logger.debug("[TMA] 使用原始TMA（无龙头股数据，%d个行业）", len(traditional_tma))
             return traditional_tma
     
     def _enhance_tma_with_leading_stocks(self, traditional_tma: Dict[str, float],
@@ -144,7 +145,7 @@ class CoreStrengthAnalyzer:
                 continue
             
             # 调试：打印stocks的前3个
-            self.logger.debug(f"[TMA增强] {industry_name}: stocks数量={len(stocks)}, 前3个={stocks[:3] if len(stocks) >= 3 else stocks}")
+            self.logger.debug("[TMA增强] %s: stocks数量=%d, 前3个=%s", industry_name, len(stocks), stocks[:3])
             
             # 按RTSI排序，选择前N个龙头股
             sorted_stocks = sorted(
@@ -161,7 +162,7 @@ class CoreStrengthAnalyzer:
                 if rtsi > 0:  # 只计算有效的RTSI
                     rtsi_values.append(rtsi)
                 else:
-                    self.logger.debug(f"[TMA增强] {industry_name}: 股票{stock}的RTSI=0或无效")
+                    self.logger.debug("[TMA增强] %s: 股票%s的RTSI=0或无效", industry_name, stock)
             
             if rtsi_values:
                 # 将RTSI (0-100) 转换到 (-1, 1) 范围
@@ -171,16 +172,17 @@ class CoreStrengthAnalyzer:
                 # 新TMA = 原始TMA × 60% + 龙头股RTSI × 40%
                 enhanced_tma = original_tma * 0.6 + rtsi_normalized * 0.4
                 
-                self.logger.info(
-                    f"[TMA增强] {industry_name}: "
-                    f"原始TMA={original_tma:.3f}×0.6={original_tma*0.6:.3f}, "
-                    f"前{len(rtsi_values)}股RTSI均值={avg_rtsi:.1f}→归一化={rtsi_normalized:.3f}×0.4={rtsi_normalized*0.4:.3f}, "
-                    f"增强TMA={enhanced_tma:.3f}, 显示={enhanced_tma*100:.1f}分"
+                self.logger.debug(
+                    "[TMA增强] %s: 原始TMA=%.3f×0.6=%.3f, 前%d股RTSI均值=%.1f→归一化=%.3f×0.4=%.3f, "
+                    "增强TMA=%.3f, 显示=%.1f分",
+                    industry_name, original_tma, original_tma * 0.6, len(rtsi_values), avg_rtsi,
+                    rtsi_normalized, rtsi_normalized * 0.4, enhanced_tma, enhanced_tma * 100
                 )
             else:
                 # 没有有效RTSI，使用原始TMA
                 enhanced_tma = original_tma
-                self.logger.info(f"[TMA增强] {industry_name}: 无有效RTSI，使用原始TMA={original_tma:.3f}, 显示={original_tma*100:.1f}分")
+                self.logger.debug("[TMA增强] %s: 无有效RTSI，使用原始TMA=%.3f, 显示=%.1f分",
+                                  industry_name, original_tma, original_tma * 100)
             
             enhanced_results[industry_name] = enhanced_tma
         
@@ -258,8 +260,8 @@ class CoreStrengthAnalyzer:
                 
                 # 调试输出：查看原始TMA的实际范围
                 if len(results) == 1:  # 只在单行业模式下输出
-                    self.logger.debug(f"[原始TMA] {industry}: momentum_scores数量={len(momentum_scores)}, "
-                                    f"平均={industry_momentum:.3f}, 最终={final_score:.3f}")
+                    self.logger.debug("[原始TMA] %s: momentum_scores数量=%d, 平均=%.3f, 最终=%.3f",
+                                      industry, len(momentum_scores), industry_momentum, final_score)
             else:
                 results[industry] = 0.0
         
@@ -317,8 +319,8 @@ class CoreStrengthAnalyzer:
                 
                 # 调试输出
                 if len(results) == 1:
-                    self.logger.debug(f"[UFA] {industry}: upgrade_scores数量={len(upgrade_scores)}, "
-                                    f"平均={industry_upgrade:.3f}, 归一化={normalized_score:.3f}")
+                    self.logger.debug("[UFA] %s: upgrade_scores数量=%d, 平均=%.3f, 归一化=%.3f",
+                                      industry, len(upgrade_scores), industry_upgrade, normalized_score)
             else:
                 results[industry] = 0.0
         
@@ -380,7 +382,8 @@ class CoreStrengthAnalyzer:
                         'name': stock_info.get('name', stock_code),
                         'rtsi': stock_info.get('rtsi', {}).get('rtsi', 0) if isinstance(stock_info.get('rtsi'), dict) else stock_info.get('rtsi', 0)
                     })
-            self.logger.debug(f"[TMA准备] {industry_name}: 从stocks_results构建industry_stocks_map, 股票数={len(industry_stocks_map.get(industry_name, []))}")
+            self.logger.debug("[TMA准备] %s: 从stocks_results构建industry_stocks_map, 股票数=%d",
+                              industry_name, len(industry_stocks_map.get(industry_name, [])))
         else:
             # 回退：从DataFrame提取（没有RTSI）
             industry_stocks_map = self._prepare_industry_stocks_map(industry_data, industry_col)
@@ -433,23 +436,25 @@ class CoreStrengthAnalyzer:
                     # 确保不超过1.0
                     combined_score = min(combined_score, 1.0)
                     
-                    self.logger.info(
-                        f"[新算法] {industry_name}: "
-                        f"UFA={ufa_score:.3f}×0.6={ufa_score*0.6:.3f}, "
-                        f"前{len(rtsi_values)}股RTSI均值={avg_rtsi:.1f}→归一化={rtsi_normalized:.3f}×0.4={rtsi_normalized*0.4:.3f}, "
-                        f"合计={(ufa_score*0.6 + rtsi_normalized*0.4):.3f}×1.1={combined_score:.3f}, "
-                        f"显示={combined_score*100:.1f}分"
+                    self.logger.debug(
+                        "[新算法] %s: UFA=%.3f×0.6=%.3f, 前%d股RTSI均值=%.1f→归一化=%.3f×0.4=%.3f, "
+                        "合计=%.3f×1.1=%.3f, 显示=%.1f分",
+                        industry_name, ufa_score, ufa_score * 0.6, len(rtsi_values), avg_rtsi,
+                        rtsi_normalized, rtsi_normalized * 0.4, ufa_score * 0.6 + rtsi_normalized * 0.4,
+                        combined_score, combined_score * 100
                     )
                     
                     best_score = combined_score
                 else:
                     # 没有有效RTSI，只用UFA × 1.1
                     best_score = min(ufa_score * 1.1, 1.0)
-                    self.logger.info(f"[新算法] {industry_name}: 无有效RTSI，UFA={ufa_score:.3f}×1.1={best_score:.3f}, 显示={best_score*100:.1f}分")
+                    self.logger.debug("[新算法] %s: 无有效RTSI，UFA=%.3f×1.1=%.3f, 显示=%.1f分",
+                                      industry_name, ufa_score, best_score, best_score * 100)
             else:
                 # 没有股票数据，只用UFA × 1.1
                 best_score = min(ufa_score * 1.1, 1.0)
-                self.logger.info(f"[新算法] {industry_name}: 无股票数据，UFA={ufa_score:.3f}×1.1={best_score:.3f}, 显示={best_score*100:.1f}分")
+                self.logger.debug("[新算法] %s: 无股票数据，UFA=%.3f×1.1=%.3f, 显示=%.1f分",
+                                  industry_name, ufa_score, best_score, best_score * 100)
             
             best_algorithm = "UFA+RTSI×1.1"
             
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+热路径日志控制 - 计算引擎和各计算器共用的分级日志工具
+
+1. 静默模式：把算法/数据模块的日志器统一提高到WARNING，逐股票、逐单元格的
+   调试输出在格式化之前就被过滤（调用方使用 logger.debug("%s", x) 惰性格式化）
+2. 限频进度：RateLimitedProgress 按时间间隔输出进度，避免每N只股票打印一次
+
+基准测试（比较开启/关闭日志时的全量计算耗时）：
+    python -m algorithms.log_control CN_Data5000.json.gz
+"""
+
+import sys
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 热路径所在模块的日志器前缀
+HOT_PATH_LOGGERS = ('algorithms', 'data')
+
+_quiet_lock = threading.Lock()
+_saved_levels: Optional[Dict[str, int]] = None
+
+
+def set_quiet(quiet: bool = True, level: int = logging.WARNING) -> None:
+    """
+    开启/关闭热路径静默模式
+
+    Args:
+        quiet: True时把HOT_PATH_LOGGERS的级别提高到level，False时恢复原级别
+        level: 静默模式下的最低输出级别
+    """
+    global _saved_levels
+    with _quiet_lock:
+        if quiet:
+            if _saved_levels is None:
+                _saved_levels = {name: logging.getLogger(name).level for name in HOT_PATH_LOGGERS}
+            for name in HOT_PATH_LOGGERS:
+                logging.getLogger(name).setLevel(level)
+        elif _saved_levels is not None:
+            for name, saved_level in _saved_levels.items():
+                logging.getLogger(name).setLevel(saved_level)
+            _saved_levels = None
+
+
+def is_quiet() -> bool:
+    """是否处于静默模式"""
+    return _saved_levels is not None
+
+
+class RateLimitedProgress:
+    """
+    限频进度日志：两次输出至少间隔min_interval秒，完成时总会输出一次
+
+    日志器未启用对应级别时update几乎无开销（不格式化、不取时间）。
+    """
+
+    def __init__(self, log: logging.Logger, total: int, label: str,
+                 min_interval: float = 2.0, level: int = logging.INFO):
+        """
+        Args:
+            log: 输出使用的日志器
+            total: 总数
+            label: 进度描述（如"计算进度"）
+            min_interval: 两次输出的最小间隔（秒）
+            level: 日志级别
+        """
+        self.log = log
+        self.total = total
+        self.label = label
+        self.min_interval = min_interval
+        self.level = level
+        self._last_time = time.monotonic()
+
+    def update(self, done: int, **counts) -> None:
+        """
+        报告已完成数量
+
+        Args:
+            done: 已完成数量
+            **counts: 附加计数（如 成功=10, 失败=0）
+        """
+        if not self.log.isEnabledFor(self.level):
+            return
+        now = time.monotonic()
+        if done < self.total and now - self._last_time < self.min_interval:
+            return
+        self._last_time = now
+
+        progress = done / self.total * 100 if self.total else 100.0
+        extra = ', '.join(f"{key}:{value}" for key, value in counts.items())
+        self.log.log(self.level, "%s: %.1f%% (%d/%d)%s", self.label, progress, done, self.total,
+                     f" - {extra}" if extra else "")
+
+
+def benchmark_logging(file_path: str, repeat: int = 3) -> Dict[str, float]:
+    """
+    比较开启INFO日志与静默模式下全量计算的耗时
+
+    每次都强制重新计算（不使用结果快照、增量MSCI状态和内存缓存），两种模式
+    交替运行，避免先运行的一方替后运行的一方预热磁盘缓存。日志输出到标准错误。
+
+    Args:
+        file_path: 数据文件路径
+        repeat: 每种模式的重复次数（取最短耗时）
+
+    Returns:
+        {'verbose': 秒, 'quiet': 秒}
+    """
+    from data.stock_dataset import StockDataSet
+    from algorithms.realtime_engine import RealtimeAnalysisEngine
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    dataset = StockDataSet(file_path)
+
+    timings: Dict[str, float] = {}
+    try:
+        for _ in range(max(1, repeat)):
+            for mode in ('verbose', 'quiet'):
+                set_quiet(mode == 'quiet')
+                engine = RealtimeAnalysisEngine(dataset, enable_multithreading=False)
+                engine.config['result_snapshot'] = False
+                engine.config['incremental_msci'] = False
+                start = time.perf_counter()
+                engine.calculate_all_metrics(force_refresh=True, enable_emergency_timeout=False)
+                elapsed = time.perf_counter() - start
+                timings[mode] = min(timings.get(mode, elapsed), elapsed)
+    finally:
+        set_quiet(False)
+    return timings
+
+
+if __name__ == "__main__":
+    data_file = sys.argv[1] if len(sys.argv) > 1 else 'CN_Data5000.json.gz'
+    results = benchmark_logging(data_file, repeat=int(sys.argv[2]) if len(sys.argv) > 2 else 3)
+    print(f"日志开启: {results['verbose']:.2f}秒")
+    print(f"静默模式: {results['quiet']:.2f}秒")
+    if results['quiet'] > 0:
+        print(f"加速比: {results['verbose'] / results['quiet']:.2f}x")
@@ -21,6 +21,7 @@ MSCI算法 - 市场情绪综合指数 (Market Sentiment Composite Index)
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Union, Optional
+import logging
 import warnings
 from datetime import datetime
 from collections import Counter
@@ -43,6 +44,8 @@ except ImportError:
     def t_common(key): return key
     def set_language(lang): pass
 
+logger = logging.getLogger(__name__)
+
 def get_rating_score_map():
     """
     获取评级分数映射（线性映射：0级=12.5分，7级=100分）
@@ -70,6 +73,43 @@ except ImportError:
 warnings.filterwarnings('ignore', category=RuntimeWarning)
 
 
+def _fill_rating_values(values: np.ndarray, missing: np.ndarray = None) -> np.ndarray:
+    """
+    对评级矩阵（股票×日期，日期升序）做双向填充
+
+    中段/后段缺失用前面最近的有效评级，前段缺失用后面第一个有效评级，
+    完全没有有效评级的行保持原样。与逐格插值结果一致。
+
+    Args:
+        values: object类型的评级矩阵
+        missing: 缺失掩码（NaN或'-'），为None时自动计算
+
+    Returns:
+        np.ndarray: 填充后的评级矩阵（新数组）
+    """
+    if values.size == 0:
+        return values.copy()
+    if missing is None:
+        missing = pd.isna(values) | (values == '-')
+
+    n_rows, n_cols = values.shape
+    positions = np.arange(n_cols)
+
+    # 前插值：每格取不晚于当前日期的最近有效位置
+    forward = np.maximum.accumulate(np.where(missing, -1, positions), axis=1)
+    # 后插值：每格取不早于当前日期的第一个有效位置
+    backward = np.minimum.accumulate(np.where(missing, n_cols, positions)[:, ::-1], axis=1)[:, ::-1]
+
+    source = np.where(forward >= 0, forward, backward)
+    has_source = source < n_cols
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], source.shape)
+
+    filled = values.copy()
+    fill = missing & has_source
+    filled[fill] = values[rows[fill], source[fill]]
+    return filled
+
+
 def _interpolate_ratings(data: pd.DataFrame) -> pd.DataFrame:
     """
     对评级数据进行智能双向插值处理
@@ -92,84 +132,26 @@ def _interpolate_ratings(data: pd.DataFrame) -> pd.DataFrame:
     
     date_columns.sort()
     
-    # 复制数据以避免修改原始数据
+    # 复制数据以避免修改原始数据，对评级矩阵一次性双向填充
     interpolated_data = data.copy()
-    
-    # 对每只股票/指数进行插值
-    for idx in range(len(interpolated_data)):
-        # 第一步：找到所有有效评级的位置
-        valid_positions = {}  # {date_col: rating}
-        for date_col in date_columns:
-            current_rating = interpolated_data.at[idx, date_col]
-            if not (pd.isna(current_rating) or current_rating == '-'):
-                valid_positions[date_col] = current_rating
-        
-        if not valid_positions:
-            # 如果该股票/指数完全没有有效评级，跳过
-            continue
-        
-        # 第二步：找到第一个和最后一个有效评级的位置
-        first_valid_date = None
-        last_valid_date = None
-        for date_col in date_columns:
-            if date_col in valid_positions:
-                if first_valid_date is None:
-                    first_valid_date = date_col
-                last_valid_date = date_col
-        
-        # 第三步：应用双向插值策略
-        last_forward_rating = '-'  # 用于前插值（向后填充）
-        
-        for date_col in date_columns:
-            current_rating = interpolated_data.at[idx, date_col]
-            
-            # 如果当前评级有效，更新前插值基准
-            if not (pd.isna(current_rating) or current_rating == '-'):
-                last_forward_rating = current_rating
-                continue
-            
-            # 如果当前评级无效，需要插值
-            if pd.isna(current_rating) or current_rating == '-':
-                # 判断位置：前段、中段、后段
-                date_index = date_columns.index(date_col)
-                first_valid_index = date_columns.index(first_valid_date) if first_valid_date else -1
-                last_valid_index = date_columns.index(last_valid_date) if last_valid_date else -1
-                
-                if date_index < first_valid_index:
-                    # 前段：使用后插值（找后面第一个有效值）
-                    next_valid_rating = '-'
-                    for future_date in date_columns[date_index:]:
-                        if future_date in valid_positions:
-                            next_valid_rating = valid_positions[future_date]
-                            break
-                    if next_valid_rating != '-':
-                        interpolated_data.at[idx, date_col] = next_valid_rating
-                        # print(f"[后插值] 股票{idx} 日期{date_col} 使用后续评级{next_valid_rating}")
-                
-                elif date_index > last_valid_index:
-                    # 后段：使用前插值（用最后一个有效值）
-                    if last_forward_rating != '-':
-                        interpolated_data.at[idx, date_col] = last_forward_rating
-                        # print(f"[前插值-后段] 股票{idx} 日期{date_col} 使用前次评级{last_forward_rating}")
-                
-                else:
-                    # 中段：使用前插值（用前面最近有效值）
-                    if last_forward_rating != '-':
-                        interpolated_data.at[idx, date_col] = last_forward_rating
-                        # print(f"[前插值-中段] 股票{idx} 日期{date_col} 使用前次评级{last_forward_rating}")
+    filled = _fill_rating_values(data[date_columns].to_numpy(dtype=object))
+    for i, date_col in enumerate(date_columns):
+        interpolated_data[date_col] = filled[:, i]
     
     return interpolated_data
 
 
 def calculate_market_sentiment_composite_index(all_data: pd.DataFrame, language: str = 'zh_CN', 
                                               use_enhanced: bool = False, 
-                                              enable_quality_adjustment: bool = True) -> Dict[str, Union[float, str, int, List, Dict]]:
+                                              enable_quality_adjustment: bool = True,
+                                              prepared=None) -> Dict[str, Union[float, str, int, List, Dict]]:
     """
     市场情绪综合指数 (Market Sentiment Composite Index)
     综合多个维度判断市场情绪状态
     
     参数:
         all_data (pd.DataFrame): 全市场股票数据
+        prepared (PreparedMarket): 引擎预处理阶段的共享结果，提供时直接使用其插值矩阵
         
     返回:
         dict: {
@@ -188,35 +170,35 @@ def calculate_market_sentiment_composite_index(all_data: pd.DataFrame, language:
     if use_enhanced:
         try:
             from .enhanced_msci_calculator import calculate_enhanced_market_sentiment
-            return calculate_enhanced_market_sentiment(all_data, language, enable_quality_adjustment)
+            return calculate_enhanced_market_sentiment(all_data, language, enable_quality_adjustment,
+                                                       prepared=prepared)
         except ImportError:
-            print("⚠️ 增强版MSCI不可用，回退到原版算法")
+            logger.warning("⚠️ 增强版MSCI不可用，回退到原版算法")
         except Exception as e:
-            print(f"⚠️ 增强版MSCI计算失败，回退到原版算法: {e}")
+            logger.warning("⚠️ 增强版MSCI计算失败，回退到原版算法: %s", e)
     
     calculation_start = datetime.now()
     
     try:
         # 1. 对评级数据进行插值处理（关键修改：所有评级都使用最后一次有效数据）
-        print("[MSCI计算] 开始对评级数据进行插值...")
-        interpolated_data = _interpolate_ratings(all_data)
-        print(f"[MSCI计算] 插值完成，数据形状: {interpolated_data.shape}")
-        
-        # 2. 识别日期列
-        date_columns = [col for col in interpolated_data.columns if str(col).startswith('202')]
-        date_columns.sort()
+        if prepared is not None:
+            interpolated_data = prepared.filled_frame
+            date_columns = prepared.date_columns
+        else:
+            logger.debug("[MSCI计算] 开始对评级数据进行插值...")
+            interpolated_data = _interpolate_ratings(all_data)
+            logger.debug("[MSCI计算] 插值完成，数据形状: %s", interpolated_data.shape)
+            
+            # 2. 识别日期列
+            date_columns = [col for col in interpolated_data.columns if str(col).startswith('202')]
+            date_columns.sort()
         
         if len(date_columns) < 5:
             return _get_insufficient_msci_data_result()
         
-        msci_history = []
-        
-        # 3. 逐日计算MSCI（使用插值后的数据）
-        for date_col in date_columns:
-            daily_msci = _calculate_daily_msci(interpolated_data, date_col)
-            if daily_msci:
-                msci_history.append(daily_msci)
-        
+        # 3. 一次性计算全部日期的MSCI（日期×评级直方图上的矩阵运算）
+        msci_history = _calculate_msci_history(interpolated_data, date_columns)
+
         if not msci_history:
             return _get_insufficient_msci_data_result()
         
@@ -507,6 +489,163 @@ def _calculate_daily_msci(data: pd.DataFrame, date_col: str) -> Optional[Dict]:
         return None
 
 
+# 直方图列布局：8级评级（大空=0 ... 大多=7）+ 配置中的其他评级 + '-' + 其他非空值 + 空值
+_BEARISH_RATINGS = ['大空', '中空', '小空', '微空']
+_BULLISH_RATINGS = ['微多', '小多', '中多', '大多']
+
+
+def _get_histogram_labels() -> List[str]:
+    """直方图中的评级列（不含'-'、其他值和空值列）"""
+    labels = _BEARISH_RATINGS + _BULLISH_RATINGS
+    for rating, score in RATING_SCORE_MAP.items():
+        if rating not in labels and rating != '-' and score is not None:
+            labels.append(rating)
+    return labels
+
+
+def _calculate_rating_histogram(data: pd.DataFrame, date_columns: List[str]) -> np.ndarray:
+    """
+    统计每个日期的评级分布（日期×评级 直方图）
+
+    对评级矩阵做一次编码，再用一次bincount得到全部日期的计数，
+    与逐日value_counts()结果一致。
+
+    Args:
+        data: 评级数据
+        date_columns: 已排序的日期列
+
+    Returns:
+        np.ndarray: 形状为 (日期数, 评级数 + 3) 的计数矩阵，
+            列顺序为 _get_histogram_labels() + ['-', 其他非空值, 空值]
+    """
+    labels = _get_histogram_labels()
+    n_labels = len(labels)
+    n_buckets = n_labels + 3
+    n_dates = len(date_columns)
+
+    if n_dates == 0 or len(data) == 0:
+        return np.zeros((n_dates, n_buckets), dtype=np.int64)
+
+    values = data[date_columns].to_numpy(dtype=object).ravel()
+    codes = pd.Index(labels + ['-']).get_indexer(values).astype(np.int64)
+
+    # 未命中分类的值区分为"其他非空值"和"空值"
+    unmatched = np.flatnonzero(codes < 0)
+    if len(unmatched):
+        codes[unmatched] = np.where(pd.isna(values[unmatched]), n_labels + 2, n_labels + 1)
+
+    # 按列展开后每个元素的日期序号
+    date_index = np.tile(np.arange(n_dates, dtype=np.int64), len(data))
+    counts = np.bincount(date_index * n_buckets + codes, minlength=n_dates * n_buckets)
+    return counts.reshape(n_dates, n_buckets)
+
+
+def _calculate_msci_from_histogram(counts: np.ndarray, total_stocks) -> Dict[str, np.ndarray]:
+    """
+    基于日期×评级直方图向量化计算全部日期的MSCI分量
+
+    与 _calculate_daily_msci 的逐日计算口径一致。
+
+    Args:
+        counts: _calculate_rating_histogram 返回的计数矩阵
+        total_stocks: 股票总数（标量，或与日期数等长的数组）
+
+    Returns:
+        dict: 各分量的数组（长度为日期数），'valid' 标记样本是否充足
+    """
+    labels = _get_histogram_labels()
+    n_labels = len(labels)
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, n_labels + 3)
+    column = {label: i for i, label in enumerate(labels)}
+
+    missing_count = counts[:, n_labels]
+    total_rated = counts[:, :n_labels + 2].sum(axis=1) - missing_count
+    bullish_count = counts[:, [column[r] for r in _BULLISH_RATINGS]].sum(axis=1)
+    bearish_count = counts[:, [column[r] for r in _BEARISH_RATINGS]].sum(axis=1)
+
+    scores = np.array([RATING_SCORE_MAP.get(label) or 0.0 for label in labels], dtype=np.float64)
+    weighted_score = counts[:, :n_labels] @ scores
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_stocks = np.broadcast_to(np.asarray(total_stocks, dtype=np.float64), (len(counts),))
+        stocks = np.where(total_stocks > 0, total_stocks, np.nan)
+        interpolation_ratio = np.where(total_stocks > 0, missing_count / stocks, 0.0)
+        bull_bear_ratio = np.where(bearish_count > 0, bullish_count / np.maximum(bearish_count, 1), 10.0)
+        avg_sentiment = np.where(total_rated > 0, weighted_score / np.maximum(total_rated, 1), 50.0)
+        participation = total_rated / stocks
+        extreme_bull = counts[:, column['大多']] / stocks > 0.02
+        extreme_bear = counts[:, column['中空']] / stocks > 0.25
+
+    sentiment_norm = (avg_sentiment - 12.5) / 87.5
+    ratio_norm = np.minimum(bull_bear_ratio / 2.0, 1.0)
+    participation_norm = np.minimum(participation / 0.5, 1.0)
+
+    msci = (sentiment_norm * 0.5 + ratio_norm * 0.3 + participation_norm * 0.2) * 100
+    msci = np.where(extreme_bull, np.minimum(msci + 10, 100), msci)
+    msci = np.where(extreme_bear, np.maximum(msci - 15, 0), msci)
+
+    return {
+        'valid': total_rated >= 30,
+        'msci': msci,
+        'sentiment_score': avg_sentiment,
+        'bull_bear_ratio': bull_bear_ratio,
+        'participation': participation,
+        'extreme_bull': extreme_bull,
+        'extreme_bear': extreme_bear,
+        'total_rated': total_rated,
+        'bullish_count': bullish_count,
+        'bearish_count': bearish_count,
+        'interpolation_ratio': interpolation_ratio,
+        'missing_count': missing_count,
+    }
+
+
+def _build_daily_msci_record(date_col: str, metrics: Dict[str, np.ndarray], i: int, total_stocks: int) -> Dict:
+    """把向量化结果的第i个日期转换为与 _calculate_daily_msci 相同格式的字典"""
+    interpolation_ratio = float(metrics['interpolation_ratio'][i])
+    extreme_bull = bool(metrics['extreme_bull'][i])
+    extreme_bear = bool(metrics['extreme_bear'][i])
+
+    data_quality_warnings = []
+    if interpolation_ratio > 0.3:  # 插值比例超过30%
+        data_quality_warnings.append(f"⚠️ 数据质量警告：插值比例过高 ({interpolation_ratio:.1%})")
+    if interpolation_ratio > 0.5:  # 插值比例超过50%
+        data_quality_warnings.append("🚨 严重警告：超过一半数据需要插值，结果可靠性较低")
+
+    return {
+        'date': date_col,
+        'msci': round(float(metrics['msci'][i]), 2),
+        'sentiment_score': round(float(metrics['sentiment_score'][i]), 2),
+        t_msci('bull_bear_ratio'): round(float(metrics['bull_bear_ratio'][i]), 2),
+        t_msci('participation'): round(float(metrics['participation'][i]), 3),
+        t_msci('extreme_state'): 'bull' if extreme_bull else 'bear' if extreme_bear else 'normal',
+        'total_rated': int(metrics['total_rated'][i]),
+        'bullish_count': int(metrics['bullish_count'][i]),
+        'bearish_count': int(metrics['bearish_count'][i]),
+        'interpolation_ratio': round(interpolation_ratio, 3),
+        t_msci('data_quality_warnings'): data_quality_warnings,
+        'total_stocks': total_stocks,
+        'missing_count': int(metrics['missing_count'][i])
+    }
+
+
+def _calculate_msci_history(data: pd.DataFrame, date_columns: List[str]) -> List[Dict]:
+    """
+    一次性计算所有日期的MSCI历史
+
+    等价于对每个日期调用 _calculate_daily_msci，样本不足的日期被跳过。
+    """
+    total_stocks = len(data)
+    counts = _calculate_rating_histogram(data, date_columns)
+    metrics = _calculate_msci_from_histogram(counts, total_stocks)
+
+    return [
+        _build_daily_msci_record(date_col, metrics, i, total_stocks)
+        for i, date_col in enumerate(date_columns)
+        if metrics['valid'][i]
+    ]
+
+
 def _calculate_msci_trend(msci_history: List[Dict]) -> float:
     """计算MSCI趋势变化"""
     if len(msci_history) < 10:
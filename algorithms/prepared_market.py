@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+市场数据预处理阶段 - RTSI、IRSI、MSCI三个阶段共用的只读预计算结果
+
+一次计算完成：
+1. 日期索引（升序日期列及其位置）
+2. 评级编码矩阵与双向填充后的评级矩阵
+3. 缺失/有效/指数行掩码
+4. 行业因子化结果（每个行业对应的行位置）
+
+三个阶段只读使用这些结果，避免各自重复识别日期列、映射评级和插值。
+"""
+
+import time
+import logging
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .msci_calculator import _fill_rating_values, _get_histogram_labels
+from .enhanced_msci_calculator import get_index_stock_mask
+
+logger = logging.getLogger(__name__)
+
+
+class PreparedMarket:
+    """
+    全市场评级数据的共享预计算结果（构建后只读）
+
+    Attributes:
+        data: 原始数据（不复制，调用方不应修改）
+        source_date_columns: 数据中日期列的原始顺序
+        date_columns: 升序排列的日期列
+        date_index: 日期列 -> 升序位置
+        codes / names / industries: 每行的股票代码、名称、行业
+        rating_labels: 编码矩阵使用的评级标签
+        encoded: 原始评级编码矩阵（股票×日期，-1表示缺失或未知评级）
+        filled: 双向填充后的评级编码矩阵
+        missing_mask: 原始评级缺失掩码（NaN或'-'）
+        valid_mask: 原始评级为已知评级的掩码
+        index_mask: 属于'指数'行业的行掩码
+        industry_codes: 每行的行业编号（-1表示无行业）
+        industry_labels: 行业编号 -> 行业名称
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        start_time = time.time()
+        self.data = data
+        self.source_date_columns = [col for col in data.columns if str(col).startswith('202')]
+        self.date_columns = sorted(self.source_date_columns)
+        self.date_index = {col: i for i, col in enumerate(self.date_columns)}
+
+        self.codes = self._column_values(data, '股票代码', '').astype(str)
+        self.names = self._column_values(data, '股票名称', '')
+        self.industries = self._column_values(data, '行业', None)
+
+        # 评级矩阵：原始值、缺失掩码、双向填充值
+        raw_values = data[self.date_columns].to_numpy(dtype=object)
+        self.missing_mask = pd.isna(raw_values) | (raw_values == '-')
+        self.filled_values = _fill_rating_values(raw_values, self.missing_mask)
+
+        # 评级编码（与MSCI直方图使用相同的标签顺序）
+        self.rating_labels = _get_histogram_labels()
+        self.encoded = self._encode(raw_values)
+        self.filled = self._encode(self.filled_values)
+        self.valid_mask = self.encoded >= 0
+
+        self.index_mask = get_index_stock_mask(data)
+
+        # 行业因子化：编号顺序与 unique() 的出现顺序一致，空行业为-1
+        if '行业' in data.columns:
+            self.industry_codes, self.industry_labels = pd.factorize(data['行业'])
+        else:
+            self.industry_codes, self.industry_labels = np.full(len(data), -1, dtype=np.int64), pd.Index([])
+        order = np.argsort(self.industry_codes, kind='stable')
+        boundaries = np.searchsorted(self.industry_codes[order], np.arange(len(self.industry_labels) + 1))
+        self._industry_rows = {
+            label: order[boundaries[i]:boundaries[i + 1]]
+            for i, label in enumerate(self.industry_labels)
+        }
+
+        self._filled_frame = None
+
+        elapsed = time.time() - start_time
+        logger.info(f"市场数据预处理完成: {len(data)}只股票, {len(self.date_columns)}个日期, "
+                    f"{len(self.industry_labels)}个行业, 耗时{elapsed:.3f}秒")
+
+    @staticmethod
+    def _column_values(data: pd.DataFrame, column: str, default) -> np.ndarray:
+        """取出一列为object数组，列不存在时填充默认值"""
+        if column in data.columns:
+            return data[column].to_numpy(dtype=object)
+        return np.full(len(data), default, dtype=object)
+
+    def _encode(self, values: np.ndarray) -> np.ndarray:
+        """评级字符串矩阵 -> int8编码矩阵（未知/缺失为-1）"""
+        if values.size == 0:
+            return np.full(values.shape, -1, dtype=np.int8)
+        codes = pd.Index(self.rating_labels).get_indexer(values.ravel())
+        return codes.reshape(values.shape).astype(np.int8)
+
+    @property
+    def filled_frame(self) -> pd.DataFrame:
+        """双向填充后的评级DataFrame（只含日期列，行索引与原始数据一致）"""
+        if self._filled_frame is None:
+            self._filled_frame = pd.DataFrame(self.filled_values, index=self.data.index,
+                                              columns=self.date_columns)
+        return self._filled_frame
+
+    def industry_rows(self, industry: str) -> np.ndarray:
+        """某行业的行位置（升序）"""
+        return self._industry_rows.get(industry, np.array([], dtype=np.int64))
+
+    def industry_frame(self, industry: str) -> pd.DataFrame:
+        """某行业的原始数据切片，等价于 data[data['行业'] == industry]"""
+        return self.data.iloc[self.industry_rows(industry)]
+
+    def iter_industries(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """按出现顺序遍历 (行业, 行位置)，不含空行业"""
+        return iter(self._industry_rows.items())
+
+    def industry_groups(self, exclude: List[str] = None) -> Dict[str, pd.DataFrame]:
+        """
+        一次性切分全部行业数据
+
+        Args:
+            exclude: 需要排除的行业名称
+
+        Returns:
+            {行业: 行业数据切片}
+        """
+        exclude = set(exclude or [])
+        return {
+            industry: self.data.iloc[rows]
+            for industry, rows in self._industry_rows.items()
+            if industry and industry not in exclude
+        }
+
+    def encode_block(self, start: int, stop: int) -> Dict:
+        """
+        把连续的一段股票打包为紧凑、可序列化的数据块（供工作进程使用）
+
+        评级以int8编码矩阵传输（'-'单独编码），编码无法表示的单元格
+        （空值或其他取值）原样放入稀疏表，decode_block可完全还原原始数据。
+
+        Args:
+            start: 起始行位置
+            stop: 结束行位置（不含）
+
+        Returns:
+            dict: 数据块
+        """
+        rows = self.data.iloc[start:stop]
+        dash_code = len(self.rating_labels)
+        codes = self.encoded[start:stop].copy()
+        codes[self.missing_mask[start:stop] & (codes < 0)] = -1
+        raw_values = rows[self.date_columns].to_numpy(dtype=object)
+        codes[raw_values == '-'] = dash_code
+
+        extras = {(int(i), int(j)): raw_values[i, j] for i, j in np.argwhere(codes < 0)}
+        return {
+            'columns': list(self.data.columns),
+            'meta': rows.drop(columns=self.date_columns),
+            'date_columns': list(self.date_columns),
+            'labels': list(self.rating_labels) + ['-'],
+            'codes': codes,
+            'extras': extras,
+        }
+
+    @staticmethod
+    def decode_block(block: Dict) -> pd.DataFrame:
+        """还原 encode_block 打包的数据块（列顺序与原始数据一致）"""
+        lookup = np.array(block['labels'] + [None], dtype=object)
+        values = lookup[block['codes']]  # -1 命中末尾占位，随后由稀疏表覆盖
+        for (i, j), value in block['extras'].items():
+            values[i, j] = value
+        meta = block['meta']
+        ratings = pd.DataFrame(values, index=meta.index, columns=block['date_columns'], dtype=object)
+        return pd.concat([meta, ratings], axis=1)[block['columns']]
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+个股排名列式表 - 把分析结果中的个股字典展开为按列存放的numpy数组
+
+构建一次（O(N)），之后：
+1. 筛选用布尔掩码组合（行业、趋势、大盘股、RTSI下限）
+2. 前N名用argpartition选出候选再对候选排序（O(N + n log n)）
+
+同分时保持原字典顺序，与 list.sort(reverse=True) 的稳定排序结果一致。
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def top_n_indices(scores: np.ndarray, n: int) -> np.ndarray:
+    """
+    分数最高的n个位置（降序，同分按位置升序）
+
+    Args:
+        scores: 一维分数数组
+        n: 返回数量
+
+    Returns:
+        np.ndarray: 位置数组（NaN分数排在最后）
+    """
+    scores = np.nan_to_num(np.asarray(scores, dtype=np.float64), nan=-np.inf)
+    total = len(scores)
+    n = min(int(n), total)
+    if n <= 0:
+        return np.array([], dtype=np.int64)
+
+    if n < total:
+        # 第n大的分数：严格大于它的全部入选，等于它的按位置补足
+        kth = np.partition(scores, total - n)[total - n]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:n - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(total)
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+class StockRankingTable:
+    """
+    个股排名列式表（构建后只读）
+
+    Attributes:
+        codes / names / industries / trends: 每只股票的代码、名称、行业、趋势（object数组）
+        rtsi: RTSI分数（无RTSI结果的股票为NaN）
+        confidence: RTSI置信度（缺失为NaN）
+        has_rtsi: 是否有RTSI结果（参与排名）
+        large_cap: 是否为大盘股
+    """
+
+    def __init__(self, stocks: Dict[str, Dict], rtsi_keys: Sequence[str],
+                 is_large_cap: Callable[[str], bool]):
+        """
+        Args:
+            stocks: {股票代码: 个股结果}
+            rtsi_keys: RTSI字典中分数字段的查找顺序
+            is_large_cap: 大盘股判断函数（每只股票只调用一次）
+        """
+        n = len(stocks)
+        self.codes = np.empty(n, dtype=object)
+        self.names = np.empty(n, dtype=object)
+        self.industries = np.empty(n, dtype=object)
+        self.trends = np.empty(n, dtype=object)
+        self.rtsi = np.full(n, np.nan)
+        self.confidence = np.full(n, np.nan)
+        self.has_rtsi = np.zeros(n, dtype=bool)
+        self.large_cap = np.zeros(n, dtype=bool)
+        self._positions: Dict[str, int] = {}
+
+        for i, (code, data) in enumerate(stocks.items()):
+            self.codes[i] = code
+            self.names[i] = data.get('name', '')
+            self.industries[i] = data.get('industry')
+            self.trends[i] = data.get('trend')
+            self.large_cap[i] = is_large_cap(code)
+            self._positions[code] = i
+
+            rtsi_data = data.get('rtsi')
+            if rtsi_data is None:
+                continue
+            self.has_rtsi[i] = True
+            self.rtsi[i] = self._score(rtsi_data, rtsi_keys)
+            if isinstance(rtsi_data, dict):
+                confidence = rtsi_data.get('confidence')
+                if isinstance(confidence, (int, float, np.number)):
+                    self.confidence[i] = float(confidence)
+
+    @staticmethod
+    def _score(value, keys: Sequence[str]) -> float:
+        """提取RTSI分数，非数值按0处理（与原排名逻辑一致）"""
+        if isinstance(value, dict):
+            score = 0
+            for key in keys:
+                if key in value:
+                    score = value[key]
+                    break
+        else:
+            score = value
+        if isinstance(score, (np.number, int, float)):
+            return float(score)
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def position(self, code: str) -> Optional[int]:
+        """股票代码所在行，不存在时返回None"""
+        return self._positions.get(code)
+
+    def mask(self, large_cap_only: bool = False, industry: Optional[str] = None,
+             trend: Optional[str] = None, min_rtsi: Optional[float] = None) -> np.ndarray:
+        """
+        组合筛选条件（只包含有RTSI结果的股票）
+
+        Args:
+            large_cap_only: 只保留大盘股
+            industry: 行业名称
+            trend: 趋势
+            min_rtsi: RTSI下限（含）
+
+        Returns:
+            np.ndarray: 布尔掩码
+        """
+        selected = self.has_rtsi.copy()
+        if large_cap_only:
+            selected &= self.large_cap
+        if industry is not None:
+            selected &= self.industries == industry
+        if trend is not None:
+            selected &= self.trends == trend
+        if min_rtsi is not None:
+            selected &= self.rtsi >= min_rtsi
+        return selected
+
+    def top(self, n: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        RTSI前n名的行位置
+
+        Args:
+            n: 返回数量
+            mask: 筛选掩码，为None时使用全部有RTSI结果的股票
+
+        Returns:
+            np.ndarray: 按RTSI降序的行位置
+        """
+        rows = np.flatnonzero(self.has_rtsi if mask is None else mask)
+        return rows[top_n_indices(self.rtsi[rows], n)]
+
+    def records(self, rows: np.ndarray) -> List[Tuple[str, str, float]]:
+        """行位置 -> [(代码, 名称, RTSI), ...]"""
+        return [(self.codes[i], self.names[i], float(self.rtsi[i])) for i in rows]
@@ -9,12 +9,14 @@ from config.gui_i18n import t_gui as _
 版本: 1.0.0
 """
 
+import queue
 import threading
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any, Callable
 import pandas as pd
 import numpy as np
 
@@ -23,6 +25,12 @@ from algorithms.rtsi_calculator import calculate_rating_trend_strength_index
 from algorithms.enhanced_rtsi_calculator import EnhancedRTSICalculator
 from algorithms.irsi_calculator import calculate_industry_relative_strength
 from algorithms.msci_calculator import calculate_market_sentiment_composite_index
+from algorithms.prepared_market import PreparedMarket
+from algorithms import results_snapshot
+from algorithms.ranking_table import StockRankingTable
+from algorithms.log_control import RateLimitedProgress, set_quiet
+from algorithms.results_diff import ResultsDiff, diff_results
+from data.large_cap import LargeCapClassifier, get_large_cap_classifier, is_large_cap_stock
 
 # 导入增强版TMA分析器
 try:
@@ -55,6 +63,64 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# 计算阶段及其依赖：MSCI只依赖原始评级，IRSI需要个股RTSI结果
+STAGE_STOCKS = 'stocks'
+STAGE_INDUSTRIES = 'industries'
+STAGE_MARKET = 'market'
+
+STAGE_DEPENDENCIES = {
+    STAGE_STOCKS: (),
+    STAGE_MARKET: (),
+    STAGE_INDUSTRIES: (STAGE_STOCKS,),
+}
+
+
+class CancellationToken:
+    """
+    协作式取消令牌（线程安全）
+    
+    调用方（如GUI线程）调用 cancel()，或设置的截止时间到期后，
+    引擎在阶段之间和数据块之间检查并停止，返回标记为部分结果的AnalysisResults。
+    """
+    
+    CANCELLED = 'cancelled'
+    DEADLINE = 'deadline'
+    
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Args:
+            timeout: 从现在起的截止秒数，None表示不限时
+        """
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.deadline: Optional[float] = None
+        if timeout is not None:
+            self.set_timeout(timeout)
+    
+    def set_timeout(self, timeout: float) -> None:
+        """设置截止时间（从现在起的秒数）"""
+        self.deadline = time.time() + timeout
+    
+    def cancel(self, reason: str = CANCELLED) -> None:
+        """请求取消"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def stop_reason(self) -> Optional[str]:
+        """已取消返回取消原因，截止时间已到返回'deadline'，否则返回None"""
+        if self._event.is_set():
+            return self.reason
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel(self.DEADLINE)
+            return self.reason
+        return None
+
+
 class AnalysisResults:
     """分析结果数据类"""
     
@@ -70,15 +136,54 @@ class AnalysisResults:
             'performance_metrics': {}
         }
         self.last_updated = datetime.now()
+        self._stock_table: Optional[StockRankingTable] = None
+        self._stock_table_source: Optional[Dict] = None
+        self.large_cap_classifier: Optional[LargeCapClassifier] = None
     
-    def get_top_stocks(self, metric: str = 'rtsi', top_n: int = 50, large_cap_only: bool = True) -> List[Tuple[str, str, float]]:
+    def __getstate__(self) -> Dict:
+        # 列式表和大盘股分类表可随时重建，不写入快照
+        state = self.__dict__.copy()
+        state['_stock_table'] = None
+        state['_stock_table_source'] = None
+        state['large_cap_classifier'] = None
+        return state
+    
+    @property
+    def stock_table(self) -> StockRankingTable:
+        """个股排名列式表（stocks字典被替换或增删后自动重建）"""
+        table = getattr(self, '_stock_table', None)
+        if (table is None or getattr(self, '_stock_table_source', None) is not self.stocks
+                or len(table) != len(self.stocks)):
+            table = StockRankingTable(self.stocks, [t_rtsi('rtsi'), 'RTSI', 'rtsi'], self._is_large_cap_stock)
+            self._stock_table = table
+            self._stock_table_source = self.stocks
+        return table
+    
+    def invalidate_stock_table(self) -> None:
+        """原地修改个股结果后调用，下次查询时重建列式表"""
+        self._stock_table = None
+    
+    def get_top_stocks(self, metric: str = 'rtsi', top_n: int = 50, large_cap_only: bool = True,
+                       industry: Optional[str] = None, trend: Optional[str] = None) -> List[Tuple[str, str, float]]:
         """获取指定指标的前N只股票
         
         Args:
             metric: 指标名称
             top_n: 返回数量
             large_cap_only: 是否只返回大盘股
+            industry: 只返回该行业的股票（仅rtsi指标）
+            trend: 只返回该趋势的股票（仅rtsi指标）
         """
+        if metric == 'rtsi':
+            try:
+                # 列式表：掩码筛选 + argpartition取前N
+                table = self.stock_table
+                rows = table.top(top_n, table.mask(large_cap_only=large_cap_only, industry=industry, trend=trend))
+                return table.records(rows)
+            except Exception as e:
+                logger.error(f"获取top stocks失败: {e}")
+                return []
+        
         try:
             stock_scores = []
             for code, data in self.stocks.items():
@@ -114,58 +219,11 @@ class AnalysisResults:
             return []
     
     def _is_large_cap_stock(self, stock_code: str) -> bool:
-        """判断是否为大盘股
-        
-        基于股票代码前缀和已知的大盘股规律判断：
-        - A股：以00、60开头的通常是大盘股
-        - 港股：00700(腾讯)、00939(建设银行)等知名大盘股
-        - 美股：AAPL、MSFT、GOOGL等知名大公司
-        """
-        code = str(stock_code).strip()
-        
-        # A股大盘股判断
-        if len(code) == 6 and code.isdigit():
-            # 主板股票通常是大盘股
-            if code.startswith('00') or code.startswith('60'):
-                return True
-            # 部分深市主板大盘股（001、002开头的部分股票）
-            if code.startswith('001') or code.startswith('002'):
-                # 可以在这里添加更精确的判断逻辑
-                return True
-        
-        # 港股大盘股判断（5位数字）
-        elif len(code) == 5 and code.isdigit():
-            # 知名港股大盘股代码
-            large_cap_hk_codes = {
-                '00700', '00939', '00388', '00005', '00001', '00002', '00003', '00004',
-                '00011', '00012', '00016', '00017', '00019', '00023', '00027', '00066',
-                '00083', '00101', '00135', '00144', '00151', '00175', '00267', '00288',
-                '00386', '00688', '00762', '00823', '00857', '00883', '00941', '00992',
-                '01038', '01044', '01088', '01093', '01109', '01113', '01171', '01177',
-                '01299', '01398', '01818', '01928', '01997', '02007', '02018', '02020',
-                '02202', '02318', '02319', '02382', '02388', '02628', '03328', '03988'
-            }
-            return code in large_cap_hk_codes
-        
-        # 美股大盘股判断（字母代码）
-        elif code.isalpha():
-            # 知名美股大盘股代码
-            large_cap_us_codes = {
-                'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
-                'BRK.A', 'BRK.B', 'UNH', 'JNJ', 'JPM', 'V', 'PG', 'HD', 'MA', 'PFE',
-                'ABBV', 'BAC', 'KO', 'AVGO', 'PEP', 'TMO', 'COST', 'DIS', 'ABT',
-                'MRK', 'ACN', 'VZ', 'CRM', 'DHR', 'ADBE', 'NKE', 'TXN', 'LIN',
-                'WMT', 'NEE', 'AMD', 'BMY', 'PM', 'RTX', 'QCOM', 'HON', 'T',
-                'UPS', 'ORCL', 'COP', 'MS', 'SCHW', 'LOW', 'CAT', 'GS', 'IBM',
-                'AXP', 'BLK', 'DE', 'ELV', 'LMT', 'SYK', 'TJX', 'MDT', 'ADP',
-                'GE', 'C', 'MDLZ', 'ISRG', 'REGN', 'CB', 'MMC', 'SO', 'PLD',
-                'NOW', 'ZTS', 'ICE', 'DUK', 'SHW', 'CMG', 'WM', 'GD', 'TGT',
-                'BDX', 'ITW', 'EOG', 'FIS', 'NSC', 'SRE', 'MU', 'BSX', 'FCX'
-            }
-            return code.upper() in large_cap_us_codes
-        
-        # 默认不是大盘股
-        return False
+        """判断是否为大盘股（引擎设置了市场分类表时查表，否则按代码推断市场后查表）"""
+        classifier = getattr(self, 'large_cap_classifier', None)
+        if classifier is not None:
+            return classifier.is_large_cap(stock_code)
+        return is_large_cap_stock(stock_code)
     
     def get_top_industries(self, metric: str = 'irsi', top_n: int = 20) -> List[Tuple[str, float]]:
         """获取指定指标的前N个行业"""
@@ -197,6 +255,18 @@ class AnalysisResults:
             logger.error(f"获取top industries失败: {e}")
             return []
     
+    def diff(self, previous: 'AnalysisResults') -> ResultsDiff:
+        """
+        与较早的结果比较（RTSI变化、趋势翻转、行业名次变化等）
+        
+        Args:
+            previous: 较早的分析结果
+            
+        Returns:
+            ResultsDiff: 差异对象
+        """
+        return diff_results(previous, self)
+    
     def to_dict(self) -> Dict:
         """转换为字典格式"""
         return {
@@ -208,6 +278,229 @@ class AnalysisResults:
         }
 
 
+def _detect_market_from_code(stock_code: str) -> str:
+    """根据股票代码格式判断市场类型（默认中国市场）"""
+    if stock_code:
+        # 中国股票：6位数字
+        if len(stock_code) == 6 and stock_code.isdigit():
+            return 'cn'
+        # 香港股票：5位数字（通常前面补0到6位）
+        elif len(stock_code) == 6 and stock_code.startswith('00') and stock_code[2:].isdigit():
+            return 'hk'
+        # 美国股票：字母+数字组合
+        elif not stock_code.isdigit():
+            return 'us'
+    return 'cn'
+
+
+def _calculate_stock_rtsi(stock_data: pd.Series, date_columns: List[str], market: str,
+                          smart_rtsi_calculator=None, enhanced_rtsi_calculator=None,
+                          arts_calculator=None) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    计算单只股票的RTSI（智能RTSI -> 增强RTSI -> 标准RTSI -> ARTS后备）
+    
+    多线程模式和多进程模式共用，保证两种模式输出一致。
+    
+    Args:
+        stock_data: 单只股票的数据行
+        date_columns: 日期列（数据中的原始顺序）
+        market: 市场类型 ('cn', 'hk', 'us')
+        smart_rtsi_calculator: 智能RTSI计算器（None表示不可用，下同）
+        enhanced_rtsi_calculator: 增强RTSI计算器
+        arts_calculator: ARTS后备计算器
+        
+    Returns:
+        (股票代码, 结果)，计算失败时为 (None, None)
+    """
+    try:
+        stock_code = str(stock_data['股票代码'])
+        stock_name = stock_data.get('股票名称', '')
+        industry = stock_data.get('行业', '未分类')
+        
+        # 优先使用智能RTSI算法（主算法）
+        rtsi_success = False
+        
+        # 计算RTSI - 使用智能RTSI计算器（如果可用）
+        if smart_rtsi_calculator is not None:
+            try:
+                # 使用智能RTSI计算器
+                rtsi_result = smart_rtsi_calculator.calculate_smart_rtsi(
+                    stock_data, 
+                    market=market, 
+                    stock_code=stock_code
+                )
+                rtsi_success = True
+                logger.debug("智能RTSI计算成功 %s: %s", stock_code, rtsi_result.get('algorithm', 'unknown'))
+            except Exception as e:
+                # 静默处理智能RTSI计算失败，回退到增强RTSI
+                logger.debug("智能RTSI计算失败 %s: %s", stock_code, e)
+                rtsi_success = False
+        
+        # 如果智能RTSI失败，尝试增强RTSI
+        if not rtsi_success and enhanced_rtsi_calculator is not None:
+            try:
+                # 使用增强RTSI计算器
+                rtsi_enhanced_result = enhanced_rtsi_calculator.batch_calculate_enhanced_rtsi(
+                    pd.DataFrame([stock_data])
+                )
+                if stock_code in rtsi_enhanced_result:
+                    rtsi_result = rtsi_enhanced_result[stock_code]
+                    rtsi_success = True
+                else:
+                    raise Exception("增强RTSI批量计算未返回结果")
+            except Exception as e:
+                # 静默处理增强RTSI计算失败，回退到标准RTSI
+                logger.debug("增强RTSI计算失败 %s: %s", stock_code, e)
+                rtsi_success = False
+        
+        # 如果智能RTSI和增强RTSI都失败，尝试标准RTSI
+        if not rtsi_success:
+            try:
+                # 使用AI增强RTSI作为主算法（默认启用）
+                ratings = stock_data[date_columns]
+                rtsi_result = calculate_rating_trend_strength_index(
+                    ratings, 
+                    stock_code=stock_code,
+                    stock_name=stock_name,
+                    enable_ai=True  # 确保使用AI增强主算法
+                )
+                rtsi_success = True
+            except Exception as e:
+                logger.warning("标准RTSI计算失败 %s: %s", stock_code, e)
+                rtsi_success = False
+        
+        # 如果RTSI失败且ARTS可用，使用ARTS作为后备
+        if not rtsi_success and arts_calculator is not None:
+            try:
+                logger.debug("🔄 %s 并行模式使用ARTS后备算法", stock_code)
+                ratings = stock_data[date_columns]
+                arts_result = arts_calculator.calculate_arts(ratings, stock_code)
+                
+                # 将ARTS结果转换为兼容RTSI的格式
+                rtsi_result = {
+                    'rtsi': arts_result.get('arts_score', 0),
+                    'trend': arts_result.get('trend_direction', 'unknown'),
+                    'confidence': arts_result.get('confidence_level', 'unknown'),
+                    'pattern': arts_result.get('trend_pattern', 'unknown'),
+                    'rating_level': arts_result.get('rating_level', 'unknown'),
+                    'recommendation': arts_result.get('recommendation', ''),
+                    'algorithm': 'ARTS_v1.0_backup',
+                    'recent_score': arts_result.get('recent_rating'),
+                    'data_points': arts_result.get('data_points', 0)
+                }
+                rtsi_success = True
+            except Exception as e:
+                logger.error(f"ARTS后备算法也失败 {stock_code}: {e}")
+        
+        # 如果所有算法都失败，使用默认结果
+        if not rtsi_success:
+            rtsi_result = {
+                'rtsi': 0,
+                'trend': 'unknown',
+                'confidence': 0,
+                'algorithm': 'fallback',
+                'recent_score': None,
+                'data_points': 0
+            }
+        
+        return stock_code, {
+            'name': stock_name,
+            'industry': industry,
+            'rtsi': rtsi_result,
+            'last_score': rtsi_result.get('recent_score'),
+            'trend': rtsi_result.get('trend', 'unknown')
+        }
+    except Exception as e:
+        logger.warning("计算股票RTSI失败 %s: %s", stock_data.get('股票代码', 'unknown'), e)
+        return None, None
+
+
+# 工作进程内的RTSI计算器（每个进程由 _init_rtsi_worker 创建一次）
+_worker_calculators = None
+
+
+def _init_rtsi_worker():
+    """
+    工作进程初始化：创建智能RTSI、增强RTSI和ARTS计算器
+    
+    进程内启用量价缓存，但只读本地数据源（预取结果和*-lj.dat.gz），不访问AKShare，
+    避免逐只计算时阻塞在网络请求上。
+    """
+    global _worker_calculators
+    smart_rtsi_calculator = enhanced_rtsi_calculator = arts_calculator = None
+    try:
+        from algorithms.smart_rtsi_algorithm import get_smart_rtsi_calculator
+        smart_rtsi_calculator = get_smart_rtsi_calculator(enable_cache=True, verbose=False)
+        if smart_rtsi_calculator.volume_cache is not None:
+            smart_rtsi_calculator.volume_cache.use_network = False
+    except Exception as e:
+        logger.warning(f"工作进程智能RTSI计算器初始化失败: {e}")
+    try:
+        enhanced_rtsi_calculator = EnhancedRTSICalculator()
+    except Exception as e:
+        logger.warning(f"工作进程增强RTSI计算器初始化失败: {e}")
+    try:
+        from algorithms.arts_calculator import ARTSCalculator
+        arts_calculator = ARTSCalculator()
+    except ImportError:
+        pass
+    _worker_calculators = (smart_rtsi_calculator, enhanced_rtsi_calculator, arts_calculator)
+
+
+def _calculate_rtsi_block(block: Dict, date_columns: List[str],
+                          market: Optional[str]) -> List[Tuple[Optional[str], Optional[Dict]]]:
+    """
+    工作进程：计算一个连续股票块的RTSI
+    
+    Args:
+        block: PreparedMarket.encode_block 打包的数据块
+        date_columns: 日期列（数据中的原始顺序）
+        market: 由文件名确定的市场类型，None时按股票代码判断
+        
+    Returns:
+        按行顺序排列的 (股票代码, 结果) 列表，失败的股票为 (None, None)
+    """
+    if _worker_calculators is None:
+        _init_rtsi_worker()
+    smart_rtsi_calculator, enhanced_rtsi_calculator, arts_calculator = _worker_calculators
+    
+    chunk = PreparedMarket.decode_block(block)
+    block_results = []
+    for _, stock_data in chunk.iterrows():
+        stock_market = market or _detect_market_from_code(str(stock_data.get('股票代码', '')))
+        block_results.append(_calculate_stock_rtsi(
+            stock_data, date_columns, stock_market,
+            smart_rtsi_calculator, enhanced_rtsi_calculator, arts_calculator
+        ))
+    return block_results
+
+
+def _diff_stock_rows(old_data: pd.DataFrame, new_data: pd.DataFrame) -> Tuple[set, set]:
+    """
+    按股票代码比较两份列结构相同的数据
+    
+    同一代码出现多次时以最后一行为准（与结果字典的覆盖顺序一致）。
+    
+    Returns:
+        (变化或新增的股票代码, 被删除的股票代码)
+    """
+    old_rows = old_data.set_index(old_data['股票代码'].astype(str))
+    new_rows = new_data.set_index(new_data['股票代码'].astype(str))
+    old_rows = old_rows[~old_rows.index.duplicated(keep='last')]
+    new_rows = new_rows[~new_rows.index.duplicated(keep='last')]
+    
+    common = new_rows.index.intersection(old_rows.index, sort=False)
+    columns = [col for col in new_data.columns if col != '股票代码']
+    new_values = new_rows.loc[common, columns].to_numpy(dtype=object)
+    old_values = old_rows.loc[common, columns].to_numpy(dtype=object)
+    same = (new_values == old_values) | (pd.isna(new_values) & pd.isna(old_values))
+    
+    changed = set(common[~same.all(axis=1)])
+    changed.update(new_rows.index.difference(old_rows.index, sort=False))
+    removed = set(old_rows.index.difference(new_rows.index, sort=False))
+    return changed, removed
+
+
 class RealtimeAnalysisEngine:
     """
     实时分析引擎
@@ -236,8 +529,17 @@ class RealtimeAnalysisEngine:
         self.enable_enhanced_tma = enable_enhanced_tma and ENHANCED_TMA_AVAILABLE
         self.top_n_leading_stocks = top_n_leading_stocks
         self.results_cache: Optional[AnalysisResults] = None
+        self.previous_results: Optional[AnalysisResults] = None  # 最近一次 update_analysis 之前的结果
         self.last_calculation_time: Optional[datetime] = None
         self.calculation_lock = threading.Lock()
+        self._incremental_msci = None
+        self._stage_callbacks: List[Callable[[str, Any, Optional[str]], None]] = []
+        self._partial_callbacks: List[Callable[[str, Dict], None]] = []
+        self._cancel_token: Optional[CancellationToken] = None
+        self._run_stop_reason: Optional[str] = None
+        # 运行中的阶段（按线程记录）和中途停止、结果不完整的阶段
+        self._stage_context = threading.local()
+        self._stopped_stages = set()
         
         # 初始化增强TMA分析器（如果启用）
         if self.enable_enhanced_tma:
@@ -259,80 +561,51 @@ class RealtimeAnalysisEngine:
         self.smart_rtsi_calculator = None
         self.enhanced_rtsi_calculator = None
         
-        print("=" * 60)
-        print("[诊断] 开始初始化 RTSI 计算器")
-        print("=" * 60)
-        
         try:
-            print("[诊断] 步骤1: 导入 smart_rtsi_algorithm 模块...")
             from .smart_rtsi_algorithm import get_smart_rtsi_calculator
-            print("[诊断] ✅ 模块导入成功")
             
             # 在多线程模式下禁用缓存以避免AKShare延迟
             enable_cache = not enable_multithreading
-            print(f"[诊断] 步骤2: 调用 get_smart_rtsi_calculator(enable_cache={enable_cache}, verbose=False)...")
             self.smart_rtsi_calculator = get_smart_rtsi_calculator(enable_cache=enable_cache, verbose=False)
-            print("[诊断] ✅ 智能RTSI计算器创建成功")
-            
-            logger.info(f"智能RTSI计算器已启用 (缓存: {enable_cache})")
-            print(f"[诊断] ✅ 智能RTSI计算器已启用 (缓存: {enable_cache})")
+            logger.info("智能RTSI计算器已启用 (缓存: %s)", enable_cache)
         except Exception as e:
-            logger.warning(f"智能RTSI计算器初始化失败: {e}")
-            print(f"[诊断] ❌ 智能RTSI计算器初始化失败: {e}")
-            import traceback
-            print("[诊断] 错误堆栈:")
-            traceback.print_exc()
-        
-        print("-" * 60)
+            logger.warning("智能RTSI计算器初始化失败: %s", e)
+            logger.debug("智能RTSI计算器初始化错误堆栈", exc_info=True)
             
         # 总是初始化增强RTSI计算器，用于批量计算
         try:
-            print("[诊断] 步骤3: 导入 EnhancedRTSICalculator...")
-            print("[诊断] ✅ EnhancedRTSICalculator 导入成功（已在文件开头导入）")
-            
-            print("[诊断] 步骤4: 创建 EnhancedRTSICalculator 实例...")
             self.enhanced_rtsi_calculator = EnhancedRTSICalculator()
-            print("[诊断] ✅ 增强RTSI计算器创建成功")
-            
             logger.info("增强RTSI计算器已启用")
-            print("[诊断] ✅ 增强RTSI计算器已启用")
         except Exception as e2:
-            logger.warning(f"增强RTSI计算器初始化失败，使用基础模式: {e2}")
-            print(f"[诊断] ❌ 增强RTSI计算器初始化失败: {e2}")
-            import traceback
-            print("[诊断] 错误堆栈:")
-            traceback.print_exc()
-        
-        print("=" * 60)
-        print(f"[诊断] RTSI 计算器初始化完成:")
-        print(f"  - smart_rtsi_calculator: {self.smart_rtsi_calculator}")
-        print(f"  - enhanced_rtsi_calculator: {self.enhanced_rtsi_calculator}")
-        print("=" * 60)
-        
-        # 配置参数 - 优化性能设置
+            logger.warning("增强RTSI计算器初始化失败，使用基础模式: %s", e2)
+            logger.debug("增强RTSI计算器初始化错误堆栈", exc_info=True)
+        
+        logger.debug("RTSI计算器初始化完成: smart=%s, enhanced=%s",
+                     self.smart_rtsi_calculator, self.enhanced_rtsi_calculator)
+        
+        # 配置参数 - 优化性能设置（config.py 中的 ENGINE_CONFIG 覆盖默认值）
+        default_config = {
+            'cache_ttl': 600,          # 缓存时间10分钟
+            'max_workers': 4,          # 最大工作线程/进程数
+            'chunk_size': 100,         # 多进程模式每个数据块的股票数
+            'timeout': 180,            # 适当的超时时间
+            'executor': 'process',     # 个股并行方式：'process' 分块多进程 / 'thread' 多线程
+            'incremental_msci': True,  # 增量MSCI（持久化每日直方图）
+            'concurrent_stages': True, # MSCI与个股RTSI并发计算
+            'result_snapshot': True,   # 按数据指纹持久化完整结果，重新打开同一文件时直接加载
+            'prefetch_volume_price': True,  # 个股RTSI阶段前按市场批量预取智能RTSI的量价数据
+            'quiet_logging': False,    # 静默模式：算法/数据模块只输出WARNING及以上
+            'progress_interval': 2.0   # 进度日志的最小输出间隔(秒)
+        }
         try:
-            self.config = get_config('engine', {
-                'cache_ttl': 600,  # 增加缓存时间到10分钟
-                'max_workers': 4,  # 适当增加线程数以提高并行度
-                'chunk_size': 100, # 增加批处理大小
-                'timeout': 180     # 适当的超时时间
-            })
-            # 如果get_config返回None，使用默认配置
-            if self.config is None:
-                self.config = {
-                    'cache_ttl': 600,
-                    'max_workers': 4,
-                    'chunk_size': 100,
-                    'timeout': 180
-                }
+            engine_config = get_config('engine')
+            self.config = {**default_config, **(engine_config or {})}
         except Exception:
             # 如果配置获取失败，使用默认配置
-            self.config = {
-                'cache_ttl': 600,
-                'max_workers': 4,
-                'chunk_size': 100,
-                'timeout': 180
-            }
+            self.config = default_config
+        
+        if self.config.get('quiet_logging'):
+            set_quiet(True)
         
         # 性能统计
         self.performance_stats = {
@@ -349,44 +622,47 @@ class RealtimeAnalysisEngine:
         """检测股票所属市场类型"""
         try:
             # 优先从数据源的文件路径判断
-            if hasattr(self.data_source, 'file_path') and self.data_source.file_path:
-                file_name = os.path.basename(self.data_source.file_path).lower()
-                if file_name.startswith('cn'):
-                    return 'cn'
-                elif file_name.startswith('hk'):
-                    return 'hk'
-                elif file_name.startswith('us'):
-                    return 'us'
+            market = self._market_from_file_path()
+            if market:
+                return market
             
             # 从股票代码格式判断
-            stock_code = str(stock_data.get('股票代码', ''))
-            if stock_code:
-                # 中国股票：6位数字
-                if len(stock_code) == 6 and stock_code.isdigit():
-                    return 'cn'
-                # 香港股票：5位数字（通常前面补0到6位）
-                elif len(stock_code) == 6 and stock_code.startswith('00') and stock_code[2:].isdigit():
-                    return 'hk'
-                # 美国股票：字母+数字组合
-                elif not stock_code.isdigit():
-                    return 'us'
-            
-            # 默认返回中国市场
-            return 'cn'
+            return _detect_market_from_code(str(stock_data.get('股票代码', '')))
             
         except Exception as e:
             logger.debug(f"市场类型检测失败: {e}")
             return 'cn'
     
-    def calculate_all_metrics(self, force_refresh: bool = False, enable_emergency_timeout: bool = True) -> AnalysisResults:
+    def _get_large_cap_classifier(self) -> Optional[LargeCapClassifier]:
+        """当前市场的大盘股分类表（每个市场只构建一次）"""
+        try:
+            market = self._market_from_file_path() or getattr(self.data_source, 'market_type', None)
+            return get_large_cap_classifier(market) if market else None
+        except Exception as e:
+            logger.warning(f"大盘股分类表不可用: {e}")
+            return None
+    
+    def _market_from_file_path(self) -> Optional[str]:
+        """根据数据文件名判断市场类型，无法判断时返回None"""
+        if hasattr(self.data_source, 'file_path') and self.data_source.file_path:
+            file_name = os.path.basename(self.data_source.file_path).lower()
+            for market in ('cn', 'hk', 'us'):
+                if file_name.startswith(market):
+                    return market
+        return None
+    
+    def calculate_all_metrics(self, force_refresh: bool = False, enable_emergency_timeout: bool = True,
+                              cancel_token: Optional[CancellationToken] = None) -> AnalysisResults:
         """
         计算所有指标
         
         Args:
             force_refresh: 是否强制刷新缓存
+            enable_emergency_timeout: 是否启用截止时间（config['timeout']秒），到期后停止并返回部分结果
+            cancel_token: 取消令牌，取消后引擎在阶段和数据块之间停止并返回部分结果
             
         Returns:
-            完整的分析结果
+            分析结果；提前停止时 metadata['partial'] 为True，metadata['stop_reason'] 为停止原因
         """
         start_time = time.time()
         
@@ -406,29 +682,53 @@ class RealtimeAnalysisEngine:
                 if raw_data is None or raw_data.empty:
                     raise ValueError("数据源为空")
                 
+                # 数据、算法和配置均未变化时直接使用磁盘快照
+                if not force_refresh:
+                    snapshot = self._load_snapshot(raw_data)
+                    if snapshot is not None:
+                        self.results_cache = snapshot
+                        self.last_calculation_time = datetime.now()
+                        for stage in STAGE_DEPENDENCIES:
+                            self._notify_stage(stage, getattr(snapshot, stage))
+                        logger.info(f"使用结果快照: {len(snapshot.stocks)}只股票, {len(snapshot.industries)}个行业, "
+                                    f"耗时{time.time() - start_time:.2f}秒")
+                        return snapshot
+                
                 # 创建结果对象
                 results = AnalysisResults()
+                results.large_cap_classifier = self._get_large_cap_classifier()
+                
+                # 共享预处理：日期索引、评级矩阵、掩码和行业分组只计算一次
+                prepared = PreparedMarket(raw_data)
                 
-                # 紧急超时检查
-                if enable_emergency_timeout:
-                    emergency_timeout = 180  # 3分钟紧急超时
+                # 取消令牌和截止时间（在阶段和数据块之间检查）
+                token = cancel_token if cancel_token is not None else CancellationToken()
+                if enable_emergency_timeout and token.deadline is None:
+                    emergency_timeout = self.config.get('timeout', 180)
+                    token.set_timeout(emergency_timeout)
                     logger.info(f"启用紧急超时机制: {emergency_timeout}秒")
+                self._cancel_token = token
+                self._run_stop_reason = None
                 
                 # 多线程或单线程计算
-                calculation_start = time.time()
-                if self.enable_multithreading:
-                    results = self._calculate_multithreaded(raw_data, results)
-                else:
-                    results = self._calculate_single_threaded(raw_data, results)
-                
-                # 检查是否超过紧急超时
-                if enable_emergency_timeout and (time.time() - calculation_start) > emergency_timeout:
-                    logger.warning(f"计算超过紧急超时时间 {emergency_timeout}秒，可能存在问题")
-                    # 不抛出异常，但记录警告
+                try:
+                    if self.enable_multithreading:
+                        results = self._calculate_multithreaded(raw_data, results, prepared)
+                    else:
+                        results = self._calculate_single_threaded(raw_data, results, prepared)
+                finally:
+                    self._cancel_token = None
                 
-                # 更新缓存和统计
-                self.results_cache = results
-                self.last_calculation_time = datetime.now()
+                # 提前停止（有计算被跳过）：返回部分结果，不写入缓存
+                stop_reason = self._run_stop_reason
+                if stop_reason:
+                    results.metadata['partial'] = True
+                    results.metadata['stop_reason'] = stop_reason
+                    logger.warning(f"计算提前停止({stop_reason})，返回部分结果: "
+                                   f"已完成阶段 {results.metadata.get('completed_stages', [])}")
+                else:
+                    self.results_cache = results
+                    self.last_calculation_time = datetime.now()
                 self.performance_stats['total_calculations'] += 1
                 
                 # 计算性能指标
@@ -441,6 +741,9 @@ class RealtimeAnalysisEngine:
                 results.metadata['cache_hit_rate'] = self._get_cache_hit_rate()
                 results.metadata['performance_metrics'] = self.performance_stats.copy()
                 
+                if not stop_reason:
+                    self._save_snapshot(raw_data, results)
+                
                 logger.info(f"计算完成: {len(results.stocks)}只股票, {len(results.industries)}个行业, 耗时{calculation_time:.2f}秒")
                 
                 return results
@@ -450,158 +753,367 @@ class RealtimeAnalysisEngine:
                 logger.error(f"计算失败: {e}")
                 raise
     
-    def _calculate_multithreaded(self, raw_data: pd.DataFrame, results: AnalysisResults) -> AnalysisResults:
-        """多线程计算模式"""
-        logger.info("使用多线程计算模式")
+    def add_stage_callback(self, callback: Callable[[str, Any, Optional[str]], None]) -> None:
+        """
+        订阅阶段完成通知
         
-        # 1. 多线程计算个股RTSI
-        results.stocks = self._calculate_stocks_rtsi_parallel(raw_data)
+        Args:
+            callback: callback(stage, result, error)，stage为 'stocks'/'industries'/'market'，
+                成功时error为None；失败或因依赖失败而跳过时result为None、error为错误信息；
+                因取消/超时未开始或中途停止时result为None、error为"计算已停止: 原因"
+                （中途停止的部分结果仍保留在返回的AnalysisResults中）。
+                回调在计算线程中执行。
+        """
+        if callback not in self._stage_callbacks:
+            self._stage_callbacks.append(callback)
+    
+    def remove_stage_callback(self, callback: Callable[[str, Any, Optional[str]], None]) -> None:
+        """取消订阅阶段完成通知"""
+        if callback in self._stage_callbacks:
+            self._stage_callbacks.remove(callback)
+    
+    def add_partial_callback(self, callback: Callable[[str, Dict], None]) -> None:
+        """
+        订阅阶段内的部分结果（个股RTSI每完成一个数据块推送一次）
         
-        # 2. 计算行业IRSI (基于已计算的个股结果)
-        results.industries = self._calculate_industries_irsi(raw_data, results.stocks)
+        Args:
+            callback: callback(stage, chunk)，目前只有stage为 'stocks'，chunk为本块的
+                {股票代码: 个股结果}。重复代码可能在后续数据块中再次出现，以后到的为准
+                （与最终结果一致）。阶段完成后仍会通过 add_stage_callback 推送完整结果。
+                回调在计算线程中执行。
+        """
+        if callback not in self._partial_callbacks:
+            self._partial_callbacks.append(callback)
+    
+    def remove_partial_callback(self, callback: Callable[[str, Dict], None]) -> None:
+        """取消订阅部分结果"""
+        if callback in self._partial_callbacks:
+            self._partial_callbacks.remove(callback)
+    
+    def iter_results(self, force_refresh: bool = False, enable_emergency_timeout: bool = True,
+                     cancel_token: Optional[CancellationToken] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        在后台线程中计算，按完成顺序逐步产出结果
         
-        # 3. 计算市场MSCI
-        results.market = self._calculate_market_msci(raw_data)
+        产出 (类型, 内容)：
+        - ('stocks', {股票代码: 个股结果})：个股数据块，可出现多次
+        - ('industries', 行业结果) / ('market', 市场结果)：阶段完成时各一次
+        - ('done', AnalysisResults)：最后一项
         
-        return results
+        命中内存缓存时没有阶段通知，此时在 'done' 之前按阶段补发完整结果。
+        提前关闭迭代器会取消计算。
+        
+        Args:
+            force_refresh: 是否强制刷新缓存
+            enable_emergency_timeout: 是否启用截止时间
+            cancel_token: 取消令牌，为None时内部创建
+            
+        Raises:
+            计算失败时抛出计算线程中的异常
+        """
+        token = cancel_token if cancel_token is not None else CancellationToken()
+        items: queue.Queue = queue.Queue()
+        streamed_stages = set()
+        yielded_stages = set()
+        
+        def on_partial(stage: str, chunk: Dict) -> None:
+            streamed_stages.add(stage)
+            items.put((stage, chunk))
+        
+        def on_stage(stage: str, result: Any, error: Optional[str]) -> None:
+            # 已经按数据块推送过的阶段不再重复推送完整结果
+            if error is None and stage not in streamed_stages:
+                items.put((stage, result))
+        
+        def run() -> None:
+            try:
+                items.put(('done', self.calculate_all_metrics(force_refresh, enable_emergency_timeout, token)))
+            except Exception as e:
+                items.put(('error', e))
+        
+        self.add_partial_callback(on_partial)
+        self.add_stage_callback(on_stage)
+        worker = threading.Thread(target=run, name='engine-iter-results', daemon=True)
+        try:
+            worker.start()
+            while True:
+                kind, payload = items.get()
+                if kind == 'error':
+                    raise payload
+                if kind == 'done':
+                    for stage in STAGE_DEPENDENCIES:
+                        if stage not in yielded_stages and getattr(payload, stage, None):
+                            yield stage, getattr(payload, stage)
+                    yield kind, payload
+                    return
+                yielded_stages.add(kind)
+                yield kind, payload
+        finally:
+            if worker.is_alive():
+                token.cancel()
+            self.remove_partial_callback(on_partial)
+            self.remove_stage_callback(on_stage)
+    
+    def cancel(self, reason: str = CancellationToken.CANCELLED) -> None:
+        """取消正在进行的计算（可从其他线程调用）"""
+        token = self._cancel_token
+        if token is not None:
+            token.cancel(reason)
+            logger.info(f"已请求取消计算: {reason}")
+    
+    def _stop_reason(self, stage: Optional[str] = None) -> Optional[str]:
+        """
+        检查点：返回当前计算的停止原因（未取消且未超时返回None）
+        
+        调用方在返回非None时应跳过剩余工作，本次计算随之标记为部分结果，
+        所在阶段（stage，默认为当前线程正在运行的阶段）标记为未完成。
+        """
+        token = self._cancel_token
+        stop_reason = token.stop_reason() if token is not None else None
+        if stop_reason:
+            self._run_stop_reason = stop_reason
+            stage = stage or getattr(self._stage_context, 'stage', None)
+            if stage:
+                self._stopped_stages.add(stage)
+        return stop_reason
+    
+    def _notify_stage(self, stage: str, result: Any, error: Optional[str] = None) -> None:
+        """通知所有订阅者（订阅者异常不影响计算）"""
+        for callback in list(self._stage_callbacks):
+            try:
+                callback(stage, result, error)
+            except Exception as e:
+                logger.warning(f"阶段回调执行失败 {stage}: {e}")
     
-    def _calculate_single_threaded(self, raw_data: pd.DataFrame, results: AnalysisResults) -> AnalysisResults:
-        """单线程计算模式"""
+    def _publish_partial(self, stage: str, chunk: Dict) -> None:
+        """推送阶段内的部分结果（无订阅者或数据块为空时不做任何事）"""
+        if not chunk:
+            return
+        for callback in list(self._partial_callbacks):
+            try:
+                callback(stage, chunk)
+            except Exception as e:
+                logger.warning(f"部分结果回调执行失败 {stage}: {e}")
+    
+    def _calculate_multithreaded(self, raw_data: pd.DataFrame, results: AnalysisResults,
+                                 prepared: PreparedMarket = None) -> AnalysisResults:
+        """多线程计算模式（三个阶段只读共享同一份预处理结果）"""
+        logger.info("使用多线程计算模式")
+        return self._run_stages(raw_data, results, prepared)
+    
+    def _calculate_single_threaded(self, raw_data: pd.DataFrame, results: AnalysisResults,
+                                   prepared: PreparedMarket = None) -> AnalysisResults:
+        """单线程计算模式（个股RTSI顺序计算，三个阶段只读共享同一份预处理结果）"""
         logger.info("使用单线程计算模式")
+        return self._run_stages(raw_data, results, prepared)
+    
+    def _run_stages(self, raw_data: pd.DataFrame, results: AnalysisResults,
+                    prepared: PreparedMarket = None) -> AnalysisResults:
+        """
+        按依赖关系调度三个计算阶段
+        
+        依赖满足的阶段立即提交：个股RTSI与市场MSCI并发执行，
+        行业IRSI在个股RTSI完成后立即开始。每个阶段完成后通知订阅者。
+        config['concurrent_stages']为False时在当前线程按依赖顺序逐个执行。
+        
+        Args:
+            raw_data: 原始数据
+            results: 待填充的结果对象
+            prepared: 共享预处理结果，为None时在此构建
+            
+        Returns:
+            填充后的结果对象（有阶段失败时抛出第一个失败阶段的异常）
+        """
+        if prepared is None:
+            prepared = PreparedMarket(raw_data)
+        
+        stage_functions = {
+            STAGE_STOCKS: lambda: self._calculate_stocks_rtsi(raw_data, prepared),
+            STAGE_INDUSTRIES: lambda: self._calculate_industries_irsi(raw_data, results.stocks, prepared),
+            STAGE_MARKET: lambda: self._calculate_market_msci(raw_data, prepared),
+        }
+        
+        pending = dict(STAGE_DEPENDENCIES)
+        completed = set()
+        failures: Dict[str, Exception] = {}
+        stage_times: Dict[str, float] = {}
+        self._stopped_stages = set()
+        
+        def take_ready_stages() -> List[str]:
+            """取出依赖已满足的阶段；依赖失败或计算已停止时阶段直接标记为跳过"""
+            stop_reason = self._stop_reason() if pending else None
+            if stop_reason:
+                for stage in list(pending):
+                    del pending[stage]
+                    logger.warning(f"计算已停止({stop_reason})，跳过阶段 {stage}")
+                    self._notify_stage(stage, None, f"计算已停止: {stop_reason}")
+                return []
+            
+            ready = []
+            for stage, dependencies in list(pending.items()):
+                failed_dependencies = [dep for dep in dependencies if dep in failures]
+                if failed_dependencies:
+                    del pending[stage]
+                    record_stage(stage, error=RuntimeError(f"依赖阶段失败: {', '.join(failed_dependencies)}"))
+                elif all(dep in completed for dep in dependencies):
+                    del pending[stage]
+                    ready.append(stage)
+            return ready
+        
+        def run_stage(stage: str) -> Any:
+            stage_start = time.time()
+            self._stage_context.stage = stage
+            try:
+                stage_result = stage_functions[stage]()
+            finally:
+                self._stage_context.stage = None
+            stage_times[stage] = time.time() - stage_start
+            logger.info(f"阶段 {stage} 完成，耗时{stage_times[stage]:.2f}秒")
+            return stage_result
+        
+        def record_stage(stage: str, stage_result: Any = None, error: Exception = None) -> None:
+            """登记阶段结果并通知订阅者"""
+            if error is not None:
+                failures[stage] = error
+                logger.error(f"阶段 {stage} 未完成: {error}")
+                self._notify_stage(stage, None, str(error))
+            elif stage in self._stopped_stages:
+                # 中途停止：保留已计算的部分结果，但不算完成，按停止通知订阅者
+                setattr(results, stage, stage_result)
+                logger.warning(f"阶段 {stage} 中途停止({self._run_stop_reason})，只有部分结果")
+                self._notify_stage(stage, None, f"计算已停止: {self._run_stop_reason}")
+            else:
+                setattr(results, stage, stage_result)
+                completed.add(stage)
+                self._notify_stage(stage, stage_result)
         
-        # 1. 计算个股RTSI
-        results.stocks = self._calculate_stocks_rtsi_sequential(raw_data)
+        if not self.config.get('concurrent_stages', True):
+            # 顺序模式：在当前线程按依赖顺序逐个执行
+            while pending:
+                ready = take_ready_stages()
+                if not ready:
+                    break
+                for stage in ready:
+                    try:
+                        record_stage(stage, run_stage(stage))
+                    except Exception as e:
+                        record_stage(stage, error=e)
+        else:
+            with ThreadPoolExecutor(max_workers=len(STAGE_DEPENDENCIES)) as executor:
+                running = {}
+                while pending or running:
+                    for stage in take_ready_stages():
+                        running[executor.submit(run_stage, stage)] = stage
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        try:
+                            record_stage(stage, future.result())
+                        except Exception as e:
+                            record_stage(stage, error=e)
         
-        # 2. 计算行业IRSI
-        results.industries = self._calculate_industries_irsi(raw_data, results.stocks)
+        results.metadata['completed_stages'] = [stage for stage in STAGE_DEPENDENCIES if stage in completed]
+        results.metadata['stage_times'] = stage_times
         
-        # 3. 计算市场MSCI
-        results.market = self._calculate_market_msci(raw_data)
+        if failures:
+            # 与原先一致：任一阶段失败时整体计算失败
+            first_failure = next(iter(failures.values()))
+            raise first_failure
         
         return results
     
-    def _calculate_stocks_rtsi_parallel(self, raw_data: pd.DataFrame) -> Dict[str, Dict]:
+    def _calculate_stocks_rtsi(self, raw_data: pd.DataFrame,
+                               prepared: PreparedMarket = None) -> Dict[str, Dict]:
+        """按引擎模式（并行/顺序）计算个股RTSI"""
+        self._prefetch_volume_price(raw_data)
+        if self.enable_multithreading:
+            return self._calculate_stocks_rtsi_parallel(raw_data, prepared)
+        return self._calculate_stocks_rtsi_sequential(raw_data, prepared)
+    
+    def _uses_volume_price_cache(self) -> bool:
+        """个股RTSI计算是否会逐只读取量价缓存（只有并行模式使用智能RTSI）"""
+        if self.smart_rtsi_calculator is None or not self.enable_multithreading:
+            return False
+        # 工作进程中的智能RTSI计算器总是启用量价缓存
+        if self.config.get('executor', 'process') == 'process':
+            return True
+        return getattr(self.smart_rtsi_calculator, 'volume_cache', None) is not None
+    
+    def _prefetch_volume_price(self, raw_data: pd.DataFrame) -> None:
+        """
+        个股RTSI阶段前一次性预取量价数据
+        
+        按市场分组，每个市场一次批量查询本地数据源（不访问网络），没有本地数据文件的
+        市场直接跳过；完成后写入磁盘缓存，多进程模式的工作进程直接加载，
+        逐只计算时不再阻塞在I/O上。每个市场之前检查取消和截止时间。
+        """
+        if not self.config.get('prefetch_volume_price', True) or not self._uses_volume_price_cache():
+            return
+        if '股票代码' not in raw_data.columns or self._stop_reason():
+            return
+        
+        try:
+            from cache.volume_price_cache import get_cache_manager
+            from .smart_rtsi_algorithm import VOLUME_PRICE_DAYS
+            
+            file_market = self._market_from_file_path()
+            groups: Dict[str, List[str]] = {}
+            for stock_code in raw_data['股票代码'].astype(str):
+                groups.setdefault(file_market or _detect_market_from_code(stock_code), []).append(stock_code)
+            
+            cache_manager = getattr(self.smart_rtsi_calculator, 'volume_cache', None) or get_cache_manager()
+            prefetch_start = time.time()
+            loaded = 0
+            for market, stock_codes in groups.items():
+                if self._stop_reason():
+                    break
+                if not cache_manager.has_local_source(market):
+                    logger.debug("%s市场没有本地量价数据文件，跳过预取", market.upper())
+                    continue
+                loaded += sum(cache_manager.prefetch_data(stock_codes, market, VOLUME_PRICE_DAYS,
+                                                          use_network=False,
+                                                          should_stop=self._stop_reason).values())
+            cache_manager.save_cache()
+            logger.info(f"量价数据预取完成: {loaded}/{len(raw_data)}只股票, "
+                        f"耗时{time.time() - prefetch_start:.2f}秒")
+        except Exception as e:
+            logger.warning(f"量价数据预取失败，逐只获取: {e}")
+    
+    def _calculate_stocks_rtsi_parallel(self, raw_data: pd.DataFrame,
+                                        prepared: PreparedMarket = None) -> Dict[str, Dict]:
         """多线程并行计算个股RTSI（支持ARTS算法）"""
         stocks_results = {}
-        date_columns = [col for col in raw_data.columns if str(col).startswith('202')]
+        if prepared is not None:
+            date_columns = prepared.source_date_columns
+        else:
+            date_columns = [col for col in raw_data.columns if str(col).startswith('202')]
+        
+        # 分块多进程模式（不适用或失败时继续使用多线程）
+        if self.config.get('executor', 'process') == 'process':
+            process_results = self._calculate_stocks_rtsi_processes(raw_data, prepared)
+            if process_results is not None:
+                return process_results
         
         # 导入ARTS算法作为后备
         try:
             from algorithms.arts_calculator import ARTSCalculator
             arts_calculator = ARTSCalculator()
-            arts_available = True
         except ImportError:
             logger.warning("⚠️ ARTS算法不可用")
-            arts_available = False
             arts_calculator = None
         
         logger.info("📊 并行模式使用RTSI算法进行个股分析（主算法）")
         
         def calculate_single_stock(stock_data):
-            try:
-                stock_code = str(stock_data['股票代码'])
-                stock_name = stock_data.get('股票名称', '')
-                industry = stock_data.get('行业', '未分类')
-                
-                # 优先使用智能RTSI算法（主算法）
-                rtsi_success = False
-                
-                # 计算RTSI - 使用智能RTSI计算器（如果可用）
-                if hasattr(self, 'smart_rtsi_calculator') and self.smart_rtsi_calculator is not None:
-                    try:
-                        # 确定市场类型
-                        market = self._detect_market_type(stock_data)
-                        
-                        # 使用智能RTSI计算器
-                        rtsi_result = self.smart_rtsi_calculator.calculate_smart_rtsi(
-                            stock_data, 
-                            market=market, 
-                            stock_code=stock_code
-                        )
-                        rtsi_success = True
-                        logger.debug(f"智能RTSI计算成功 {stock_code}: {rtsi_result.get('algorithm', 'unknown')}")
-                    except Exception as e:
-                        # 静默处理智能RTSI计算失败，回退到增强RTSI
-                        logger.debug(f"智能RTSI计算失败 {stock_code}: {e}")
-                        rtsi_success = False
-                
-                # 如果智能RTSI失败，尝试增强RTSI
-                if not rtsi_success and hasattr(self, 'enhanced_rtsi_calculator') and self.enhanced_rtsi_calculator is not None:
-                    try:
-                        # 使用增强RTSI计算器
-                        rtsi_enhanced_result = self.enhanced_rtsi_calculator.batch_calculate_enhanced_rtsi(
-                            pd.DataFrame([stock_data])
-                        )
-                        if stock_code in rtsi_enhanced_result:
-                            rtsi_result = rtsi_enhanced_result[stock_code]
-                            rtsi_success = True
-                        else:
-                            raise Exception("增强RTSI批量计算未返回结果")
-                    except Exception as e:
-                        # 静默处理增强RTSI计算失败，回退到标准RTSI
-                        logger.debug(f"增强RTSI计算失败 {stock_code}: {e}")
-                        rtsi_success = False
-                
-                # 如果智能RTSI和增强RTSI都失败，尝试标准RTSI
-                if not rtsi_success:
-                    try:
-                        # 使用AI增强RTSI作为主算法（默认启用）
-                        ratings = stock_data[date_columns]
-                        rtsi_result = calculate_rating_trend_strength_index(
-                            ratings, 
-                            stock_code=stock_code,
-                            stock_name=stock_name,
-                            enable_ai=True  # 确保使用AI增强主算法
-                        )
-                        rtsi_success = True
-                    except Exception as e:
-                        logger.warning(f"标准RTSI计算失败 {stock_code}: {e}")
-                        rtsi_success = False
-                
-                # 如果RTSI失败且ARTS可用，使用ARTS作为后备
-                if not rtsi_success and arts_available:
-                    try:
-                        logger.info(f"🔄 {stock_code} 并行模式使用ARTS后备算法")
-                        ratings = stock_data[date_columns]
-                        arts_result = arts_calculator.calculate_arts(ratings, stock_code)
-                        
-                        # 将ARTS结果转换为兼容RTSI的格式
-                        rtsi_result = {
-                            'rtsi': arts_result.get('arts_score', 0),
-                            'trend': arts_result.get('trend_direction', 'unknown'),
-                            'confidence': arts_result.get('confidence_level', 'unknown'),
-                            'pattern': arts_result.get('trend_pattern', 'unknown'),
-                            'rating_level': arts_result.get('rating_level', 'unknown'),
-                            'recommendation': arts_result.get('recommendation', ''),
-                            'algorithm': 'ARTS_v1.0_backup',
-                            'recent_score': arts_result.get('recent_rating'),
-                            'data_points': arts_result.get('data_points', 0)
-                        }
-                        rtsi_success = True
-                    except Exception as e:
-                        logger.error(f"ARTS后备算法也失败 {stock_code}: {e}")
-                
-                # 如果所有算法都失败，使用默认结果
-                if not rtsi_success:
-                    rtsi_result = {
-                        'rtsi': 0,
-                        'trend': 'unknown',
-                        'confidence': 0,
-                        'algorithm': 'fallback',
-                        'recent_score': None,
-                        'data_points': 0
-                    }
-                
-                return stock_code, {
-                    'name': stock_name,
-                    'industry': industry,
-                    'rtsi': rtsi_result,
-                    'last_score': rtsi_result.get('recent_score'),
-                    'trend': rtsi_result.get('trend', 'unknown')
-                }
-            except Exception as e:
-                logger.warning(f"计算股票RTSI失败 {stock_data.get('股票代码', 'unknown')}: {e}")
+            # 已取消或超时：排队中的任务直接跳过（在线程池中执行，显式指明所属阶段）
+            if self._stop_reason(STAGE_STOCKS):
                 return None, None
+            return _calculate_stock_rtsi(
+                stock_data, date_columns, self._detect_market_type(stock_data),
+                self.smart_rtsi_calculator, self.enhanced_rtsi_calculator, arts_calculator
+            )
         
         # 多线程执行 - 增强错误处理和进度监控
         total_stocks = len(raw_data)
@@ -622,21 +1134,36 @@ class RealtimeAnalysisEngine:
                 completed = 0
                 failed = 0
                 timeout_per_batch = min(45, self.config['timeout'] // 8)  # 每批次最多45秒，减少超时频率
+                progress = RateLimitedProgress(logger, len(futures), "计算进度",
+                                               self.config.get('progress_interval', 2.0))
+                chunk_size = max(1, int(self.config.get('chunk_size', 100)))
+                chunk_results = {}
                 
                 for i, future in enumerate(futures):
+                    stop_reason = self._stop_reason()
+                    if stop_reason:
+                        for pending_future in futures[i:]:
+                            pending_future.cancel()
+                        logger.warning(f"计算已停止({stop_reason})，放弃剩余 {len(futures) - i} 只股票，返回部分结果")
+                        break
+                    
                     try:
                         # 使用适中的超时时间，平衡速度和稳定性
                         stock_code, result = future.result(timeout=timeout_per_batch)
                         if stock_code and result:
                             stocks_results[stock_code] = result
+                            chunk_results[stock_code] = result
                             completed += 1
                         else:
                             failed += 1
                         
-                        # 适度的进度报告，减少日志输出开销
-                        if (i + 1) % 100 == 0 or (i + 1) == len(futures):
-                            progress = ((i + 1) / len(futures)) * 100
-                            logger.info(f"计算进度: {progress:.1f}% ({i + 1}/{len(futures)}) - 成功:{completed}, 失败:{failed}")
+                        # 每chunk_size只股票推送一次部分结果
+                        if (i + 1) % chunk_size == 0:
+                            self._publish_partial(STAGE_STOCKS, chunk_results)
+                            chunk_results = {}
+                        
+                        # 限频进度报告，减少日志输出开销
+                        progress.update(i + 1, 成功=completed, 失败=failed)
                             
                     except Exception as e:
                         failed += 1
@@ -644,20 +1171,91 @@ class RealtimeAnalysisEngine:
                             logger.warning(f"任务失败数量: {failed}, 最新失败: {e}")
                         # 继续处理其他任务，不要因为单个任务失败而停止
                 
+                self._publish_partial(STAGE_STOCKS, chunk_results)
                 logger.info(f"多线程计算完成: 总计{len(futures)}只股票, 成功{completed}只, 失败{failed}只")
                 
         except Exception as e:
             logger.error(f"多线程执行异常: {e}")
             # 如果多线程完全失败，回退到单线程模式
             logger.info("回退到单线程模式...")
-            return self._calculate_stocks_rtsi_sequential(raw_data)
+            return self._calculate_stocks_rtsi_sequential(raw_data, prepared)
+        
+        return stocks_results
+    
+    def _calculate_stocks_rtsi_processes(self, raw_data: pd.DataFrame,
+                                         prepared: PreparedMarket = None) -> Optional[Dict[str, Dict]]:
+        """
+        分块多进程计算个股RTSI
+        
+        把编码后的评级矩阵按连续股票块（config['chunk_size']只/块）分发给
+        最多config['max_workers']个工作进程，再按块顺序合并为与逐行计算相同的结果字典。
+        
+        Returns:
+            {股票代码: 结果}；可用进程数不足2个或进程池异常时返回None
+        """
+        if prepared is None:
+            prepared = PreparedMarket(raw_data)
         
+        total_stocks = len(prepared.data)
+        chunk_size = max(1, int(self.config.get('chunk_size', 100)))
+        blocks = [(start, min(start + chunk_size, total_stocks)) for start in range(0, total_stocks, chunk_size)]
+        max_workers = min(int(self.config.get('max_workers', 4)), os.cpu_count() or 1, len(blocks))
+        if max_workers < 2:
+            logger.info(f"可用进程数不足({max_workers})，使用多线程计算")
+            return None
+        
+        logger.info(f"启动多进程分块计算: {total_stocks}只股票, {len(blocks)}个数据块, {max_workers}个进程")
+        market = self._market_from_file_path()
+        stocks_results = {}
+        completed = 0
+        failed = 0
+        progress = RateLimitedProgress(logger, total_stocks, "计算进度",
+                                       self.config.get('progress_interval', 2.0))
+        
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_rtsi_worker) as executor:
+                futures = [
+                    executor.submit(_calculate_rtsi_block, prepared.encode_block(start, stop),
+                                    prepared.source_date_columns, market)
+                    for start, stop in blocks
+                ]
+                
+                # 按数据块顺序合并，重复代码的覆盖顺序与逐行计算一致
+                for i, future in enumerate(futures):
+                    stop_reason = self._stop_reason()
+                    if stop_reason:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        logger.warning(f"计算已停止({stop_reason})，放弃剩余 {len(futures) - i} 个数据块，返回部分结果")
+                        break
+                    
+                    chunk_results = {}
+                    for stock_code, result in future.result():
+                        if stock_code and result:
+                            chunk_results[stock_code] = result
+                            completed += 1
+                        else:
+                            failed += 1
+                    stocks_results.update(chunk_results)
+                    self._publish_partial(STAGE_STOCKS, chunk_results)
+                    
+                    progress.update(blocks[i][1], 成功=completed, 失败=failed)
+        except Exception as e:
+            logger.warning(f"多进程计算失败，回退到多线程模式: {e}")
+            return None
+        
+        logger.info(f"多进程计算完成: 总计{total_stocks}只股票, 成功{completed}只, 失败{failed}只")
         return stocks_results
     
-    def _calculate_stocks_rtsi_sequential(self, raw_data: pd.DataFrame) -> Dict[str, Dict]:
+    def _calculate_stocks_rtsi_sequential(self, raw_data: pd.DataFrame,
+                                          prepared: PreparedMarket = None) -> Dict[str, Dict]:
         """单线程顺序计算个股RTSI"""
         stocks_results = {}
-        date_columns = [col for col in raw_data.columns if str(col).startswith('202')]
+        if prepared is not None:
+            date_columns = prepared.source_date_columns
+        else:
+            date_columns = [col for col in raw_data.columns if str(col).startswith('202')]
         
         # 导入ARTS算法作为后备
         try:
@@ -669,117 +1267,136 @@ class RealtimeAnalysisEngine:
             arts_available = False
             arts_calculator = None
         
-        # 如果有增强RTSI计算器，批量计算以提高效率
         if self.enhanced_rtsi_calculator is not None:
-            logger.info("📊 开始批量计算增强RTSI...")
-            enhanced_results = self.enhanced_rtsi_calculator.batch_calculate_enhanced_rtsi(raw_data)
-            logger.info(f"📊 批量计算完成，成功计算 {len(enhanced_results)} 只股票")
-            logger.info("📊 使用RTSI算法进行个股分析（主算法）")
+            logger.info("📊 使用增强RTSI按数据块批量计算个股（主算法）")
         else:
-            enhanced_results = {}
             logger.info("📊 使用RTSI算法进行个股分析（标准模式）")
         
         total_stocks = len(raw_data)
         logger.info(f"开始逐个股票计算: {total_stocks}只股票")
         
-        for idx, stock_data in raw_data.iterrows():
-            try:
-                stock_code = str(stock_data['股票代码'])
-                stock_name = stock_data.get('股票名称', '')
-                industry = stock_data.get('行业', '未分类')
-                
-                # 进度报告
-                if (idx + 1) % 100 == 0 or (idx + 1) == total_stocks:
-                    progress = ((idx + 1) / total_stocks) * 100
-                    logger.info(f"逐个股票计算进度: {progress:.1f}% ({idx + 1}/{total_stocks})")
-                
-                # 优先使用RTSI算法（主算法）
-                rtsi_success = False
+        # 按数据块计算：先批量计算本块的增强RTSI，再逐个汇总，块完成后发布部分结果；
+        # 块之间检查取消/超时
+        enhanced_results = {}
+        chunk_size = max(1, int(self.config.get('chunk_size', 100)))
+        skipped_stocks = 0
+        progress = RateLimitedProgress(logger, total_stocks, "逐个股票计算进度",
+                                       self.config.get('progress_interval', 2.0))
+        for start in range(0, total_stocks, chunk_size):
+            chunk = raw_data.iloc[start:start + chunk_size]
+            if self.enhanced_rtsi_calculator is not None and not self._stop_reason():
+                enhanced_results.update(self.enhanced_rtsi_calculator.batch_calculate_enhanced_rtsi(
+                    chunk, date_columns=date_columns))
+            
+            chunk_results = {}
+            for position, (_, stock_data) in enumerate(chunk.iterrows(), start):
+                # 停止后只汇总已批量算好的股票，跳过需要逐个计算的股票
+                if str(stock_data['股票代码']) not in enhanced_results and self._stop_reason():
+                    skipped_stocks += 1
+                    continue
                 
-                # 计算RTSI - 优先使用增强结果
-                if stock_code in enhanced_results:
-                    rtsi_result = enhanced_results[stock_code]
-                    rtsi_success = True
-                else:
-                    try:
-                        # 使用AI增强RTSI作为主算法（默认启用）
-                        ratings = stock_data[date_columns]
-                        rtsi_result = calculate_rating_trend_strength_index(
-                            ratings, 
-                            stock_code=stock_code,
-                            stock_name=stock_name,
-                            enable_ai=True  # 确保使用AI增强主算法
-                        )
+                try:
+                    stock_code = str(stock_data['股票代码'])
+                    stock_name = stock_data.get('股票名称', '')
+                    industry = stock_data.get('行业', '未分类')
+                    
+                    # 限频进度报告
+                    progress.update(position + 1)
+                    
+                    # 优先使用RTSI算法（主算法）
+                    rtsi_success = False
+                    
+                    # 计算RTSI - 优先使用增强结果
+                    if stock_code in enhanced_results:
+                        rtsi_result = enhanced_results[stock_code]
                         rtsi_success = True
-                    except Exception as e:
-                        logger.debug(f"RTSI算法计算失败 {stock_code}: {e}")
-                        rtsi_success = False
-                
-                # 如果RTSI失败且ARTS可用，使用ARTS作为后备
-                if not rtsi_success and arts_available:
-                    try:
-                        logger.info(f"🔄 {stock_code} 使用ARTS后备算法")
-                        ratings = stock_data[date_columns]
-                        arts_result = arts_calculator.calculate_arts(ratings, stock_code)
-                        
-                        # 将ARTS结果转换为兼容RTSI的格式
+                    else:
+                        try:
+                            # 使用AI增强RTSI作为主算法（默认启用）
+                            ratings = stock_data[date_columns]
+                            rtsi_result = calculate_rating_trend_strength_index(
+                                ratings, 
+                                stock_code=stock_code,
+                                stock_name=stock_name,
+                                enable_ai=True  # 确保使用AI增强主算法
+                            )
+                            rtsi_success = True
+                        except Exception as e:
+                            logger.debug("RTSI算法计算失败 %s: %s", stock_code, e)
+                            rtsi_success = False
+                    
+                    # 如果RTSI失败且ARTS可用，使用ARTS作为后备
+                    if not rtsi_success and arts_available:
+                        try:
+                            logger.debug("🔄 %s 使用ARTS后备算法", stock_code)
+                            ratings = stock_data[date_columns]
+                            arts_result = arts_calculator.calculate_arts(ratings, stock_code)
+                    
+                            # 将ARTS结果转换为兼容RTSI的格式
+                            rtsi_result = {
+                                'rtsi': arts_result.get('arts_score', 0),
+                                'trend': arts_result.get('trend_direction', 'unknown'),
+                                'confidence': arts_result.get('confidence_level', 'unknown'),
+                                'pattern': arts_result.get('trend_pattern', 'unknown'),
+                                'rating_level': arts_result.get('rating_level', 'unknown'),
+                                'recommendation': arts_result.get('recommendation', ''),
+                                'algorithm': 'ARTS_v1.0_backup',
+                                'recent_score': arts_result.get('recent_rating'),
+                                'data_points': arts_result.get('data_points', 0)
+                            }
+                            rtsi_success = True
+                        except Exception as e:
+                            logger.error("ARTS后备算法也失败 %s: %s", stock_code, e)
+                    
+                    # 如果所有算法都失败，使用默认结果
+                    if not rtsi_success:
                         rtsi_result = {
-                            'rtsi': arts_result.get('arts_score', 0),
-                            'trend': arts_result.get('trend_direction', 'unknown'),
-                            'confidence': arts_result.get('confidence_level', 'unknown'),
-                            'pattern': arts_result.get('trend_pattern', 'unknown'),
-                            'rating_level': arts_result.get('rating_level', 'unknown'),
-                            'recommendation': arts_result.get('recommendation', ''),
-                            'algorithm': 'ARTS_v1.0_backup',
-                            'recent_score': arts_result.get('recent_rating'),
-                            'data_points': arts_result.get('data_points', 0)
+                            'rtsi': 0,
+                            'trend': 'unknown',
+                            'confidence': 0,
+                            'algorithm': 'fallback',
+                            'recent_score': None,
+                            'data_points': 0
                         }
-                        rtsi_success = True
-                    except Exception as e:
-                        logger.error(f"ARTS后备算法也失败 {stock_code}: {e}")
-                
-                # 如果所有算法都失败，使用默认结果
-                if not rtsi_success:
-                    rtsi_result = {
-                        'rtsi': 0,
-                        'trend': 'unknown',
-                        'confidence': 0,
-                        'algorithm': 'fallback',
-                        'recent_score': None,
-                        'data_points': 0
+                    
+                    chunk_results[stock_code] = {
+                        'name': stock_name,
+                        'industry': industry,
+                        'rtsi': rtsi_result,
+                        'last_score': rtsi_result.get('recent_score'),
+                        'trend': rtsi_result.get('trend', 'unknown')
                     }
                 
-                stocks_results[stock_code] = {
-                    'name': stock_name,
-                    'industry': industry,
-                    'rtsi': rtsi_result,
-                    'last_score': rtsi_result.get('recent_score'),
-                    'trend': rtsi_result.get('trend', 'unknown')
-                }
-                
-                if (idx + 1) % 100 == 0:
-                    logger.info(f"已完成 {idx + 1}/{len(raw_data)} 只股票计算")
-                    
-            except Exception as e:
-                logger.warning(f"计算股票RTSI失败 {stock_data.get('股票代码', 'unknown')}: {e}")
+                except Exception as e:
+                    logger.warning("计算股票RTSI失败 %s: %s", stock_data.get('股票代码', 'unknown'), e)
+            
+            stocks_results.update(chunk_results)
+            self._publish_partial(STAGE_STOCKS, chunk_results)
+        
+        if skipped_stocks:
+            logger.warning(f"计算已停止({self._run_stop_reason})，已完成 {len(stocks_results)}/{total_stocks} 只股票，返回部分结果")
         
         return stocks_results
     
-    def _calculate_industries_irsi(self, raw_data: pd.DataFrame, stocks_results: Dict) -> Dict[str, Dict]:
+    def _calculate_industries_irsi(self, raw_data: pd.DataFrame, stocks_results: Dict,
+                                   prepared: PreparedMarket = None) -> Dict[str, Dict]:
         """计算行业IRSI（支持增强TMA）"""
         industries_results = {}
+        if prepared is None:
+            prepared = PreparedMarket(raw_data)
         
-        # 按行业分组
-        industries = raw_data['行业'].dropna().unique()
+        # 按行业分组（预处理阶段已完成因子化）
+        industries = list(prepared.industry_labels)
         
         # 选择分析方法
-        if self.enable_enhanced_tma:
+        if self.enable_enhanced_tma and not self._stop_reason():
             logger.info("使用增强TMA分析行业强势")
             try:
                 # 使用增强TMA分析器进行批量分析（传入stocks_results以获取RTSI）
                 enhanced_results = self.enhanced_tma_analyzer.batch_analyze_industries_enhanced(
                     raw_data, 
-                    stocks_results=stocks_results  # ✅ 传入RTSI数据
+                    stocks_results=stocks_results,  # ✅ 传入RTSI数据
+                    industry_groups=prepared.industry_groups()
                 )
                 
                 for industry in industries:
@@ -787,16 +1404,7 @@ class RealtimeAnalysisEngine:
                         enhanced_result = enhanced_results[industry]
                         
                         # 统计行业内股票信息
-                        industry_data = raw_data[raw_data['行业'] == industry]
-                        industry_stocks = []
-                        for _, stock in industry_data.iterrows():
-                            stock_code = str(stock['股票代码'])
-                            if stock_code in stocks_results:
-                                industry_stocks.append({
-                                    'code': stock_code,
-                                    'name': stocks_results[stock_code]['name'],
-                                    'rtsi': stocks_results[stock_code]['rtsi'].get('rtsi', 0)
-                                })
+                        industry_stocks = self._collect_industry_stocks(prepared, industry, stocks_results)
                         
                         # 构建增强结果
                         industries_results[industry] = {
@@ -823,23 +1431,19 @@ class RealtimeAnalysisEngine:
         if not self.enable_enhanced_tma:
             logger.info("使用基础TMA分析行业强势")
             for industry in industries:
+                stop_reason = self._stop_reason()
+                if stop_reason:
+                    logger.warning(f"计算已停止({stop_reason})，已完成 {len(industries_results)}/{len(industries)} 个行业")
+                    break
                 try:
                     # 获取行业数据
-                    industry_data = raw_data[raw_data['行业'] == industry]
+                    industry_data = prepared.industry_frame(industry)
                     
                     # 计算行业强势分析 (使用核心强势分析器)
                     irsi_result = calculate_industry_relative_strength(industry_data, raw_data, industry)
                     
                     # 统计行业内股票信息
-                    industry_stocks = []
-                    for _, stock in industry_data.iterrows():
-                        stock_code = str(stock['股票代码'])
-                        if stock_code in stocks_results:
-                            industry_stocks.append({
-                                'code': stock_code,
-                                'name': stocks_results[stock_code]['name'],
-                                'rtsi': stocks_results[stock_code]['rtsi'].get('rtsi', 0)
-                            })
+                    industry_stocks = self._collect_industry_stocks(prepared, industry, stocks_results)
                     
                     industries_results[industry] = {
                         'irsi': irsi_result,
@@ -855,19 +1459,119 @@ class RealtimeAnalysisEngine:
         
         return industries_results
     
-    def _calculate_market_msci(self, raw_data: pd.DataFrame) -> Dict:
+    def _collect_industry_stocks(self, prepared: PreparedMarket, industry: str,
+                                 stocks_results: Dict) -> List[Dict]:
+        """按预处理的行业行位置收集行业内已计算RTSI的股票"""
+        industry_stocks = []
+        for stock_code in prepared.codes[prepared.industry_rows(industry)]:
+            stock_result = stocks_results.get(stock_code)
+            if stock_result is not None:
+                industry_stocks.append({
+                    'code': stock_code,
+                    'name': stock_result['name'],
+                    'rtsi': stock_result['rtsi'].get('rtsi', 0)
+                })
+        return industry_stocks
+    
+    def _calculate_market_msci(self, raw_data: pd.DataFrame, prepared: PreparedMarket = None) -> Dict:
         """计算市场MSCI（启用增强版：方案D最终版）"""
         try:
+            # 增量模式：持久化每日直方图，新交易日只计算当天
+            if self.config.get('incremental_msci', True):
+                try:
+                    return self._get_incremental_msci_calculator().update(raw_data, prepared)
+                except Exception as e:
+                    logger.warning(f"增量MSCI计算失败，回退到完整计算: {e}")
+            
             # 启用增强版MSCI（方案D最终版：20/80权重 + 分段加成）
             msci_result = calculate_market_sentiment_composite_index(
                 raw_data, 
-                use_enhanced=True  # 启用增强版MSCI
+                use_enhanced=True,  # 启用增强版MSCI
+                prepared=prepared
             )
             return msci_result
         except Exception as e:
             logger.error(f"计算市场MSCI失败: {e}")
             return {'status': 'error', 'message': str(e)}
     
+    def _get_incremental_msci_calculator(self):
+        """获取（按市场持久化的）增量MSCI计算器"""
+        if self._incremental_msci is None:
+            from algorithms.incremental_msci import IncrementalMSCICalculator
+            
+            state_path = None
+            if getattr(self.data_source, 'file_path', ''):
+                market = self._detect_market_type({})
+                state_path = os.path.join(self._get_cache_dir(), f"msci_state_{market}.npz")
+            
+            self._incremental_msci = IncrementalMSCICalculator(use_enhanced=True, state_path=state_path)
+        return self._incremental_msci
+    
+    @staticmethod
+    def _get_cache_dir() -> str:
+        """持久化缓存目录"""
+        try:
+            from utils.path_helper import get_cache_dir
+            return str(get_cache_dir())
+        except ImportError:
+            return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache')
+    
+    def _snapshot_location(self, raw_data: pd.DataFrame) -> Optional[Tuple[str, str]]:
+        """
+        结果快照的文件路径和快照键
+        
+        Returns:
+            (路径, 键)；未启用快照或数据不是来自文件时返回None
+        """
+        file_path = getattr(self.data_source, 'file_path', '')
+        if not self.config.get('result_snapshot', True) or not file_path or not os.path.isfile(file_path):
+            return None
+        
+        # 影响计算结果的配置（执行方式、超时等不影响结果）
+        result_config = {
+            'multithreading': self.enable_multithreading,
+            'enhanced_tma': self.enable_enhanced_tma,
+            'top_n_leading_stocks': self.top_n_leading_stocks,
+            'incremental_msci': self.config.get('incremental_msci', True),
+        }
+        
+        # 智能RTSI的量价数据和增强TMA的大盘股分类都读取 *-lj.dat.gz，数据更新后旧快照失效
+        inputs = {}
+        if self._uses_volume_price_cache() or self.enable_enhanced_tma:
+            file_market = self._market_from_file_path()
+            inputs['lj_data'] = results_snapshot.lj_data_fingerprint([file_market] if file_market else ['cn', 'hk', 'us'])
+        key = results_snapshot.compute_snapshot_key(file_path, raw_data, result_config, inputs)
+        name = os.path.basename(file_path).split('.')[0]
+        path = os.path.join(self._get_cache_dir(), f"results_{name}.snap")
+        return path, key
+    
+    def _load_snapshot(self, raw_data: pd.DataFrame) -> Optional[AnalysisResults]:
+        """加载与当前数据指纹匹配的结果快照"""
+        try:
+            location = self._snapshot_location(raw_data)
+            if location is None:
+                return None
+            snapshot = results_snapshot.load_snapshot(*location)
+            if isinstance(snapshot, AnalysisResults):
+                snapshot.metadata['from_snapshot'] = True
+                snapshot.large_cap_classifier = self._get_large_cap_classifier()
+                return snapshot
+        except Exception as e:
+            logger.warning(f"加载结果快照失败: {e}")
+        return None
+    
+    def _save_snapshot(self, raw_data: pd.DataFrame, results: AnalysisResults) -> bool:
+        """把完整结果写入磁盘快照"""
+        try:
+            location = self._snapshot_location(raw_data)
+            if location is None:
+                return False
+            path, key = location
+            return results_snapshot.save_snapshot(path, key, results)
+        except Exception as e:
+            logger.warning(f"保存结果快照失败: {e}")
+            return False
+    
     def _is_cache_valid(self) -> bool:
         """检查缓存是否有效"""
         if not self.results_cache or not self.last_calculation_time:
@@ -896,6 +1600,9 @@ class RealtimeAnalysisEngine:
         """
         增量更新分析结果
         
+        与当前数据逐行比较：只重算评级有变化的股票的RTSI、包含这些股票的行业的IRSI，
+        MSCI按变化行做差量更新。日期列变化（新交易日）、尚无完整结果时完整重算。
+        
         Args:
             new_data: 新的数据
             
@@ -904,17 +1611,46 @@ class RealtimeAnalysisEngine:
         """
         try:
             logger.info("开始增量更新分析...")
+            start_time = time.time()
+            
+            old_data = self.data_source.get_raw_data()
+            cached = self.results_cache
             
             # 更新数据源
             self.data_source.update_data(new_data)
+            new_data = self.data_source.get_raw_data()
+            
+            if (cached is None or cached.metadata.get('partial')
+                    or list(old_data.columns) != list(new_data.columns)
+                    or '股票代码' not in new_data.columns):
+                # 无法比较：完整重新计算
+                results = self.calculate_all_metrics(force_refresh=True)
+                self.previous_results = cached
+                return {
+                    'status': 'success',
+                    'mode': 'full',
+                    'updated_stocks': len(results.stocks),
+                    'updated_industries': len(results.industries),
+                    'update_time': datetime.now().isoformat()
+                }
             
-            # 强制重新计算
-            results = self.calculate_all_metrics(force_refresh=True)
+            changed, removed = _diff_stock_rows(old_data, new_data)
+            if changed or removed:
+                with self.calculation_lock:
+                    results, updated_industries = self._apply_row_changes(
+                        old_data, new_data, cached, changed, removed)
+            else:
+                updated_industries = set()
+            self.previous_results = cached
             
+            logger.info(f"增量更新完成: {len(changed)}只股票变化, {len(removed)}只删除, "
+                        f"{len(updated_industries)}个行业重算, 耗时{time.time() - start_time:.2f}秒")
             return {
                 'status': 'success',
-                'updated_stocks': len(results.stocks),
-                'updated_industries': len(results.industries),
+                'mode': 'incremental',
+                'updated_stocks': len(changed),
+                'removed_stocks': len(removed),
+                'updated_industries': len(updated_industries),
                 'update_time': datetime.now().isoformat()
             }
             
@@ -926,6 +1662,78 @@ class RealtimeAnalysisEngine:
                 'update_time': datetime.now().isoformat()
             }
     
+    def _apply_row_changes(self, old_data: pd.DataFrame, new_data: pd.DataFrame,
+                           cached: AnalysisResults, changed: set, removed: set) -> Tuple[AnalysisResults, set]:
+        """
+        只对变化的股票行重算三个阶段
+        
+        Args:
+            old_data: 变化前的数据
+            new_data: 变化后的数据（列结构与old_data相同）
+            cached: 基于old_data的完整结果
+            changed: 变化或新增的股票代码
+            removed: 被删除的股票代码
+            
+        Returns:
+            (新的结果对象, 重算的行业)
+        """
+        old_codes = old_data['股票代码'].astype(str)
+        new_codes = new_data['股票代码'].astype(str)
+        stale_rows = old_data[old_codes.isin(changed | removed).to_numpy()]
+        changed_rows = new_data[new_codes.isin(changed).to_numpy()]
+        
+        # 个股RTSI：只计算变化的行（计算失败的股票不保留旧结果）
+        stocks = {code: value for code, value in cached.stocks.items()
+                  if code not in changed and code not in removed}
+        if len(changed_rows):
+            stocks.update(self._calculate_stocks_rtsi(changed_rows, PreparedMarket(changed_rows)))
+        stocks = {code: stocks[code] for code in pd.unique(new_codes.to_numpy()) if code in stocks}
+        
+        # 行业IRSI：只重算变化前后涉及的行业
+        affected = set()
+        if '行业' in new_data.columns:
+            affected = set(changed_rows['行业'].dropna()) | set(stale_rows['行业'].dropna())
+        industry_rows = new_data[new_data['行业'].isin(affected).to_numpy()] if affected else new_data.iloc[0:0]
+        industries = {name: value for name, value in cached.industries.items() if name not in affected}
+        if len(industry_rows):
+            industries.update(self._calculate_industries_irsi(industry_rows, stocks, PreparedMarket(industry_rows)))
+        if '行业' in new_data.columns:
+            industries = {name: industries[name] for name in new_data['行业'].dropna().unique() if name in industries}
+        
+        # 市场MSCI：增量状态按变化行做差量更新，否则完整计算
+        market = None
+        if self.config.get('incremental_msci', True):
+            try:
+                calculator = self._get_incremental_msci_calculator()
+                if calculator.apply_row_changes(old_data, new_data, stale_rows, changed_rows):
+                    market = calculator.get_result()
+            except Exception as e:
+                logger.warning(f"MSCI差量更新失败，完整计算: {e}")
+        if market is None:
+            market = self._calculate_market_msci(new_data)
+        
+        results = AnalysisResults()
+        results.large_cap_classifier = self._get_large_cap_classifier()
+        results.stocks = stocks
+        results.industries = industries
+        results.market = market
+        results.metadata.update(cached.metadata)
+        results.metadata.pop('from_snapshot', None)
+        results.metadata['total_stocks'] = len(stocks)
+        results.metadata['total_industries'] = len(industries)
+        results.metadata['incremental_update'] = {
+            'changed_stocks': len(changed),
+            'removed_stocks': len(removed),
+            'updated_industries': len(affected),
+        }
+        
+        self.results_cache = results
+        self.last_calculation_time = datetime.now()
+        for stage in STAGE_DEPENDENCIES:
+            self._notify_stage(stage, getattr(results, stage))
+        # 更新后的数据只在内存中，与数据文件不一致，不写入结果快照
+        return results, affected
+    
     def get_real_time_rankings(self) -> Dict:
         """获取实时排名"""
         if not self.results_cache:
@@ -940,6 +1748,20 @@ class RealtimeAnalysisEngine:
             'last_updated': self.results_cache.last_updated.isoformat()
         }
     
+    def diff_since_last_update(self) -> Optional[ResultsDiff]:
+        """
+        最近一次 update_analysis 前后的结果差异
+        
+        Returns:
+            ResultsDiff；尚未更新过、或更新前/后没有完整结果时返回None
+        """
+        previous, current = self.previous_results, self.results_cache
+        if previous is None or current is None:
+            return None
+        if previous.metadata.get('partial') or current.metadata.get('partial'):
+            return None
+        return current.diff(previous)
+    
     def detect_trend_changes(self) -> List[Dict]:
         """检测趋势变化信号"""
         if not self.results_cache:
@@ -1013,10 +1835,11 @@ class RealtimeAnalysisEngine:
             return []
     
     def cache_results(self) -> None:
-        """手动缓存当前结果"""
+        """手动缓存当前结果（写入磁盘快照）"""
         if self.results_cache:
-            # 可以在这里实现持久化缓存逻辑
-            logger.info("结果已缓存")
+            raw_data = self.data_source.get_raw_data()
+            if raw_data is not None and self._save_snapshot(raw_data, self.results_cache):
+                logger.info("结果已缓存")
     
     def get_performance_report(self) -> Dict:
         """获取性能报告"""
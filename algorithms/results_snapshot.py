@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+分析结果快照 - 把AnalysisResults持久化为压缩二进制文件，按数据指纹复用
+
+快照键由四部分组成：
+1. 数据文件内容哈希，以及实际参与计算的数据内容哈希（内存中修改过的数据与文件不同键）
+2. 算法版本（算法包版本、快照格式版本、算法及数据准备源码摘要）
+3. 引擎配置
+4. 计算读取的其他输入文件指纹（量价数据 *-lj.dat.gz，每日更新后旧快照失效）
+
+文件格式：魔数 + 头部长度 + JSON头部（含快照键）+ zlib压缩的pickle正文。
+读取时先比对头部中的键，不匹配时不反序列化正文。
+"""
+
+import os
+import io
+import json
+import glob
+import zlib
+import pickle
+import struct
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 快照格式版本，AnalysisResults结构变化时递增
+SNAPSHOT_VERSION = 1
+
+_MAGIC = b'AIRS'
+_HEADER_SIZE = struct.Struct('<I')
+
+# 源码摘要覆盖的文件（相对项目根目录）：算法、数据准备（预处理、大盘股分类）、量价缓存与读取
+_SOURCE_PATTERNS = ('algorithms/*.py', 'data/*.py', 'cache/*.py', 'lj_read.py', 'utils/lj_data_reader.py')
+
+# 量价数据文件（与 LJDataReader 的查找顺序一致）
+_LJ_DATA_FILES = ('{market}-lj.dat.gz', '{market}-lj.dat')
+
+_source_digest: Optional[str] = None
+
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容的SHA-1"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def data_digest(raw_data: pd.DataFrame) -> str:
+    """计算DataFrame内容（值与列名，不含索引）的SHA-1"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps([str(col) for col in raw_data.columns], ensure_ascii=False).encode('utf-8'))
+    try:
+        row_hashes = pd.util.hash_pandas_object(raw_data, index=False).to_numpy()
+        digest.update(row_hashes.tobytes())
+    except TypeError:
+        # 含不可哈希的单元格（如列表）时退回到文本表示
+        digest.update(raw_data.to_csv(index=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def get_algorithm_versions() -> Dict[str, str]:
+    """
+    当前算法版本信息
+
+    源码摘要覆盖 _SOURCE_PATTERNS 中的全部 .py 文件，修改任一算法或数据准备代码
+    即令旧快照失效；打包运行（无源码）时摘要恒定，仅依赖版本号。
+    """
+    global _source_digest
+    from . import __version__
+    from .incremental_msci import STATE_VERSION
+
+    if _source_digest is None:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha1()
+        for pattern in _SOURCE_PATTERNS:
+            for path in sorted(glob.glob(os.path.join(project_root, pattern))):
+                try:
+                    digest.update(os.path.relpath(path, project_root).replace(os.sep, '/').encode('utf-8'))
+                    digest.update(file_digest(path).encode('ascii'))
+                except OSError:
+                    continue
+        _source_digest = digest.hexdigest()
+
+    return {
+        'algorithms': __version__,
+        'snapshot': str(SNAPSHOT_VERSION),
+        'incremental_msci': str(STATE_VERSION),
+        'source': _source_digest,
+    }
+
+
+def lj_data_fingerprint(markets: Iterable[str]) -> Dict[str, Optional[Dict[str, int]]]:
+    """
+    量价数据文件的指纹（大小、修改时间）
+
+    Args:
+        markets: 市场代码
+
+    Returns:
+        {市场: {'size': 字节数, 'mtime_ns': 修改时间}}，文件不存在时为None
+    """
+    try:
+        from utils.path_helper import get_data_file_path
+    except ImportError:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        get_data_file_path = lambda name: os.path.join(project_root, name)
+
+    fingerprints = {}
+    for market in sorted(set(markets)):
+        fingerprints[market] = None
+        for pattern in _LJ_DATA_FILES:
+            path = str(get_data_file_path(pattern.format(market=market)))
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                fingerprints[market] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+                break
+    return fingerprints
+
+
+def compute_snapshot_key(file_path: str, raw_data: pd.DataFrame, config: Dict[str, Any],
+                         inputs: Optional[Dict[str, Any]] = None) -> str:
+    """
+    计算快照键
+
+    Args:
+        file_path: 数据文件路径
+        raw_data: 实际参与计算的数据
+        config: 影响计算结果的引擎配置
+        inputs: 计算读取的其他输入文件指纹（如 lj_data_fingerprint 的结果）
+
+    Returns:
+        str: 快照键（十六进制摘要）
+    """
+    fingerprint = {
+        'data_file': file_digest(file_path),
+        'data': data_digest(raw_data),
+        'versions': get_algorithm_versions(),
+        'config': config,
+        'inputs': inputs or {},
+    }
+    payload = json.dumps(fingerprint, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def save_snapshot(path: str, key: str, results: Any) -> bool:
+    """
+    保存快照（先写临时文件再替换，避免留下半个文件）
+
+    Args:
+        path: 快照文件路径
+        key: 快照键
+        results: AnalysisResults对象
+
+    Returns:
+        bool: 是否保存成功
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        header = json.dumps({'key': key, 'version': SNAPSHOT_VERSION}).encode('utf-8')
+        body = zlib.compress(pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL), 6)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+        logger.info(f"[结果快照] 已保存: {path} ({len(body) / 1024:.1f}KB)")
+        return True
+    except Exception as e:
+        logger.warning(f"[结果快照] 保存失败: {e}")
+        return False
+
+
+def load_snapshot(path: str, key: str) -> Optional[Any]:
+    """
+    加载快照
+
+    Args:
+        path: 快照文件路径
+        key: 期望的快照键
+
+    Returns:
+        键匹配时返回AnalysisResults对象，否则返回None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            header = _read_header(f)
+            if header.get('key') != key or header.get('version') != SNAPSHOT_VERSION:
+                logger.info("[结果快照] 数据或算法已变化，快照失效")
+                return None
+            return pickle.loads(zlib.decompress(f.read()))
+    except Exception as e:
+        logger.warning(f"[结果快照] 加载失败: {e}")
+        return None
+
+
+def _read_header(f: io.BufferedReader) -> Dict:
+    """读取并解析文件头部"""
+    if f.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("不是结果快照文件")
+    (size,) = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+    return json.loads(f.read(size).decode('utf-8'))
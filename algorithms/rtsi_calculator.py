@@ -22,6 +22,7 @@ import pandas as pd
 import numpy as np
 from scipy import stats
 from typing import Dict, List, Tuple, Optional, Union
+import logging
 import warnings
 from datetime import datetime
 
@@ -32,6 +33,9 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from algorithms.ranking_table import top_n_indices
+from algorithms.log_control import RateLimitedProgress
+
 try:
     from config.gui_i18n import t_gui as t_msci, t_gui as t_rtsi, t_gui as t_irsi, t_gui as t_engine, t_gui as t_common, set_language
 except ImportError:
@@ -43,6 +47,8 @@ except ImportError:
     def t_common(key): return key
     def set_language(lang): pass
 
+logger = logging.getLogger(__name__)
+
 def get_rating_score_map():
     """获取评级分数映射"""
     return {
@@ -220,7 +226,7 @@ def calculate_rating_trend_strength_index(stock_ratings: pd.Series, language: st
                 return ai_result
         except Exception as e:
             # AI增强失败，记录但继续使用基础算法
-            print(f"⚠️ AI增强RTSI失败，使用基础算法: {str(e)}")
+            logger.debug("⚠️ AI增强RTSI失败，使用基础算法: %s", e)
     
     # 容错方案：基础RTSI算法
     base_result = calculate_rating_trend_strength_index_base(stock_ratings, language)
@@ -415,11 +421,11 @@ def batch_calculate_rtsi(stock_data: pd.DataFrame, language: str = 'zh_CN') -> D
         print("")
         return {}
     
-    print(f"数据 开始批量计算RTSI指数...")
-    print(f"   数据规模: {len(stock_data)} 只股票 × {len(date_columns)} 个交易日")
+    logger.info("开始批量计算RTSI指数: %d 只股票 × %d 个交易日", len(stock_data), len(date_columns))
+    progress = RateLimitedProgress(logger, len(stock_data), "批量计算RTSI进度")
     
     # 批量处理
-    for idx, row in stock_data.iterrows():
+    for position, (idx, row) in enumerate(stock_data.iterrows()):
         stock_code = str(row.get('股票代码', f'STOCK_{idx}'))
         stock_name = row.get('股票名称', '未知股票')
         
@@ -438,13 +444,12 @@ def batch_calculate_rtsi(stock_data: pd.DataFrame, language: str = 'zh_CN') -> D
         
         results[stock_code] = rtsi_result
         
-        # 进度提示
-        if (idx + 1) % 1000 == 0:
-            print(f"   已处理: {idx + 1:,} / {len(stock_data):,} 只股票")
+        # 限频进度提示
+        progress.update(position + 1)
     
     batch_time = (datetime.now() - batch_start).total_seconds()
-    print(f"成功 批量计算完成: {len(results)} 只股票，耗时 {batch_time:.2f} 秒")
-    print(f"   平均速度: {len(results) / batch_time:.1f} 只/秒")
+    logger.info("批量计算完成: %d 只股票，耗时 %.2f 秒，平均速度 %.1f 只/秒",
+                len(results), batch_time, len(results) / batch_time if batch_time > 0 else 0.0)
     
     return results
 
@@ -490,11 +495,10 @@ def get_rtsi_ranking(rtsi_results: Dict[str, Dict], top_n: int = 50,
                 result.get(t_rtsi('recent_score'), 0)
             ))
     
-    # 按RTSI指数降序排序
-    valid_results.sort(key=lambda x: x[2], reverse=True)
+    # 按RTSI指数降序取前N名（argpartition，同分保持原顺序）
+    top_rows = top_n_indices(np.array([item[2] for item in valid_results], dtype=np.float64), top_n)
     
-    # 返回前N名
-    return [(code, name, rtsi, trend) for code, name, rtsi, trend, conf, score in valid_results[:top_n]]
+    return [valid_results[i][:4] for i in top_rows]
 
 
 def get_rtsi_statistics(rtsi_results: Dict[str, Dict]) -> Dict[str, Union[int, float]]:
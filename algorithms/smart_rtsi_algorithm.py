@@ -40,6 +40,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 增强RTSI使用的量价数据天数（引擎按此天数批量预取）
+VOLUME_PRICE_DAYS = 5
+
 class SmartRTSICalculator:
     """智能RTSI计算器"""
     
@@ -150,7 +153,7 @@ class SmartRTSICalculator:
         
         try:
             # 尝试获取5天的量价数据
-            volume_data = self.volume_cache.get_volume_price_data(stock_code, market, days=5)
+            volume_data = self.volume_cache.get_volume_price_data(stock_code, market, days=VOLUME_PRICE_DAYS)
             
             if volume_data and volume_data.get('total_days', 0) > 0:
                 return volume_data
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量分析命令行工具（无界面）
+
+功能：
+1. 加载一个或多个评级数据文件，用实时分析引擎完成RTSI/IRSI/MSCI全量计算
+2. 可选择计算方式（顺序/多线程/多进程）、工作进程数、数据块大小和算法开关
+3. 结果写为列式文件（个股表、行业表）和JSON（市场结果、耗时指标）
+4. 支持重复运行取耗时和cProfile性能分析，便于服务器定时运行与基准测试
+
+不依赖PyQt5，也不生成报告或调用AI。
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import cProfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 计算方式 -> (enable_multithreading, executor)
+EXECUTION_MODES = {
+    'sequential': (False, None),
+    'thread': (True, 'thread'),
+    'process': (True, 'process'),
+}
+
+
+def _has_pyarrow() -> bool:
+    """parquet/feather 需要可选依赖 pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _resolve_format(output_format: str) -> str:
+    """auto：有pyarrow时用parquet，否则用压缩CSV"""
+    if output_format != 'auto':
+        return output_format
+    return 'parquet' if _has_pyarrow() else 'csv'
+
+
+def _write_table(frame: pd.DataFrame, path_without_ext: str, output_format: str) -> str:
+    """按格式写出表格，返回实际文件路径"""
+    if output_format == 'parquet':
+        path = path_without_ext + '.parquet'
+        frame.to_parquet(path, index=False)
+    elif output_format == 'feather':
+        path = path_without_ext + '.feather'
+        frame.reset_index(drop=True).to_feather(path)
+    else:
+        path = path_without_ext + '.csv.gz'
+        frame.to_csv(path, index=False, encoding='utf-8', compression='gzip')
+    return path
+
+
+def _json_default(value: Any) -> Any:
+    """JSON序列化numpy/时间类型"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    return str(value)
+
+
+def stocks_frame(results) -> pd.DataFrame:
+    """
+    个股结果 -> 列式表（每只股票一行）
+
+    参数:
+        results: AnalysisResults
+
+    返回:
+        pd.DataFrame: 代码、名称、行业、趋势、RTSI、置信度、大盘股、算法、最近评分
+    """
+    table = results.stock_table
+    stocks = list(results.stocks.values())
+    return pd.DataFrame({
+        'code': table.codes,
+        'name': table.names,
+        'industry': table.industries,
+        'trend': table.trends,
+        'rtsi': table.rtsi,
+        'confidence': table.confidence,
+        'large_cap': table.large_cap,
+        'algorithm': [
+            data['rtsi'].get('algorithm') if isinstance(data.get('rtsi'), dict) else None
+            for data in stocks
+        ],
+        'last_score': [data.get('last_score') for data in stocks],
+    })
+
+
+def industries_frame(results) -> pd.DataFrame:
+    """
+    行业结果 -> 列式表（按行业分数降序，含名次）
+
+    参数:
+        results: AnalysisResults
+
+    返回:
+        pd.DataFrame: 行业、分数、名次、状态、股票数
+    """
+    from algorithms.ranking_table import top_n_indices
+    from algorithms.results_diff import industry_scores
+
+    names, scores = industry_scores(results.industries)
+    order = top_n_indices(scores, len(scores))
+    statuses, counts = [], []
+    for name in names[order]:
+        data = results.industries[name]
+        irsi_data = data.get('irsi') if isinstance(data.get('irsi'), dict) else {}
+        statuses.append(data.get('status', irsi_data.get('status')))
+        counts.append(data.get('stock_count', irsi_data.get('stock_count')))
+    return pd.DataFrame({
+        'industry': names[order],
+        'score': scores[order],
+        'rank': np.arange(1, len(order) + 1),
+        'status': statuses,
+        'stock_count': counts,
+    })
+
+
+def analyze_file(file_path: str, mode: str = 'sequential', workers: Optional[int] = None,
+                 chunk_size: Optional[int] = None, enhanced_tma: bool = True,
+                 top_n_leading: int = 5, incremental_msci: bool = True,
+                 concurrent_stages: bool = True, use_snapshot: bool = False,
+                 repeat: int = 1, profile_path: Optional[str] = None):
+    """
+    对一个数据文件运行完整分析
+
+    参数:
+        file_path: 评级数据文件
+        mode: 计算方式（sequential / thread / process）
+        workers: 最大工作线程/进程数，None使用引擎配置
+        chunk_size: 数据块大小，None使用引擎配置
+        enhanced_tma: 是否启用增强TMA
+        top_n_leading: 增强TMA使用的龙头股数量
+        incremental_msci: 是否使用增量MSCI
+        concurrent_stages: MSCI与个股RTSI是否并发
+        use_snapshot: 是否允许使用结果快照（基准测试时应关闭）
+        repeat: 重复计算次数（指标取最短耗时）
+        profile_path: 不为None时用cProfile分析最后一次计算并写入该文件
+
+    返回:
+        (AnalysisResults, 指标字典)
+    """
+    from data.stock_dataset import StockDataSet
+    from algorithms.realtime_engine import RealtimeAnalysisEngine
+
+    load_start = time.perf_counter()
+    dataset = StockDataSet(file_path)
+    load_time = time.perf_counter() - load_start
+
+    enable_multithreading, executor = EXECUTION_MODES[mode]
+    timings = []
+    results = None
+    for run in range(max(1, repeat)):
+        engine = RealtimeAnalysisEngine(dataset, enable_multithreading=enable_multithreading,
+                                        enable_enhanced_tma=enhanced_tma,
+                                        top_n_leading_stocks=top_n_leading)
+        if executor:
+            engine.config['executor'] = executor
+        if workers:
+            engine.config['max_workers'] = workers
+        if chunk_size:
+            engine.config['chunk_size'] = chunk_size
+        engine.config['incremental_msci'] = incremental_msci
+        engine.config['concurrent_stages'] = concurrent_stages
+        engine.config['result_snapshot'] = use_snapshot
+
+        profiler = cProfile.Profile() if profile_path and run == repeat - 1 else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        results = engine.calculate_all_metrics(force_refresh=not use_snapshot,
+                                               enable_emergency_timeout=False)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+        timings.append(time.perf_counter() - start)
+
+    metrics = {
+        'file': os.path.abspath(file_path),
+        'mode': mode,
+        'workers': engine.config.get('max_workers'),
+        'chunk_size': engine.config.get('chunk_size'),
+        'enhanced_tma': engine.enable_enhanced_tma,
+        'incremental_msci': incremental_msci,
+        'concurrent_stages': concurrent_stages,
+        'rows': len(dataset.get_raw_data()),
+        'stocks': len(results.stocks),
+        'industries': len(results.industries),
+        'load_seconds': load_time,
+        'calculation_seconds': min(timings),
+        'runs': timings,
+        'stage_seconds': results.metadata.get('stage_times', {}),
+        'partial': bool(results.metadata.get('partial', False)),
+        'finished_at': datetime.now().isoformat(),
+    }
+    return results, metrics
+
+
+def write_results(results, metrics: Dict, output_dir: str, output_format: str) -> Dict[str, str]:
+    """
+    写出一次分析的结果文件
+
+    参数:
+        results: AnalysisResults
+        metrics: analyze_file 返回的指标
+        output_dir: 输出目录（按数据文件名建子目录）
+        output_format: 表格格式（parquet / feather / csv）
+
+    返回:
+        dict: {'stocks'/'industries'/'market'/'metrics': 文件路径}
+    """
+    name = os.path.basename(metrics['file'])
+    for suffix in ('.json.gz', '.xlsx', '.json', '.gz'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    target_dir = os.path.join(output_dir, name)
+    os.makedirs(target_dir, exist_ok=True)
+
+    write_start = time.perf_counter()
+    paths = {
+        'stocks': _write_table(stocks_frame(results), os.path.join(target_dir, 'stocks'), output_format),
+        'industries': _write_table(industries_frame(results), os.path.join(target_dir, 'industries'),
+                                   output_format),
+        'market': os.path.join(target_dir, 'market.json'),
+        'metrics': os.path.join(target_dir, 'metrics.json'),
+    }
+    with open(paths['market'], 'w', encoding='utf-8') as f:
+        json.dump(results.market, f, ensure_ascii=False, indent=2, default=_json_default)
+
+    metrics['write_seconds'] = time.perf_counter() - write_start
+    metrics['outputs'] = {key: os.path.abspath(path) for key, path in paths.items()}
+    with open(paths['metrics'], 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2, default=_json_default)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='批量分析工具 - 无界面运行RTSI/IRSI/MSCI全量计算',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  python batch_analyze.py CN_Data5000.json.gz                          # 顺序计算，结果写入 output/batch
+  python batch_analyze.py HK_Data1000.json.gz US_Data1000.json.gz      # 多个文件依次计算
+  python batch_analyze.py CN_Data5000.json.gz --mode process -w 8      # 8进程分块计算
+  python batch_analyze.py CN_Data5000.json.gz --repeat 3 --quiet       # 基准测试（取最短耗时）
+  python batch_analyze.py CN_Data5000.json.gz --profile                # 输出cProfile结果
+        """
+    )
+    parser.add_argument('files', nargs='+', help='评级数据文件（.json.gz / .xlsx）')
+    parser.add_argument('--mode', choices=list(EXECUTION_MODES), default='sequential',
+                        help='个股RTSI计算方式（默认 sequential）')
+    parser.add_argument('--workers', '-w', type=int, help='最大工作线程/进程数')
+    parser.add_argument('--chunk-size', type=int, help='数据块股票数')
+    parser.add_argument('--no-enhanced-tma', action='store_true', help='关闭增强TMA')
+    parser.add_argument('--top-n-leading', type=int, default=5, help='增强TMA使用的龙头股数量')
+    parser.add_argument('--no-incremental-msci', action='store_true', help='关闭增量MSCI')
+    parser.add_argument('--sequential-stages', action='store_true', help='各阶段按依赖顺序逐个执行（不并发）')
+    parser.add_argument('--use-snapshot', action='store_true', help='允许使用/写入结果快照（默认强制重算）')
+    parser.add_argument('--repeat', type=int, default=1, help='重复计算次数')
+    parser.add_argument('--output-dir', '-o', default=os.path.join('output', 'batch'), help='输出目录')
+    parser.add_argument('--format', '-f', choices=['auto', 'parquet', 'feather', 'csv'], default='auto',
+                        help='表格格式（auto：有pyarrow时为parquet，否则为csv.gz）')
+    parser.add_argument('--profile', action='store_true', help='用cProfile分析计算，写入输出目录')
+    parser.add_argument('--quiet', '-q', action='store_true', help='静默模式（只输出警告和汇总）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.quiet:
+        from algorithms.log_control import set_quiet
+        set_quiet(True)
+
+    if args.format in ('parquet', 'feather') and not _has_pyarrow():
+        parser.error(f"--format {args.format} 需要安装 pyarrow")
+    output_format = _resolve_format(args.format)
+    os.makedirs(args.output_dir, exist_ok=True)
+    summary = []
+    failed = 0
+
+    for file_path in args.files:
+        if not os.path.exists(file_path):
+            print(f"错误 文件不存在: {file_path}")
+            failed += 1
+            continue
+        profile_path = None
+        if args.profile:
+            base = os.path.basename(file_path).split('.')[0]
+            profile_path = os.path.join(args.output_dir, f"{base}.prof")
+        try:
+            results, metrics = analyze_file(
+                file_path, mode=args.mode, workers=args.workers, chunk_size=args.chunk_size,
+                enhanced_tma=not args.no_enhanced_tma, top_n_leading=args.top_n_leading,
+                incremental_msci=not args.no_incremental_msci,
+                concurrent_stages=not args.sequential_stages,
+                use_snapshot=args.use_snapshot, repeat=args.repeat, profile_path=profile_path)
+            if profile_path:
+                metrics['profile'] = os.path.abspath(profile_path)
+            write_results(results, metrics, args.output_dir, output_format)
+        except Exception as e:
+            logger.exception(f"分析失败 {file_path}: {e}")
+            failed += 1
+            continue
+
+        summary.append(metrics)
+        stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in metrics['stage_seconds'].items())
+        print(f"成功 {file_path}: {metrics['stocks']}只股票, {metrics['industries']}个行业, "
+              f"加载 {metrics['load_seconds']:.2f}s, 计算 {metrics['calculation_seconds']:.2f}s ({stages}), "
+              f"写出 {metrics['write_seconds']:.2f}s -> {os.path.dirname(metrics['outputs']['metrics'])}")
+
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=_json_default)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
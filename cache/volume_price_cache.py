@@ -8,17 +8,29 @@
 2. 自动剔除无数据的交易日，保持数据连续性
 3. 为AI分析和趋势图表提供统一接口
 4. 支持多市场(CN/HK/US)数据获取
+5. 按(市场, 代码)缓存最长的已获取窗口，较短的请求直接切片，不重复获取
+6. 有界LRU，同一只股票的并发请求只获取一次（按键加锁，不持有全局锁做I/O）
+7. 本地数据源的缓存按市场持久化到 cache/volume_price_<market>.vpc，
+   数据文件（路径、大小、修改时间）变化时自动失效
 
 作者: AI Assistant
-版本: 1.0.0
+版本: 1.1.0
 """
 
 import os
 import sys
 import json
+import zlib
+import pickle
+import struct
+import time
+import atexit
 import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import logging
 
@@ -43,30 +55,70 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# 默认最多缓存的股票数（每只股票一个条目，与请求天数无关）
+DEFAULT_MAX_ENTRIES = 6000
+
+# 预取时所有数据源都没有数据的股票，在此时间（秒）内直接返回None，不再重复访问数据源
+MISSING_TTL = 600
+
+# 持久化文件格式：魔数 + 头部长度 + JSON头部（版本、数据源指纹）+ zlib压缩的pickle正文
+CACHE_FILE_VERSION = 1
+_CACHE_MAGIC = b'AIVP'
+_HEADER_SIZE = struct.Struct('<I')
+
+
+def get_default_cache_dir() -> str:
+    """持久化缓存目录（与其他缓存一致，默认为项目的 cache 目录）"""
+    try:
+        from utils.path_helper import get_cache_dir
+        return str(get_cache_dir())
+    except Exception:
+        return current_dir
+
+
 class VolumePriceCacheManager:
     """统一量价数据缓存管理器"""
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 persist: bool = True, cache_dir: Optional[str] = None, use_network: bool = True):
         """
         初始化缓存管理器
         
         Args:
             verbose: 是否输出详细日志
+            max_entries: 最多缓存的股票数，超出时淘汰最久未使用的
+            persist: 是否从磁盘加载/保存本地数据源的缓存
+            cache_dir: 持久化目录，None使用默认缓存目录
+            use_network: 本地数据源没有数据时是否使用AKShare备用数据源
         """
         self.verbose = verbose
         self.search_tool = StockSearchTool(verbose=verbose)
+        self.max_entries = max(1, int(max_entries))
+        self.persist = persist
+        self.use_network = use_network
+        self.cache_dir = cache_dir or get_default_cache_dir()
         
-        # 缓存存储 - 使用嵌套字典: {market: {stock_code: {days: data}}}
-        self._cache = {}
+        # 缓存存储 - LRU有序字典: {(market, CODE): (已获取天数, 格式化数据)}
+        self._cache: OrderedDict = OrderedDict()
         
-        # 线程锁，确保缓存操作的线程安全
+        # 全局锁只保护缓存字典和统计，数据获取在各自的键锁下进行
         self._lock = threading.RLock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        
+        # 预取确认无数据的股票: {(market, CODE): 过期时间(time.monotonic)}
+        self._missing: Dict[Tuple[str, str], float] = {}
+        
+        # 持久化状态：已从磁盘加载的市场、有未保存修改的市场、加载时的数据源指纹
+        self._loaded_markets = set()
+        self._dirty_markets = set()
+        self._sources: Dict[str, Dict[str, Any]] = {}
         
         # 缓存统计
         self._cache_stats = {
             'hits': 0,
             'misses': 0,
-            'total_requests': 0
+            'total_requests': 0,
+            'evictions': 0
         }
         
         # 市场检测映射
@@ -85,9 +137,71 @@ class VolumePriceCacheManager:
             timestamp = datetime.now().strftime("%H:%M:%S")
             print(f"[{timestamp}] {level}: {message}")
     
-    def _generate_cache_key(self, stock_code: str, market: str, days: int) -> str:
-        """生成缓存键"""
-        return f"{market.lower()}_{stock_code.upper()}_{days}"
+    def _normalize_market(self, market: str) -> str:
+        """标准化市场参数"""
+        market = market.lower()
+        if market not in ['cn', 'hk', 'us']:
+            market = self._market_mapping.get(market, 'cn')
+        return market
+    
+    def _generate_cache_key(self, stock_code: str, market: str) -> Tuple[str, str]:
+        """生成缓存键（与天数无关，同一只股票只缓存最长的窗口）"""
+        return market.lower(), self._clean_stock_code(stock_code).upper()
+    
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        """获取单只股票的获取锁，保证同一只股票同时只有一个线程在获取"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+    
+    @staticmethod
+    def _slice_window(data: Dict[str, Any], days: int) -> Dict[str, Any]:
+        """从较长窗口的缓存数据中取最近days天（数据已按日期正序排列）"""
+        if data.get('requested_days', days) == days and data.get('total_days', 0) <= days:
+            return data
+        
+        window = data['data'][-days:] if days > 0 else []
+        sliced = dict(data)
+        sliced['data'] = window
+        sliced['total_days'] = len(window)
+        if 'requested_days' in data:
+            sliced['requested_days'] = days
+        return sliced
+    
+    def _lookup(self, key: Tuple[str, str], days: int) -> Optional[Dict[str, Any]]:
+        """查找覆盖days天的缓存（需持有self._lock）"""
+        entry = self._cache.get(key)
+        if entry is None or entry[0] < days:
+            return None
+        self._cache.move_to_end(key)
+        return self._slice_window(entry[1], days)
+    
+    def _is_known_missing(self, key: Tuple[str, str]) -> bool:
+        """是否为近期预取确认无数据的股票（需持有self._lock）"""
+        expiry = self._missing.get(key)
+        if expiry is None:
+            return False
+        if expiry < time.monotonic():
+            del self._missing[key]
+            return False
+        return True
+    
+    def _store(self, key: Tuple[str, str], days: int, data: Dict[str, Any]):
+        """存入缓存并按LRU淘汰（已有更长窗口时保留更长的）"""
+        with self._lock:
+            self._missing.pop(key, None)
+            existing = self._cache.get(key)
+            if existing is None or existing[0] <= days:
+                self._cache[key] = (days, data)
+                self._dirty_markets.add(key[0])
+            self._cache.move_to_end(key)
+            
+            while len(self._cache) > self.max_entries:
+                (market, _), _ = self._cache.popitem(last=False)
+                self._dirty_markets.add(market)
+                self._cache_stats['evictions'] += 1
     
     def _clean_trading_data(self, trade_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -218,73 +332,91 @@ class VolumePriceCacheManager:
         Returns:
             Dict: 格式化的量价数据，如果获取失败返回None
         """
+        market = self._normalize_market(market)
+        key = self._generate_cache_key(stock_code, market)
+        
+        # 检查缓存（已缓存更长的窗口时直接切片）
         with self._lock:
             self._cache_stats['total_requests'] += 1
-            
-            # 标准化市场参数
-            market = market.lower()
-            if market not in ['cn', 'hk', 'us']:
-                market = self._market_mapping.get(market, 'cn')
-            
-            # 生成缓存键
-            cache_key = self._generate_cache_key(stock_code, market, days)
-            
-            # 检查缓存
-            if market in self._cache and cache_key in self._cache[market]:
+            self._ensure_market_loaded(market)
+            cached_data = self._lookup(key, days)
+            if cached_data is not None:
                 self._cache_stats['hits'] += 1
-                cached_data = self._cache[market][cache_key]
                 self._log(f"缓存命中: {stock_code}({market.upper()}) - {days}天")
                 return cached_data
+            if self._is_known_missing(key):
+                self._cache_stats['misses'] += 1
+                return None
+        
+        # 缓存未命中：只锁这只股票，其他股票的获取不受影响
+        with self._key_lock(key):
+            with self._lock:
+                cached_data = self._lookup(key, days)
+                if cached_data is not None:
+                    # 等待期间其他线程已获取
+                    self._cache_stats['hits'] += 1
+                    return cached_data
+                self._cache_stats['misses'] += 1
             
-            # 缓存未命中，从数据源获取
-            self._cache_stats['misses'] += 1
             self._log(f"缓存未命中，获取数据: {stock_code}({market.upper()}) - {days}天")
+            formatted_data = self._fetch_volume_price_data(stock_code, market, days)
+            if not formatted_data:
+                return None
+            
+            self._store(key, days, formatted_data)
+            self._log(f"数据已缓存: {stock_code}({market.upper()}) - 实际{formatted_data['total_days']}天")
+            return formatted_data
+    
+    def _fetch_volume_price_data(self, stock_code: str, market: str, days: int) -> Optional[Dict[str, Any]]:
+        """
+        从数据源获取量价数据（本地数据源优先，失败时使用AKShare）
+        
+        Args:
+            stock_code: 股票代码
+            market: 标准化后的市场类型
+            days: 获取天数
+            
+        Returns:
+            Dict: 格式化的量价数据，如果获取失败返回None
+        """
+        try:
+            # 清理股票代码格式
+            clean_code = self._clean_stock_code(stock_code)
+            formatted_data = None
             
+            # 优先使用本地数据源（cn-lj.dat/hk-lj.dat/us-lj.dat）
             try:
-                # 清理股票代码格式
-                clean_code = self._clean_stock_code(stock_code)
-                formatted_data = None
+                self._log(f"优先尝试本地数据源: {stock_code}({market.upper()}) - {days}天")
+                results = self.search_tool.search_stock_by_code(clean_code, market, days)
                 
-                # 优先使用本地数据源（cn-lj.dat/hk-lj.dat/us-lj.dat）
+                if results:
+                    # 获取第一个市场的数据（通常只有一个）
+                    stock_data = list(results.values())[0]
+                    formatted_data = self._format_volume_price_data(stock_data, days)
+                    if formatted_data:
+                        self._log(f"✅ 本地数据源获取成功: {stock_code}({market.upper()}) - {formatted_data['total_days']}天")
+            except Exception as e:
+                self._log(f"本地数据源获取失败: {stock_code}({market}) - {e}", "WARNING")
+            
+            # 如果本地数据源失败，使用AKShare作为备用方案
+            if not formatted_data and self.use_network:
                 try:
-                    self._log(f"优先尝试本地数据源: {stock_code}({market.upper()}) - {days}天")
-                    results = self.search_tool.search_stock_by_code(clean_code, market, days)
-                    
-                    if results:
-                        # 获取第一个市场的数据（通常只有一个）
-                        stock_data = list(results.values())[0]
-                        formatted_data = self._format_volume_price_data(stock_data, days)
-                        if formatted_data:
-                            self._log(f"✅ 本地数据源获取成功: {stock_code}({market.upper()}) - {formatted_data['total_days']}天")
+                    self._log(f"使用AKShare备用数据源: {stock_code}({market.upper()}) - {days}天")
+                    formatted_data = self._get_data_from_akshare(clean_code, market, days)
+                    if formatted_data:
+                        self._log(f"✅ AKShare备用获取成功: {stock_code}({market.upper()}) - {formatted_data['total_days']}天")
                 except Exception as e:
-                    self._log(f"本地数据源获取失败: {stock_code}({market}) - {e}", "WARNING")
-                
-                # 如果本地数据源失败，使用AKShare作为备用方案
-                if not formatted_data:
-                    try:
-                        self._log(f"使用AKShare备用数据源: {stock_code}({market.upper()}) - {days}天")
-                        formatted_data = self._get_data_from_akshare(clean_code, market, days)
-                        if formatted_data:
-                            self._log(f"✅ AKShare备用获取成功: {stock_code}({market.upper()}) - {formatted_data['total_days']}天")
-                    except Exception as e:
-                        self._log(f"AKShare备用获取失败: {stock_code}({market}) - {e}", "WARNING")
-                
-                if not formatted_data:
-                    self._log(f"所有数据源均失败: {stock_code}({market})", "ERROR")
-                    return None
-                
-                # 存入缓存
-                if market not in self._cache:
-                    self._cache[market] = {}
-                
-                self._cache[market][cache_key] = formatted_data
-                self._log(f"数据已缓存: {stock_code}({market.upper()}) - 实际{formatted_data['total_days']}天")
-                    
-                return formatted_data
-                
-            except Exception as e:
-                self._log(f"获取量价数据失败: {stock_code}({market}) - {e}", "ERROR")
+                    self._log(f"AKShare备用获取失败: {stock_code}({market}) - {e}", "WARNING")
+            
+            if not formatted_data:
+                self._log(f"所有数据源均失败: {stock_code}({market})", "ERROR")
                 return None
+            
+            return formatted_data
+            
+        except Exception as e:
+            self._log(f"获取量价数据失败: {stock_code}({market}) - {e}", "ERROR")
+            return None
     
     def _get_data_from_akshare(self, stock_code: str, market: str, days: int) -> Optional[Dict[str, Any]]:
         """
@@ -398,36 +530,107 @@ class VolumePriceCacheManager:
         
         return str(stock_code).strip()
     
-    def prefetch_data(self, stock_codes: List[str], market: str, days: int = 38) -> Dict[str, bool]:
+    def prefetch_data(self, stock_codes: List[str], market: str, days: int = 38,
+                      use_network: bool = True, max_network_workers: int = 4,
+                      should_stop: Optional[Callable[[], Any]] = None) -> Dict[str, bool]:
         """
         预取多只股票的量价数据
         
+        未缓存的股票通过本地数据源一次批量查询取回，只有本地没有数据的股票才交给
+        AKShare备用数据源（每批max_network_workers个并发）。所有数据源都没有数据的
+        股票在MISSING_TTL秒内直接返回None，之后逐只获取时不会再阻塞在数据源上。
+        
         Args:
             stock_codes: 股票代码列表
             market: 市场类型
             days: 获取天数
+            use_network: 本地没有数据时是否使用AKShare备用数据源（管理器禁用网络时无效）
+            max_network_workers: AKShare并发获取数
+            should_stop: 每批AKShare获取前调用，返回真值时停止预取（剩余股票记为未预取）
             
         Returns:
             Dict: {stock_code: success_bool} 预取结果
         """
+        market = self._normalize_market(market)
         results = {}
         self._log(f"开始预取 {len(stock_codes)} 只股票的量价数据({market.upper()}市场)")
         
-        for stock_code in stock_codes:
+        # 已缓存足够长窗口的股票无需获取
+        missing = []
+        with self._lock:
+            self._ensure_market_loaded(market)
+            for stock_code in stock_codes:
+                entry = self._cache.get(self._generate_cache_key(stock_code, market))
+                if entry is not None and entry[0] >= days:
+                    results[stock_code] = True
+                else:
+                    missing.append(stock_code)
+        
+        # 本地数据源：一次批量查询
+        remainder = []
+        if missing:
             try:
-                data = self.get_volume_price_data(stock_code, market, days)
-                results[stock_code] = data is not None
+                batch = self.search_tool.search_stocks_by_codes(
+                    [self._clean_stock_code(stock_code) for stock_code in missing], market, days)
             except Exception as e:
-                self._log(f"预取失败 {stock_code}: {e}", "ERROR")
-                results[stock_code] = False
+                self._log(f"本地数据源批量获取失败({market.upper()}): {e}", "WARNING")
+                batch = {}
+            
+            for stock_code in missing:
+                stock_data = batch.get(self._clean_stock_code(stock_code))
+                formatted_data = self._format_volume_price_data(stock_data, days) if stock_data else None
+                if formatted_data:
+                    self._store(self._generate_cache_key(stock_code, market), days, formatted_data)
+                    results[stock_code] = True
+                else:
+                    remainder.append(stock_code)
+        
+        # 本地没有数据的股票：按批有限并发使用AKShare，每批之前检查是否需要停止
+        if remainder and use_network and self.use_network:
+            self._log(f"本地无数据 {len(remainder)} 只，使用AKShare备用数据源")
+            workers = max(1, min(max_network_workers, len(remainder)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for start in range(0, len(remainder), workers):
+                    if should_stop is not None and should_stop():
+                        self._log(f"预取已停止，剩余 {len(remainder) - start} 只未获取")
+                        break
+                    batch_codes = remainder[start:start + workers]
+                    fetched = list(executor.map(lambda code: self._prefetch_from_network(code, market, days),
+                                                batch_codes))
+                    
+                    expiry = time.monotonic() + MISSING_TTL
+                    with self._lock:
+                        for stock_code, success in zip(batch_codes, fetched):
+                            results[stock_code] = success
+                            if not success:
+                                self._missing[self._generate_cache_key(stock_code, market)] = expiry
+        for stock_code in remainder:
+            results.setdefault(stock_code, False)
         
         success_count = sum(results.values())
         self._log(f"预取完成: {success_count}/{len(stock_codes)} 成功")
         return results
     
+    def _prefetch_from_network(self, stock_code: str, market: str, days: int) -> bool:
+        """预取时从AKShare获取单只股票（与逐只获取共用键锁，不重复获取）"""
+        key = self._generate_cache_key(stock_code, market)
+        with self._key_lock(key):
+            with self._lock:
+                if self._lookup(key, days) is not None:
+                    return True
+            try:
+                formatted_data = self._get_data_from_akshare(self._clean_stock_code(stock_code), market, days)
+            except Exception as e:
+                self._log(f"AKShare备用获取失败: {stock_code}({market}) - {e}", "WARNING")
+                formatted_data = None
+            if not formatted_data:
+                return False
+            self._store(key, days, formatted_data)
+            return True
+    
     def clear_cache(self, market: str = None, stock_code: str = None):
         """
-        清理缓存
+        清理缓存（持久化文件在下次保存时同步清理）
         
         Args:
             market: 指定市场清理，None表示清理所有
@@ -436,25 +639,35 @@ class VolumePriceCacheManager:
         with self._lock:
             if market is None:
                 # 清理全部缓存
+                self._dirty_markets.update(self._loaded_markets)
                 self._cache.clear()
+                self._missing.clear()
                 self._log("已清理全部缓存")
-            elif market in self._cache:
-                if stock_code is None:
-                    # 清理指定市场的所有缓存
-                    del self._cache[market]
-                    self._log(f"已清理{market.upper()}市场缓存")
-                else:
-                    # 清理指定股票的缓存
-                    market_cache = self._cache[market]
-                    keys_to_remove = [k for k in market_cache.keys() if stock_code.upper() in k]
-                    for key in keys_to_remove:
-                        del market_cache[key]
-                    self._log(f"已清理股票{stock_code}在{market.upper()}市场的缓存")
+                return
+            
+            market = self._normalize_market(market)
+            self._ensure_market_loaded(market)
+            if stock_code is None:
+                # 清理指定市场的所有缓存
+                for key in [key for key in self._cache if key[0] == market]:
+                    del self._cache[key]
+                for key in [key for key in self._missing if key[0] == market]:
+                    del self._missing[key]
+                self._log(f"已清理{market.upper()}市场缓存")
+            else:
+                # 清理指定股票的缓存
+                key = self._generate_cache_key(stock_code, market)
+                self._cache.pop(key, None)
+                self._missing.pop(key, None)
+                self._log(f"已清理股票{stock_code}在{market.upper()}市场的缓存")
+            self._dirty_markets.add(market)
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
         with self._lock:
-            total_cached_items = sum(len(market_cache) for market_cache in self._cache.values())
+            cache_details = {}
+            for market, _ in self._cache:
+                cache_details[market] = cache_details.get(market, 0) + 1
             hit_rate = (self._cache_stats['hits'] / max(1, self._cache_stats['total_requests'])) * 100
             
             return {
@@ -462,11 +675,11 @@ class VolumePriceCacheManager:
                 'cache_hits': self._cache_stats['hits'],
                 'cache_misses': self._cache_stats['misses'],
                 'hit_rate_percent': round(hit_rate, 2),
-                'total_cached_items': total_cached_items,
-                'cached_markets': list(self._cache.keys()),
-                'cache_details': {
-                    market: len(cache) for market, cache in self._cache.items()
-                }
+                'total_cached_items': len(self._cache),
+                'max_entries': self.max_entries,
+                'evictions': self._cache_stats['evictions'],
+                'cached_markets': list(cache_details.keys()),
+                'cache_details': cache_details
             }
     
     def get_cached_stock_list(self, market: str = None) -> List[str]:
@@ -482,27 +695,111 @@ class VolumePriceCacheManager:
         with self._lock:
             if market:
                 market = market.lower()
-                if market in self._cache:
-                    # 从缓存键中提取股票代码
-                    codes = set()
-                    for cache_key in self._cache[market].keys():
-                        # cache_key格式: market_stockcode_days
-                        parts = cache_key.split('_')
-                        if len(parts) >= 3:
-                            stock_code = '_'.join(parts[1:-1])  # 处理包含下划线的代码
-                            codes.add(stock_code)
-                    return sorted(list(codes))
-                return []
-            else:
-                # 返回所有市场的股票
-                all_codes = set()
-                for market_cache in self._cache.values():
-                    for cache_key in market_cache.keys():
-                        parts = cache_key.split('_')
-                        if len(parts) >= 3:
-                            stock_code = '_'.join(parts[1:-1])
-                            all_codes.add(stock_code)
-                return sorted(list(all_codes))
+                return sorted({code for cached_market, code in self._cache if cached_market == market})
+            return sorted({code for _, code in self._cache})
+    
+    def has_local_source(self, market: str) -> bool:
+        """市场是否有本地量价数据文件"""
+        return self._source_fingerprint(self._normalize_market(market)) is not None
+    
+    def _cache_file(self, market: str) -> str:
+        """市场对应的持久化文件路径"""
+        return os.path.join(self.cache_dir, f"volume_price_{market}.vpc")
+    
+    def _source_fingerprint(self, market: str) -> Optional[Dict[str, Any]]:
+        """本地数据文件的指纹（路径、大小、修改时间），数据文件不存在时返回None"""
+        candidates = [getattr(self.search_tool, 'data_files', {}).get(market),
+                      getattr(self.search_tool, 'fallback_data_files', {}).get(market)]
+        for path in candidates:
+            if path and os.path.isfile(path):
+                stat = os.stat(path)
+                return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        return None
+    
+    def _ensure_market_loaded(self, market: str):
+        """首次访问某个市场时从磁盘加载缓存（需持有self._lock）"""
+        if market in self._loaded_markets:
+            return
+        self._loaded_markets.add(market)
+        if not self.persist:
+            return
+        
+        source = self._source_fingerprint(market)
+        if source is None:
+            return
+        self._sources[market] = source
+        
+        path = self._cache_file(market)
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_CACHE_MAGIC)) != _CACHE_MAGIC:
+                    raise ValueError("不是量价缓存文件")
+                (size,) = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+                header = json.loads(f.read(size).decode('utf-8'))
+                if header.get('version') != CACHE_FILE_VERSION or header.get('source') != source:
+                    self._log(f"{market.upper()}市场数据文件已变化，忽略磁盘缓存")
+                    return
+                entries = pickle.loads(zlib.decompress(f.read()))
+        except Exception as e:
+            logger.warning(f"加载量价缓存失败 {path}: {e}")
+            return
+        
+        # 磁盘上的条目视为最久未使用
+        for code, entry in reversed(list(entries.items())):
+            key = (market, code)
+            if key not in self._cache:
+                self._cache[key] = entry
+                self._cache.move_to_end(key, last=False)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        self._log(f"已加载{market.upper()}市场磁盘缓存: {len(entries)}只股票")
+    
+    def save_cache(self, market: str = None) -> bool:
+        """
+        把本地数据源的缓存保存到磁盘（只保存有修改的市场，AKShare数据不持久化）
+        
+        Args:
+            market: 指定市场，None表示所有有修改的市场
+            
+        Returns:
+            bool: 是否全部保存成功
+        """
+        if not self.persist:
+            return True
+        
+        with self._lock:
+            markets = [m for m in self._dirty_markets if market is None or m == market]
+            snapshots = {}
+            for m in markets:
+                source = self._sources.get(m)
+                if source is not None:
+                    snapshots[m] = (source, {code: entry for (cached_market, code), entry in self._cache.items()
+                                             if cached_market == m and entry[1].get('data_source') != 'akshare'})
+                self._dirty_markets.discard(m)
+        
+        success = True
+        for m, (source, entries) in snapshots.items():
+            path = self._cache_file(m)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                header = json.dumps({'version': CACHE_FILE_VERSION, 'source': source}).encode('utf-8')
+                body = zlib.compress(pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL), 6)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(_CACHE_MAGIC)
+                    f.write(_HEADER_SIZE.pack(len(header)))
+                    f.write(header)
+                    f.write(body)
+                os.replace(tmp_path, path)
+                self._log(f"已保存{m.upper()}市场量价缓存: {len(entries)}只股票 ({len(body) / 1024:.1f}KB)")
+            except Exception as e:
+                logger.warning(f"保存量价缓存失败 {path}: {e}")
+                with self._lock:
+                    self._dirty_markets.add(m)
+                success = False
+        return success
 
 
 # 全局缓存管理器实例
@@ -513,6 +810,10 @@ def get_cache_manager(verbose: bool = False) -> VolumePriceCacheManager:
     global _global_cache_manager
     if _global_cache_manager is None:
         _global_cache_manager = VolumePriceCacheManager(verbose=verbose)
+        # 退出时把新获取的数据写回磁盘；只在主进程保存，工作进程（spawn时同样执行atexit）
+        # 各自只有部分数据，整文件覆盖会丢掉其他进程获取的条目
+        if multiprocessing.parent_process() is None:
+            atexit.register(_global_cache_manager.save_cache)
     return _global_cache_manager
 
 def get_volume_price_data(stock_code: str, market: str, days: int = 38) -> Optional[Dict[str, Any]]:
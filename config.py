@@ -175,6 +175,21 @@ MSCI_CONFIG = {
     'pessimistic_threshold': 15     # 悲观阈值
 }
 
+# 实时分析引擎配置
+ENGINE_CONFIG = {
+    'cache_ttl': 600,               # 结果缓存时间(秒)
+    'max_workers': 4,               # 最大工作线程/进程数
+    'chunk_size': 100,              # 多进程模式每个数据块的股票数
+    'timeout': 180,                 # 计算超时(秒)
+    'executor': 'process',          # 个股并行方式: 'process' 分块多进程 / 'thread' 多线程
+    'incremental_msci': True,       # 增量MSCI（持久化每日直方图）
+    'concurrent_stages': True,      # MSCI与个股RTSI并发计算
+    'result_snapshot': True,        # 按数据指纹持久化完整结果（cache/results_*.snap）
+    'prefetch_volume_price': True,  # 个股RTSI阶段前批量预取智能RTSI的量价数据
+    'quiet_logging': False,         # 静默模式: 算法/数据模块只输出WARNING及以上
+    'progress_interval': 2.0        # 进度日志的最小输出间隔(秒)
+}
+
 # =============================================================================
 # GUI界面配置
 # =============================================================================
@@ -283,6 +298,7 @@ def get_config(section: str, key: str = None, default: Any = None) -> Any:
         'rtsi': RTSI_CONFIG,
         'irsi': IRSI_CONFIG,
         'msci': MSCI_CONFIG,
+        'engine': ENGINE_CONFIG,
         'gui': GUI_CONFIG,
         'chart': CHART_CONFIG,
         'excel': EXCEL_CONFIG,
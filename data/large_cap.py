@@ -0,0 +1,198 @@
+"""
+大盘股分类表
+
+每个市场只构建一次：
+1. 优先根据量价数据库（cn-lj.dat.gz / hk-lj.dat.gz / us-lj.dat.gz）中
+   最近几个交易日的平均成交金额排名，前 LARGE_CAP_TOP_RATIO 的个股为大盘股，指数不算大盘股
+2. 数据库不存在或股票不在数据库中时，回退到按代码规则和知名大盘股名单判断
+
+构建后查询为O(1)的字典查找，可直接生成与数据集行对齐的布尔列。
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 成交金额排名前30%的个股视为大盘股
+LARGE_CAP_TOP_RATIO = 0.3
+# 平均成交金额使用的交易日数
+AMOUNT_DAYS = 5
+
+# 知名港股大盘股代码
+LARGE_CAP_HK_CODES = frozenset({
+    '00700', '00939', '00388', '00005', '00001', '00002', '00003', '00004',
+    '00011', '00012', '00016', '00017', '00019', '00023', '00027', '00066',
+    '00083', '00101', '00135', '00144', '00151', '00175', '00267', '00288',
+    '00386', '00688', '00762', '00823', '00857', '00883', '00941', '00992',
+    '01038', '01044', '01088', '01093', '01109', '01113', '01171', '01177',
+    '01299', '01398', '01818', '01928', '01997', '02007', '02018', '02020',
+    '02202', '02318', '02319', '02382', '02388', '02628', '03328', '03988'
+})
+
+# 知名美股大盘股代码
+LARGE_CAP_US_CODES = frozenset({
+    'AAPL', 'MSFT', 'GOOGL', 'GOOG', 'AMZN', 'TSLA', 'META', 'NVDA',
+    'BRK.A', 'BRK.B', 'UNH', 'JNJ', 'JPM', 'V', 'PG', 'HD', 'MA', 'PFE',
+    'ABBV', 'BAC', 'KO', 'AVGO', 'PEP', 'TMO', 'COST', 'DIS', 'ABT',
+    'MRK', 'ACN', 'VZ', 'CRM', 'DHR', 'ADBE', 'NKE', 'TXN', 'LIN',
+    'WMT', 'NEE', 'AMD', 'BMY', 'PM', 'RTX', 'QCOM', 'HON', 'T',
+    'UPS', 'ORCL', 'COP', 'MS', 'SCHW', 'LOW', 'CAT', 'GS', 'IBM',
+    'AXP', 'BLK', 'DE', 'ELV', 'LMT', 'SYK', 'TJX', 'MDT', 'ADP',
+    'GE', 'C', 'MDLZ', 'ISRG', 'REGN', 'CB', 'MMC', 'SO', 'PLD',
+    'NOW', 'ZTS', 'ICE', 'DUK', 'SHW', 'CMG', 'WM', 'GD', 'TGT',
+    'BDX', 'ITW', 'EOG', 'FIS', 'NSC', 'SRE', 'MU', 'BSX', 'FCX'
+})
+
+_classifiers: Dict[str, 'LargeCapClassifier'] = {}
+_classifiers_lock = threading.Lock()
+
+
+def is_large_cap_by_code(stock_code: str) -> bool:
+    """
+    按代码规则判断是否为大盘股（无量价数据时的回退规则）
+
+    - A股：以00、60开头的主板股票
+    - 港股：知名港股大盘股名单
+    - 美股：知名美股大盘股名单
+    """
+    code = str(stock_code).strip()
+
+    # A股：主板股票（00、60开头，含001、002）
+    if len(code) == 6 and code.isdigit():
+        return code.startswith('00') or code.startswith('60')
+
+    # 港股（5位数字）
+    if len(code) == 5 and code.isdigit():
+        return code in LARGE_CAP_HK_CODES
+
+    # 美股（字母代码）
+    if code.isalpha():
+        return code.upper() in LARGE_CAP_US_CODES
+
+    return False
+
+
+def market_from_code(stock_code: str) -> str:
+    """根据代码格式推断市场：6位数字为cn，5位数字为hk，其余为us"""
+    code = str(stock_code).strip()
+    if code.isdigit():
+        return 'cn' if len(code) == 6 else 'hk'
+    return 'us'
+
+
+class LargeCapClassifier:
+    """
+    单个市场的大盘股分类表
+
+    Attributes:
+        market: 市场代码（cn/hk/us）
+        source: 分类来源（'amount' 成交金额排名 / 'rules' 代码规则）
+    """
+
+    def __init__(self, market: str, flags: Optional[Dict[str, bool]] = None, source: str = 'rules'):
+        """
+        Args:
+            market: 市场代码
+            flags: {股票代码: 是否大盘股}，不在表中的代码按代码规则判断
+            source: 分类来源
+        """
+        self.market = market
+        self.source = source
+        self._flags = dict(flags or {})
+
+    @classmethod
+    def from_lj_database(cls, db_path: str, market: str,
+                         top_ratio: float = LARGE_CAP_TOP_RATIO,
+                         days: int = AMOUNT_DAYS) -> 'LargeCapClassifier':
+        """
+        根据量价数据库的最近平均成交金额构建分类表
+
+        Args:
+            db_path: 量价数据文件路径（*-lj.dat.gz）
+            market: 市场代码
+            top_ratio: 成交金额排名前多少比例为大盘股
+            days: 平均成交金额使用的交易日数
+
+        Returns:
+            LargeCapClassifier: 分类表
+        """
+        from lj_read import StockDataReaderV2
+
+        reader = StockDataReaderV2(db_path)
+        amounts = reader.get_recent_average_amount(days=days, data_type='stock')
+        index_symbols = reader.get_indices_only()['symbol'].astype(str)
+
+        flags = {str(symbol): False for symbol in index_symbols}
+        if amounts:
+            symbols = np.array([str(symbol) for symbol in amounts], dtype=object)
+            values = np.array(list(amounts.values()), dtype=np.float64)
+            n_large = max(1, int(round(len(values) * top_ratio)))
+            large = np.zeros(len(values), dtype=bool)
+            large[np.argsort(-values, kind='stable')[:n_large]] = True
+            flags.update(zip(symbols, large.tolist()))
+
+        logger.info(f"[大盘股] {market}: 按近{days}日成交金额分类 {len(amounts)} 只股票, "
+                    f"大盘股 {sum(flags.values())} 只")
+        return cls(market, flags, source='amount')
+
+    def is_large_cap(self, stock_code: str) -> bool:
+        """是否为大盘股（O(1)）"""
+        code = str(stock_code).strip()
+        flag = self._flags.get(code)
+        if flag is None:
+            flag = is_large_cap_by_code(code)
+            self._flags[code] = flag
+        return flag
+
+    def classify(self, codes: Iterable[str]) -> np.ndarray:
+        """批量分类，返回与codes对齐的布尔数组"""
+        return np.array([self.is_large_cap(code) for code in codes], dtype=bool)
+
+
+def get_large_cap_classifier(market: str) -> LargeCapClassifier:
+    """
+    获取市场的大盘股分类表（每个市场只构建一次）
+
+    Args:
+        market: 市场代码（cn/hk/us）
+
+    Returns:
+        LargeCapClassifier: 分类表；量价数据库不可用时为按代码规则的分类表
+    """
+    market = (market or 'cn').lower()
+    with _classifiers_lock:
+        classifier = _classifiers.get(market)
+        if classifier is None:
+            classifier = _build_classifier(market)
+            _classifiers[market] = classifier
+        return classifier
+
+
+def is_large_cap_stock(stock_code: str, market: Optional[str] = None) -> bool:
+    """
+    判断是否为大盘股（市场为None时按代码格式推断）
+
+    Args:
+        stock_code: 股票代码
+        market: 市场代码
+
+    Returns:
+        bool: 是否为大盘股
+    """
+    return get_large_cap_classifier(market or market_from_code(stock_code)).is_large_cap(stock_code)
+
+
+def _build_classifier(market: str) -> LargeCapClassifier:
+    """从量价数据库构建分类表，失败时回退到代码规则"""
+    try:
+        from utils.path_helper import get_data_file_path
+        db_path = get_data_file_path(f"{market}-lj.dat.gz")
+        if db_path.exists():
+            return LargeCapClassifier.from_lj_database(str(db_path), market)
+    except Exception as e:
+        logger.warning(f"[大盘股] {market}: 量价数据不可用，使用代码规则: {e}")
+    return LargeCapClassifier(market)
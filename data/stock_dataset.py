@@ -12,6 +12,7 @@ from config.gui_i18n import t_gui as _
 创建时间：2025-06-07
 """
 
+import logging
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Tuple, Union, Any
@@ -34,6 +35,8 @@ except ImportError:
     def get_industry_stocks(industry): return []
     def get_stock_industry(code): return "未分类"
 
+logger = logging.getLogger(__name__)
+
 
 class StockDataSet:
     """
@@ -210,15 +213,18 @@ class StockDataSet:
         
         # 如果没有找到任何有效评级，返回原序列（全部为空）
         if first_valid_rating is None:
-            print(f"警告 StockDataSet {stock_code}: 所有日期都是'-'，无法填充")
+            logger.debug("StockDataSet %s: 所有日期都是'-'，无法填充", stock_code)
             return filled_ratings
         
         # 第二步：从第一个有效评级开始，只向后填充
         # 将前面的无效值设为NaN（不填充）
+        skipped_count = 0
         for i in range(first_valid_index):
             if filled_ratings.iloc[i] == '-' or pd.isna(filled_ratings.iloc[i]) or filled_ratings.iloc[i] == '':
                 filled_ratings.iloc[i] = pd.NA  # 明确设置为NaN，不填充
-                print(f"跳过 StockDataSet {stock_code} 早期索引 {i}: 在首个有效数据之前")
+                skipped_count += 1
+        if skipped_count:
+            logger.debug("StockDataSet %s: 跳过首个有效数据之前的 %d 个早期索引", stock_code, skipped_count)
         
         # 第三步：从第一个有效评级开始前向填充
         last_valid_rating = first_valid_rating
@@ -233,7 +239,8 @@ class StockDataSet:
                 last_valid_rating = rating
         
         if fill_count > 0:
-            print(f"StockDataSet严格前向填充 {stock_code}: 填充了 {fill_count} 个'-'值 (从索引 {first_valid_index} 开始)")
+            logger.debug("StockDataSet严格前向填充 %s: 填充了 %d 个'-'值 (从索引 %d 开始)",
+                         stock_code, fill_count, first_valid_index)
         
         return filled_ratings
     
@@ -316,6 +323,18 @@ class StockDataSet:
         """
         return self.data.copy()
     
+    def update_data(self, new_data: pd.DataFrame):
+        """
+        替换为新导入的数据（文件路径和市场类型不变），并重建元数据和缓存
+        
+        参数:
+            new_data (pd.DataFrame): 新的股票数据
+        """
+        self.data = new_data.copy()
+        self._cache = {}
+        self._initialize_metadata()
+        self._create_rating_scores()
+    
     # 高级查询接口
     
     def filter_stocks_by_industry(self, industries: Union[str, List[str]]) -> 'StockDataSet':
@@ -0,0 +1,70 @@
+"""
+股票搜索索引
+
+子串查找索引：对一组文本建立单字/双字n-gram倒排表，查询时对查询串各双字的
+倒排表求交集后再逐个验证，结果与逐个 `query in text` 完全一致。
+lj_read 的代码/名称搜索和GUI个股列表查找共用。
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+class SubstringIndex:
+    """
+    子串查找索引：对一组文本建立单字和双字倒排表
+
+    查询时取查询串所有双字的倒排表求交集，再用 in 验证候选，
+    结果与逐个 `query in text` 完全一致，顺序为文本的原始顺序。
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        """
+        Args:
+            texts: 被搜索的文本（调用方负责大小写等规范化）
+        """
+        self.texts = list(texts)
+        postings: Dict[str, List[int]] = {}
+        for i, text in enumerate(self.texts):
+            grams = set(text)
+            grams.update(text[j:j + 2] for j in range(len(text) - 1))
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def find(self, query: str) -> List[int]:
+        """
+        包含query的文本序号（升序）
+
+        Args:
+            query: 查询串
+
+        Returns:
+            list: 文本序号
+        """
+        if not query:
+            return list(range(len(self.texts)))
+
+        grams = {query} if len(query) == 1 else {query[j:j + 2] for j in range(len(query) - 1)}
+        lists = []
+        for gram in grams:
+            ids = self._postings.get(gram)
+            if ids is None:
+                return []
+            lists.append(ids)
+
+        lists.sort(key=len)
+        candidates = lists[0]
+        for ids in lists[1:]:
+            if len(candidates) == 0:
+                return []
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+
+        if len(query) <= 2:
+            return candidates.tolist()
+        texts = self.texts
+        return [i for i in candidates.tolist() if query in texts[i]]
@@ -132,7 +132,9 @@ except ImportError:
 # 项目模块导入
 try:
     from data.stock_dataset import StockDataSet
-    from algorithms.realtime_engine import RealtimeAnalysisEngine
+    from algorithms.realtime_engine import RealtimeAnalysisEngine, CancellationToken
+    from data.large_cap import is_large_cap_stock
+    from data.stock_search_index import SubstringIndex
     from utils.report_generator import ReportGenerator
     try:
         from utils.path_helper import (
@@ -192,7 +194,6 @@ try:
     try:
         from ui.shared_utils import (
             get_search_params_by_market as shared_get_search_params_by_market,
-            is_large_cap_stock as shared_is_large_cap_stock,
             search_single_industry_news as shared_search_single_industry_news,
             ai_analysis_before as shared_ai_analysis_before,
             ai_analysis_after as shared_ai_analysis_after,
@@ -234,112 +235,78 @@ except ImportError as e:
 # 异步计算Worker类
 # =====================================
 
-class MSCICalculationWorker(QThread):
-    """MSCI市场分析计算线程"""
-    msci_completed = pyqtSignal(dict)  # 完成信号
-    msci_failed = pyqtSignal(str)      # 失败信号
-    
-    def __init__(self, dataset):
-        super().__init__()
-        self.dataset = dataset
-    
-    def run(self):
-        """计算MSCI（启用增强版：新旧MSCI对比）"""
-        try:
-            print("⏰ [异步] 开始计算MSCI（增强版）...")
-            start_time = time.time()
-            
-            from algorithms.msci_calculator import calculate_market_sentiment_composite_index
-            raw_data = self.dataset.get_raw_data()
-            # 启用增强版MSCI（包含original_msci和新MSCI）
-            msci_result = calculate_market_sentiment_composite_index(
-                raw_data, 
-                use_enhanced=True  # 启用增强版MSCI
-            )
-            
-            elapsed = time.time() - start_time
-            print(f"✅ [异步] MSCI计算完成（增强版），耗时 {elapsed:.2f}秒")
-            if msci_result.get('enhanced'):
-                print(f"   原始MSCI: {msci_result.get('original_msci', 0):.1f}, 新MSCI: {msci_result.get('current_msci', 0):.1f}")
-            
-            self.msci_completed.emit(msci_result)
-        except Exception as e:
-            print(f"❌ [异步] MSCI计算失败: {e}")
-            import traceback
-            traceback.print_exc()
-            self.msci_failed.emit(str(e))
-
+class AnalysisStagesWorker(QThread):
+    """分阶段分析计算线程：一个引擎、一份预处理数据，订阅引擎的阶段完成回调推送结果
 
-class IndustryCalculationWorker(QThread):
-    """行业TMA/UFA计算线程"""
+    引擎内部调度：MSCI与个股RTSI并发，行业TMA/UFA在个股RTSI完成后立即开始。
+    """
+    msci_completed = pyqtSignal(dict)      # MSCI完成
+    msci_failed = pyqtSignal(str)
+    stock_completed = pyqtSignal(dict)     # {stock_code: rtsi_data}
+    stock_chunk = pyqtSignal(dict)         # 个股RTSI数据块（计算过程中逐块推送）
+    stock_failed = pyqtSignal(str)
     industry_completed = pyqtSignal(dict)  # {industry_name: irsi_data}
     industry_failed = pyqtSignal(str)
-    industry_progress = pyqtSignal(int, int)  # (current, total)
     
-    def __init__(self, dataset, stock_results=None):
-        super().__init__()
-        self.dataset = dataset
-        self.stock_results = stock_results  # 可选：如果需要RTSI数据
-    
-    def run(self):
-        """计算TMA/UFA"""
-        try:
-            print("⏰ [异步] 开始计算行业分析...")
-            start_time = time.time()
-            
-            from algorithms.irsi_calculator import CoreStrengthAnalyzer
-            from algorithms.realtime_engine import RealtimeAnalysisEngine
-            
-            # 创建分析引擎（复用现有逻辑）
-            engine = RealtimeAnalysisEngine(self.dataset, enable_multithreading=False)
-            raw_data = self.dataset.get_raw_data()
-            
-            # 计算行业IRSI
-            industries_data = engine._calculate_industries_irsi(raw_data, self.stock_results or {})
-            
-            elapsed = time.time() - start_time
-            print(f"✅ [异步] 行业分析完成，耗时 {elapsed:.2f}秒，共 {len(industries_data)} 个行业")
-            
-            self.industry_completed.emit(industries_data)
-        except Exception as e:
-            print(f"❌ [异步] 行业分析失败: {e}")
-            import traceback
-            traceback.print_exc()
-            self.industry_failed.emit(str(e))
-
-
-class StockCalculationWorker(QThread):
-    """个股RTSI计算线程"""
-    stock_completed = pyqtSignal(dict)  # {stock_code: rtsi_data}
-    stock_failed = pyqtSignal(str)
-    stock_progress = pyqtSignal(int, int)  # (current, total)
+    # 引擎阶段 -> (完成信号, 失败信号)
+    STAGE_SIGNALS = {
+        'market': ('msci_completed', 'msci_failed'),
+        'stocks': ('stock_completed', 'stock_failed'),
+        'industries': ('industry_completed', 'industry_failed'),
+    }
     
     def __init__(self, dataset):
         super().__init__()
         self.dataset = dataset
+        self.reported_stages = set()
+        self.start_time = None
+        self.cancel_token = CancellationToken()
+    
+    def cancel(self):
+        """请求停止计算（引擎在阶段/数据块之间检查，未完成的阶段按失败上报）"""
+        self.cancel_token.cancel()
+    
+    def on_stage(self, stage, result, error):
+        """引擎阶段回调（在计算线程中执行，通过信号转到界面线程）"""
+        if stage not in self.STAGE_SIGNALS:
+            return
+        self.reported_stages.add(stage)
+        completed_signal, failed_signal = self.STAGE_SIGNALS[stage]
+        elapsed = time.time() - self.start_time
+        if error is None:
+            print(f"✅ [异步] 阶段 {stage} 完成，耗时 {elapsed:.2f}秒")
+            getattr(self, completed_signal).emit(result or {})
+        else:
+            print(f"❌ [异步] 阶段 {stage} 失败: {error}")
+            getattr(self, failed_signal).emit(str(error))
+    
+    def on_partial(self, stage, chunk):
+        """引擎部分结果回调：个股RTSI每完成一个数据块推送一次"""
+        if stage == 'stocks':
+            self.stock_chunk.emit(chunk)
     
     def run(self):
-        """计算RTSI"""
+        """一次完整计算，各阶段完成即推送"""
+        self.start_time = time.time()
         try:
-            print("⏰ [异步] 开始计算个股RTSI...")
-            start_time = time.time()
-            
+            print("⏰ [异步] 开始分阶段计算（MSCI / 个股RTSI / 行业）...")
             from algorithms.realtime_engine import RealtimeAnalysisEngine
-            engine = RealtimeAnalysisEngine(self.dataset, enable_multithreading=False)
-            
-            # 只计算RTSI
-            raw_data = self.dataset.get_raw_data()
-            stocks_results = engine._calculate_stocks_rtsi_sequential(raw_data)
             
-            elapsed = time.time() - start_time
-            print(f"✅ [异步] 个股RTSI完成，耗时 {elapsed:.2f}秒，共 {len(stocks_results)} 只股票")
+            engine = RealtimeAnalysisEngine(self.dataset, enable_multithreading=False)
+            engine.add_stage_callback(self.on_stage)
+            engine.add_partial_callback(self.on_partial)
+            # 数据文件、算法和配置未变化时引擎直接加载磁盘快照，同样按阶段推送
+            engine.calculate_all_metrics(cancel_token=self.cancel_token)
             
-            self.stock_completed.emit(stocks_results)
+            print(f"✅ [异步] 分阶段计算完成，总耗时 {time.time() - self.start_time:.2f}秒")
         except Exception as e:
-            print(f"❌ [异步] 个股RTSI失败: {e}")
+            print(f"❌ [异步] 分阶段计算失败: {e}")
             import traceback
             traceback.print_exc()
-            self.stock_failed.emit(str(e))
+            # 未来得及上报的阶段统一按失败通知，避免界面一直等待
+            for stage, (_, failed_signal) in self.STAGE_SIGNALS.items():
+                if stage not in self.reported_stages:
+                    getattr(self, failed_signal).emit(str(e))
 
 
 class PreprocessWorker(QThread):
@@ -485,7 +452,17 @@ class AnalysisWorker(QThread):
         super().__init__()
         self.data_file_path = data_file_path
         self.enable_ai_analysis = enable_ai_analysis
-        self.is_cancelled = False
+        self.cancel_token = CancellationToken()
+    
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancel_token.is_cancelled
+    
+    @is_cancelled.setter
+    def is_cancelled(self, value: bool):
+        # 置为True即通知分析引擎停止计算
+        if value:
+            self.cancel_token.cancel()
         
     def run(self):
         """执行分析 - 复用原界面的实现"""
@@ -531,7 +508,17 @@ class AnalysisWorker(QThread):
             time.sleep(0.1)  # 短暂暂停让用户看到进度
             self.progress_updated.emit(45, t_gui('计算技术指标...'))
             
-            analysis_results = analysis_engine.calculate_all_metrics()
+            analysis_results = analysis_engine.calculate_all_metrics(cancel_token=self.cancel_token)
+            
+            # 取消或超时只得到部分结果：不生成报告，也不做AI分析
+            if self.is_cancelled:
+                print("⏹️ 分析已取消，跳过报告生成和AI分析")
+                return
+            metadata = getattr(analysis_results, 'metadata', {})
+            if metadata.get('partial'):
+                self.analysis_failed.emit(t_gui('analysis_process_error',
+                                                error=f"计算已停止({metadata.get('stop_reason')})，结果不完整"))
+                return
             
             # 【关键调试】检查分析结果
             print(f"🚨 [分析引擎调试] analysis_results 类型: {type(analysis_results)}")
@@ -585,6 +572,11 @@ class AnalysisWorker(QThread):
                     'data_source': current_dataset  # 添加数据源引用
                 }
             
+            # 报告生成期间被取消：不再做AI分析
+            if self.is_cancelled:
+                print("⏹️ 分析已取消，跳过AI分析")
+                return
+            
             # 第8阶段：AI智能分析 - 70% (仅在启用时执行)
             if self.enable_ai_analysis:
                 self.progress_updated.emit(70, t_gui('ai_analysis'))
@@ -801,14 +793,8 @@ class AnalysisWorker(QThread):
             return None
     
     def _is_large_cap_stock(self, stock_code: str) -> bool:
-        """判断是否为大盘股 - 代理方法，调用共享工具函数"""
-        if SHARED_UTILS_AVAILABLE:
-            return shared_is_large_cap_stock(stock_code)
-        # 回退：内联简化实现
-        code = str(stock_code).strip()
-        if len(code) == 6 and code.isdigit():
-            return code.startswith(('000', '001', '002', '003', '600', '601', '603', '605'))
-        return False
+        """判断是否为大盘股 - 查询按市场预先构建的大盘股分类表（O(1)）"""
+        return is_large_cap_stock(stock_code)
     
     def _check_llm_config(self) -> bool:
         """检查LLM配置文件是否存在"""
@@ -5804,40 +5790,79 @@ class AnalysisPage(QWidget):
             pass
     
     def find_stock_in_tree(self, search_text):
-        """在TreeView中查找股票 - 支持多种搜索策略"""
+        """在TreeView中查找股票 - 支持多种搜索策略
+        
+        返回第一个满足任一策略的个股项：
+        策略1: 精确匹配存储的股票代码（不区分大小写）
+        策略2: 去除前导零匹配（输入11匹配000011）
+        策略3: 文字搜索（在TreeView显示文本中查找，不区分大小写）
+        三种策略都走缓存的索引，不再逐项遍历。
+        """
         try:
-            # 遍历TreeView找到个股列表项
-            root = self.tree_widget.invisibleRootItem()
-            for i in range(root.childCount()):
-                item = root.child(i)
-                if item.data(0, Qt.UserRole) == "stock_list":
-                    # 遍历股票子项
-                    for j in range(item.childCount()):
-                        child_item = item.child(j)
-                        item_text = child_item.text(0)  # TreeView显示的完整文本
-                        stored_code = child_item.data(0, Qt.UserRole + 1)  # 存储的股票代码
-                        
-                        # 策略1: 精确匹配存储的股票代码
-                        if stored_code and str(stored_code).upper() == str(search_text).upper():
-                            # print(f"[调试] 策略1匹配 - 精确代码: {stored_code}")
-                            return child_item
-                        
-                        # 策略2: 去除前导零匹配（输入11匹配000011）
-                        if stored_code and self.match_without_leading_zeros(str(stored_code), search_text):
-                            # print(f"[调试] 策略2匹配 - 去除前导零: {stored_code} ← {search_text}")
-                            return child_item
-                        
-                        # 策略3: 文字搜索（在TreeView显示文本中查找）
-                        if self.match_text_search(item_text, search_text):
-                            # print(f"[调试] 策略3匹配 - 文字搜索: {item_text}")
-                            return child_item
+            items, by_code, by_number, text_index = self._get_stock_tree_index()
+            candidates = []
             
-            return None
+            row = by_code.get(str(search_text).upper())
+            if row is not None:
+                candidates.append(row)
+            
+            try:
+                row = by_number.get(int(search_text))
+            except (ValueError, TypeError):
+                row = None
+            if row is not None:
+                candidates.append(row)
+            
+            rows = text_index.find(search_text.lower())
+            if rows:
+                candidates.append(rows[0])
+            
+            return items[min(candidates)] if candidates else None
             
         except Exception as e:
             # print(f"[调试] 搜索失败: {str(e)}")
             return None
     
+    def _get_stock_tree_index(self):
+        """
+        个股列表的搜索索引（个股项数量变化或列表被清空后重建）
+        
+        Returns:
+            (个股项列表, 代码大写->首个行号, 代码数值->首个行号, 显示文本的子串索引)
+        """
+        stock_lists = []
+        root = self.tree_widget.invisibleRootItem()
+        for i in range(root.childCount()):
+            item = root.child(i)
+            if item.data(0, Qt.UserRole) == "stock_list":
+                stock_lists.append(item)
+        key = tuple((id(item), item.childCount()) for item in stock_lists)
+        
+        cached = getattr(self, '_stock_tree_index', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        items, texts = [], []
+        by_code, by_number = {}, {}
+        for item in stock_lists:
+            for j in range(item.childCount()):
+                child_item = item.child(j)
+                row = len(items)
+                items.append(child_item)
+                texts.append(child_item.text(0).lower())
+                stored_code = child_item.data(0, Qt.UserRole + 1)
+                if not stored_code:
+                    continue
+                by_code.setdefault(str(stored_code).upper(), row)
+                try:
+                    by_number.setdefault(int(stored_code), row)
+                except (ValueError, TypeError):
+                    pass
+        
+        index = (items, by_code, by_number, SubstringIndex(texts))
+        self._stock_tree_index = (key, index)
+        return index
+    
     def match_without_leading_zeros(self, stored_code, search_text):
         """匹配去除前导零的股票代码"""
         try:
@@ -6369,6 +6394,7 @@ class AnalysisPage(QWidget):
         # 清除现有子项目
         self.industry_item.takeChildren()
         self.stock_item.takeChildren()
+        self._stock_tree_index = None
         
         # 添加行业子项目
         if hasattr(self.analysis_results_obj, 'industries'):
@@ -6449,6 +6475,8 @@ class AnalysisPage(QWidget):
         self.ai_item.takeChildren()
         self.industry_item.takeChildren()
         self.stock_item.takeChildren()
+        self._streamed_stock_items = None
+        self._stock_tree_index = None
         
         # 添加AI分析占位符
         loading_ai = QTreeWidgetItem(["⏳ 正在准备AI分析..."])
@@ -6548,12 +6576,73 @@ class AnalysisPage(QWidget):
         
         print(f"✅ [UI] 已插入 {len(final_industries)} 个行业到TreeView")
     
+    def _create_stock_tree_item(self, stock_code, stock_data):
+        """创建个股TreeView项"""
+        child_item = QTreeWidgetItem()
+        self._set_stock_tree_item(child_item, stock_code, stock_data)
+        child_item.setDisabled(False)  # 启用
+        return child_item
+    
+    def _set_stock_tree_item(self, child_item, stock_code, stock_data):
+        """设置个股TreeView项的文字和数据"""
+        stock_name = stock_data.get('name', stock_code) if isinstance(stock_data, dict) else stock_code
+        rtsi_value = 0
+        
+        if isinstance(stock_data, dict):
+            rtsi_data = stock_data.get('rtsi', {})
+            if isinstance(rtsi_data, dict):
+                rtsi_value = rtsi_data.get('rtsi', 0)
+            elif isinstance(rtsi_data, (int, float)):
+                rtsi_value = rtsi_data
+        
+        if not isinstance(rtsi_value, (int, float)):
+            rtsi_value = 0
+        
+        child_item.setText(0, f"📈 {stock_code} {stock_name} (RTSI: {float(rtsi_value):.1f})")
+        child_item.setData(0, Qt.UserRole, f"stock_{stock_code}")
+        child_item.setData(0, Qt.UserRole + 1, stock_code)
+        child_item.setData(0, Qt.UserRole + 2, stock_data)  # 存储股票数据
+    
+    def append_stock_chunk_async(self, stock_chunk):
+        """
+        追加个股数据块（计算过程中逐块到达，按到达顺序追加）
+        
+        第一块到达时清除占位符；重复代码更新已有项。个股阶段完成后
+        insert_stock_list_async 会按股票代码排序重建列表。
+        
+        返回:
+            int: 已追加的股票数
+        """
+        streamed_items = getattr(self, '_streamed_stock_items', None)
+        if streamed_items is None:
+            streamed_items = self._streamed_stock_items = {}
+            self.stock_item.takeChildren()
+            self._stock_tree_index = None
+            self.stock_item.setDisabled(False)
+        
+        self.tree_widget.setUpdatesEnabled(False)
+        try:
+            for stock_code, stock_data in stock_chunk.items():
+                child_item = streamed_items.get(stock_code)
+                if child_item is not None:
+                    self._set_stock_tree_item(child_item, stock_code, stock_data)
+                else:
+                    child_item = self._create_stock_tree_item(stock_code, stock_data)
+                    streamed_items[stock_code] = child_item
+                    self.stock_item.addChild(child_item)
+        finally:
+            self.tree_widget.setUpdatesEnabled(True)
+        
+        return len(streamed_items)
+    
     def insert_stock_list_async(self, stock_results):
         """插入个股列表（异步）"""
         print("✅ [UI] 插入个股列表...")
         
-        # 清除占位符
+        # 清除占位符（以及计算过程中逐块追加的个股项）
         self.stock_item.takeChildren()
+        self._streamed_stock_items = None
+        self._stock_tree_index = None
         
         # 启用主项目
         self.stock_item.setDisabled(False)
@@ -6568,37 +6657,15 @@ class AnalysisPage(QWidget):
             self.analysis_results_obj.stocks = stock_results
             print("✅ [UI] 已同步个股数据到analysis_results_obj")
         
-        # 按股票代码排序
-        sorted_stocks = []
-        for stock_code, stock_data in stock_results.items():
-            stock_name = stock_data.get('name', stock_code)
-            rtsi_value = 0
-            
-            if isinstance(stock_data, dict):
-                rtsi_data = stock_data.get('rtsi', {})
-                if isinstance(rtsi_data, dict):
-                    rtsi_value = rtsi_data.get('rtsi', 0)
-                elif isinstance(rtsi_data, (int, float)):
-                    rtsi_value = rtsi_data
-            
-            if not isinstance(rtsi_value, (int, float)):
-                rtsi_value = 0
-            
-            sorted_stocks.append((stock_code, stock_name, float(rtsi_value), stock_data))
-        
-        # 按股票代码排序
-        sorted_stocks.sort(key=lambda x: x[0])
-        
-        # 插入个股项
-        for stock_code, stock_name, rtsi_value, stock_data in sorted_stocks:
-            child_item = QTreeWidgetItem([f"📈 {stock_code} {stock_name} (RTSI: {rtsi_value:.1f})"])
-            child_item.setData(0, Qt.UserRole, f"stock_{stock_code}")
-            child_item.setData(0, Qt.UserRole + 1, stock_code)
-            child_item.setData(0, Qt.UserRole + 2, stock_data)  # 存储股票数据
-            child_item.setDisabled(False)  # 启用
-            self.stock_item.addChild(child_item)
+        # 按股票代码排序后插入个股项
+        self.tree_widget.setUpdatesEnabled(False)
+        try:
+            for stock_code in sorted(stock_results):
+                self.stock_item.addChild(self._create_stock_tree_item(stock_code, stock_results[stock_code]))
+        finally:
+            self.tree_widget.setUpdatesEnabled(True)
         
-        print(f"✅ [UI] 已插入 {len(sorted_stocks)} 只股票到TreeView")
+        print(f"✅ [UI] 已插入 {len(stock_results)} 只股票到TreeView")
     
     def start_ai_analysis_async(self, msci_result, industry_results, stock_results):
         """启动AI分析（异步）"""
@@ -9678,6 +9745,54 @@ class AnalysisPage(QWidget):
             print(f"[ERROR] 计算行业平均值失败: {e}")
             return {}
     
+    def _weighted_volume_price_from_cube(self, cube, weights):
+        """根据量价立方体计算每日加权平均量价（向量化）
+        
+        与逐股票计算的规则一致：涨跌幅以首个交易日收盘价为基准（首日无数据的股票涨跌幅为0），
+        只统计当日有数据的股票，没有任何股票有数据的交易日不输出。
+        
+        Args:
+            cube: lj_read.VolumePriceCube
+            weights: {股票代码: 权重}
+        
+        Returns:
+            list: [{'date', 'close_price', 'change_rate', 'volume', 'amount'}, ...]
+        """
+        import numpy as np
+        
+        has_data = cube.mask.any(axis=1)
+        day_valid = cube.mask[has_data].any(axis=0)
+        mask = cube.mask[has_data][:, day_valid]
+        if not mask.size:
+            return []
+        
+        def field(name):
+            return np.where(mask, np.nan_to_num(cube.field(name)[has_data][:, day_valid].astype(np.float64)), 0.0)
+        
+        close = field('close')
+        base = close[:, :1]
+        safe_base = np.where(base > 0, base, 1.0)
+        change_rate = np.where(base > 0, (close - base) / safe_base * 100, 0.0)
+        
+        weight = np.array([weights.get(code, 0) for code in cube.symbols[has_data]], dtype=np.float64)
+        day_weight = np.where(mask, weight[:, None], 0.0)
+        total_weight = day_weight.sum(axis=0)
+        weighted_close = (close * day_weight).sum(axis=0)
+        weighted_change_rate = (change_rate * day_weight).sum(axis=0)
+        total_volume = field('volume').sum(axis=0)
+        total_amount = field('amount').sum(axis=0)
+        
+        volume_price_data = []
+        for i, date in enumerate(cube.dates[day_valid]):
+            daily_data = {'date': date, 'close_price': 0, 'change_rate': 0, 'volume': 0, 'amount': 0}
+            if total_weight[i] > 0:
+                daily_data['close_price'] = round(float(weighted_close[i] / total_weight[i]), 2)
+                daily_data['change_rate'] = round(float(weighted_change_rate[i] / total_weight[i]), 2)
+                daily_data['volume'] = int(total_volume[i])
+                daily_data['amount'] = int(total_amount[i])
+            volume_price_data.append(daily_data)
+        return volume_price_data
+    
     def _calculate_weighted_volume_price_data(self, stock_weights):
         """计算加权平均量价数据（批量优化版本）
         
@@ -9692,6 +9807,7 @@ class AnalysisPage(QWidget):
             
             # 【性能优化】批量获取所有股票的38天历史数据
             try:
+                import numpy as np
                 from lj_read import StockDataReaderV2
                 
                 # 使用全局市场类型
@@ -9703,56 +9819,25 @@ class AnalysisPage(QWidget):
                 
                 # 收集所有股票代码
                 stock_codes = [s['code'] for s in stock_weights]
-                print(f"  📊 使用网络API批量获取 {len(stock_codes)} 只股票的38天历史数据...")
+                print(f"  📊 批量获取 {len(stock_codes)} 只股票最近38个交易日的量价立方体...")
                 
-                # 批量查询38天历史数据（一次性获取所有股票）
-                batch_historical_data = reader.get_batch_historical_data(
+                # 一次扫描读出 股票 × 交易日 × OHLCVA 数组
+                cube = reader.get_volume_price_cube(
                     symbols=stock_codes,
                     market=market.upper(),
-                    days=38
+                    days=38,
+                    dtype=np.float64
                 )
                 
-                print(f"  ✅ 批量查询完成，获取到 {len(batch_historical_data) if batch_historical_data else 0} 只股票的数据")
+                stocks_with_data = int(cube.mask.any(axis=1).sum())
+                print(f"  ✅ 批量查询完成，获取到 {stocks_with_data} 只股票的数据")
                 
-                # 处理批量查询结果
-                if batch_historical_data:
-                    for stock_info in stock_weights:
-                        stock_code = stock_info['code']
-                        weight = stock_info['weight']
-                        
-                        if stock_code in batch_historical_data:
-                            history_list = batch_historical_data[stock_code]
-                            stock_history = {}
-                            
-                            for day_data in history_list:
-                                date = day_data.get('date', '')
-                                if date:
-                                    stock_history[date] = {
-                                        'close': day_data.get('close', 0),
-                                        'open': day_data.get('open', 0),
-                                        'high': day_data.get('high', 0),
-                                        'low': day_data.get('low', 0),
-                                        'volume': day_data.get('volume', 0),
-                                        'amount': day_data.get('amount', 0),
-                                        'weight': weight
-                                    }
-                                    date_set.add(date)
-                            
-                            if stock_history:
-                                all_stock_data[stock_code] = stock_history
-                                print(f"    {stock_code}: {len(stock_history)} 天数据 ✓")
-                            else:
-                                print(f"    {stock_code}: 无数据 ✗")
-                        else:
-                            print(f"    {stock_code}: 批量查询未返回数据 ✗")
-                    
-                    # 如果批量查询成功，直接跳到后续处理
-                    if all_stock_data:
-                        print(f"  🎉 批量查询成功！共获取 {len(all_stock_data)} 只股票数据")
-                    else:
-                        raise Exception("批量查询未返回任何数据，降级为逐个查询")
-                else:
-                    raise Exception("网络API返回空数据，降级为逐个查询")
+                if stocks_with_data:
+                    weights = {s['code']: s['weight'] for s in stock_weights}
+                    volume_price_data = self._weighted_volume_price_from_cube(cube, weights)
+                    print(f" 生成了 {len(volume_price_data)} 天的加权平均量价数据")
+                    return volume_price_data
+                raise Exception("批量查询未返回任何数据，降级为逐个查询")
                     
             except Exception as batch_error:
                 # 【降级方案】批量查询失败，使用逐个查询
@@ -15950,14 +16035,8 @@ Note: Provide specific values and prices, avoid theoretical explanations. For Ch
         return industry_stocks[:count]
     
     def _is_large_cap_stock(self, stock_code: str) -> bool:
-        """判断是否为大盘股 - 代理方法，调用共享工具函数"""
-        if SHARED_UTILS_AVAILABLE:
-            return shared_is_large_cap_stock(stock_code)
-        # 回退：内联简化实现
-        code = str(stock_code).strip()
-        if len(code) == 6 and code.isdigit():
-            return code.startswith(('000', '001', '002', '003', '600', '601', '603', '605'))
-        return False
+        """判断是否为大盘股 - 查询按市场预先构建的大盘股分类表（O(1)）"""
+        return is_large_cap_stock(stock_code)
     
     def get_industry_trend_status(self, tma_value):
         """获取行业趋势状态"""
@@ -18240,9 +18319,7 @@ class NewPyQt5Interface(QMainWindow):
         
         # ===== 异步计算线程 =====
         logger.info("DEBUG: Initializing worker variables")
-        self.msci_worker = None
-        self.industry_worker = None
-        self.stock_worker = None
+        self.stages_worker = None  # MSCI/个股/行业共用一个分阶段计算线程
         self.preprocess_worker = None  # 新增:异步预处理线程
         
         # ===== 计算结果缓存（防止未完成时被访问） =====
@@ -18814,23 +18891,34 @@ class NewPyQt5Interface(QMainWindow):
             print("❌ [异步] 错误：数据集未加载")
             return
         
-        # 1. 启动MSCI计算
-        self.msci_worker = MSCICalculationWorker(self.current_dataset)
-        self.msci_worker.msci_completed.connect(self.on_msci_completed)
-        self.msci_worker.msci_failed.connect(self.on_msci_failed)
-        self.msci_worker.start()
-        print("⏰ [异步] MSCI计算已启动")
-        
-        # 2. 启动个股RTSI计算（独立，可立即开始）
-        self.stock_worker = StockCalculationWorker(self.current_dataset)
-        self.stock_worker.stock_completed.connect(self.on_stock_completed)
-        self.stock_worker.stock_failed.connect(self.on_stock_failed)
-        self.stock_worker.stock_progress.connect(self.on_stock_progress)
-        self.stock_worker.start()
-        print("⏰ [异步] 个股RTSI计算已启动")
-        
-        # 3. 行业计算需要等RTSI完成（在on_stock_completed中启动）
-        print("⏰ [异步] 行业计算将在个股RTSI完成后启动")
+        # 重新加载时停止上一轮计算，并断开其信号，避免旧结果覆盖新数据
+        self._cancel_stages_worker()
+        
+        # 一个引擎、一份预处理数据：MSCI与个股RTSI并发，行业分析在个股RTSI完成后由引擎启动
+        self.stages_worker = AnalysisStagesWorker(self.current_dataset)
+        self.stages_worker.msci_completed.connect(self.on_msci_completed)
+        self.stages_worker.msci_failed.connect(self.on_msci_failed)
+        self.stages_worker.stock_completed.connect(self.on_stock_completed)
+        self.stages_worker.stock_chunk.connect(self.on_stock_chunk)
+        self.stages_worker.stock_failed.connect(self.on_stock_failed)
+        self.stages_worker.industry_completed.connect(self.on_industry_completed)
+        self.stages_worker.industry_failed.connect(self.on_industry_failed)
+        self.stages_worker.start()
+        print("⏰ [异步] 分阶段计算已启动（行业计算将在个股RTSI完成后自动开始）")
+    
+    def _cancel_stages_worker(self):
+        """取消正在运行的分阶段计算线程"""
+        worker = getattr(self, 'stages_worker', None)
+        if worker is None or not worker.isRunning():
+            return
+        print("⏹️ [异步] 取消上一轮分阶段计算")
+        worker.cancel()
+        for signal_name in ('msci_completed', 'msci_failed', 'stock_completed', 'stock_chunk',
+                            'stock_failed', 'industry_completed', 'industry_failed'):
+            try:
+                getattr(worker, signal_name).disconnect()
+            except TypeError:
+                pass
     
     def on_msci_completed(self, msci_result):
         """MSCI计算完成"""
@@ -18874,17 +18962,15 @@ class NewPyQt5Interface(QMainWindow):
         # 更新首页进度显示
         self.file_page.update_loading_progress(66, "✓ 个股分析(RTSI)计算完成")
         
-        # 1. 插入个股列表到TreeView
+        # 插入个股列表到TreeView（行业计算由引擎在RTSI完成后自动开始）
         self.analysis_page.insert_stock_list_async(stock_results)
-        
-        # 2. 启动行业计算（现在有RTSI数据了）
-        if not self.industry_worker or not self.industry_worker.isRunning():
-            self.industry_worker = IndustryCalculationWorker(self.current_dataset, stock_results)
-            self.industry_worker.industry_completed.connect(self.on_industry_completed)
-            self.industry_worker.industry_failed.connect(self.on_industry_failed)
-            self.industry_worker.industry_progress.connect(self.on_industry_progress)
-            self.industry_worker.start()
-            print("⏰ [异步] 行业计算已启动（使用RTSI数据）")
+    
+    def on_stock_chunk(self, stock_chunk):
+        """个股RTSI数据块到达：边计算边追加到TreeView"""
+        streamed = self.analysis_page.append_stock_chunk_async(stock_chunk)
+        self.file_page.update_loading_progress(
+            min(65, 33 + streamed * 32 // max(1, len(self.current_dataset))),
+            f"个股分析(RTSI)计算中... 已完成 {streamed} 只")
     
     def on_stock_failed(self, error_msg):
         """个股RTSI计算失败"""
@@ -19187,6 +19273,9 @@ class NewPyQt5Interface(QMainWindow):
                     self.analysis_worker.terminate()
                     self.analysis_worker.wait(1000)  # 等待最多1秒
             
+            # 停止分阶段计算线程
+            self._cancel_stages_worker()
+            
             # 行业评级工作线程已删除
             
             # 关闭服务器（如果是本软件启动的）
@@ -19654,4 +19743,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序需要支持引擎的多进程计算
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
@@ -7,6 +7,7 @@
 """
 
 import sqlite3
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
@@ -16,21 +17,395 @@ import gzip
 import tempfile
 import shutil
 import json
+import hashlib
+import threading
+
+# 解压/转换后的数据库缓存：按源文件内容（SHA-256）寻址，进程内和多次运行间共享。
+# index.json 记录 源文件路径 -> (大小, 修改时间, 格式, 内容哈希)，源文件未变化时
+# 打开读取器只需一次 stat()，不再重复解压。
+DB_CACHE_SUBDIR = 'lj_db'
+_DB_CACHE_INDEX = 'index.json'
+# 缓存数据库结构版本（派生表变化时递增，旧版本缓存会被重建）
+DB_CACHE_VERSION = 4
+# 派生表：每个 (symbol, market) 的最新一行量价数据
+LATEST_TABLE = 'latest_volume_price'
+# 派生表：每个市场的交易日历，date_rank 为该市场内按日期的稠密排名（从1开始）
+CALENDAR_TABLE = 'trading_calendar'
+_db_cache_lock = threading.Lock()
+_db_cache_memo: Dict[Tuple[str, int, int, str], str] = {}
+
+
+def get_db_cache_dir() -> str:
+    """获取解压数据库的缓存目录（cache/lj_db）"""
+    try:
+        from utils.path_helper import get_cache_dir
+        base_dir = str(get_cache_dir())
+    except Exception:
+        base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+    return os.path.join(base_dir, DB_CACHE_SUBDIR)
+
+
+def _file_sha256(path: str) -> str:
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_db_cache_index(cache_dir: str) -> Dict:
+    """读取缓存索引，不存在或损坏时返回空索引"""
+    try:
+        with open(os.path.join(cache_dir, _DB_CACHE_INDEX), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_db_cache_index(cache_dir: str, index: Dict):
+    """原子写入缓存索引"""
+    index_path = os.path.join(cache_dir, _DB_CACHE_INDEX)
+    tmp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, index_path)
+
+
+def get_cached_database(source_path: str, data_format: str, build) -> Optional[str]:
+    """
+    获取源数据文件对应的缓存数据库（不存在时构建）
+    
+    Args:
+        source_path: 源数据文件路径（压缩SQLite或JSON）
+        data_format: 源文件格式（sqlite_gz/json/json_gz）
+        build: 构建函数 build(target_path)，把源文件解压/转换为SQLite写入target_path
+    
+    Returns:
+        缓存数据库路径；缓存目录不可写等情况下返回None（调用方回退到临时目录）
+    """
+    source_path = os.path.abspath(source_path)
+    stat = os.stat(source_path)
+    key = (source_path, stat.st_size, stat.st_mtime_ns, data_format)
+    
+    with _db_cache_lock:
+        cached = _db_cache_memo.get(key)
+        if cached and os.path.exists(cached):
+            return cached
+        
+        try:
+            cache_dir = get_db_cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            index = _load_db_cache_index(cache_dir)
+            
+            # 源文件大小和修改时间都未变化：直接复用
+            entry = index.get(source_path)
+            if (entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+                    and entry.get('format') == data_format and entry.get('version') == DB_CACHE_VERSION):
+                cached = os.path.join(cache_dir, entry.get('file', ''))
+                if entry.get('file') and os.path.exists(cached):
+                    _db_cache_memo[key] = cached
+                    return cached
+            
+            # 按内容哈希查找（源文件被touch或复制到其他位置时仍可复用）
+            content_hash = _file_sha256(source_path)
+            file_name = f"{content_hash[:40]}-{data_format}-v{DB_CACHE_VERSION}.db"
+            cached = os.path.join(cache_dir, file_name)
+            if not os.path.exists(cached):
+                tmp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    build(tmp_path)
+                    os.replace(tmp_path, cached)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            
+            # 源文件已更新：删除不再被引用的旧版本
+            old_file = entry.get('file') if entry else None
+            index[source_path] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'format': data_format,
+                'version': DB_CACHE_VERSION,
+                'hash': content_hash,
+                'file': file_name,
+            }
+            if old_file and old_file != file_name and \
+                    all(item.get('file') != old_file for item in index.values()):
+                try:
+                    os.remove(os.path.join(cache_dir, old_file))
+                except OSError:
+                    pass
+            _save_db_cache_index(cache_dir, index)
+        except OSError:
+            return None
+        
+        _db_cache_memo[key] = cached
+        return cached
+
+
+def _bulk_insert_records(cursor: sqlite3.Cursor, table: str, records: List[Dict]):
+    """
+    用 executemany 批量写入记录列表（列为所有记录键的并集，按首次出现顺序）
+    
+    Args:
+        cursor: 数据库游标（调用方负责事务）
+        table: 表名
+        records: 记录字典列表
+    """
+    if not records:
+        return
+    columns = list(dict.fromkeys(key for record in records for key in record))
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    placeholders = ', '.join('?' * len(columns))
+    cursor.executemany(
+        f'INSERT INTO {table} ({column_list}) VALUES ({placeholders})',
+        (tuple(record.get(column) for column in columns) for record in records)
+    )
+
+
+def analyze_database(db_path: str):
+    """收集表和索引的统计信息（ANALYZE），供查询规划器选择索引"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('ANALYZE')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_latest_table(db_path: str):
+    """
+    在数据库中构建最新数据派生表（LATEST_TABLE）
+    
+    每个 (symbol, market) 保留日期最大的一行，列与 volume_price_data 相同，
+    按 (symbol, market) 建唯一索引，批量最新数据查询变为一次索引查找。
+    
+    Args:
+        db_path: 可写的SQLite数据库路径
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='volume_price_data'")
+        if not cursor.fetchone():
+            return
+        cursor.execute(f"DROP TABLE IF EXISTS {LATEST_TABLE}")
+        cursor.execute(f'''
+            CREATE TABLE {LATEST_TABLE} AS
+            SELECT v.*
+            FROM volume_price_data AS v
+            JOIN (
+                SELECT symbol, market, MAX(date) AS max_date
+                FROM volume_price_data
+                GROUP BY symbol, market
+            ) AS m
+            ON v.symbol = m.symbol AND v.market = m.market AND v.date = m.max_date
+        ''')
+        cursor.execute(f"CREATE UNIQUE INDEX idx_{LATEST_TABLE}_symbol ON {LATEST_TABLE}(symbol, market)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def build_trading_calendar(db_path: str):
+    """
+    在数据库中构建交易日历派生表（CALENDAR_TABLE）
+    
+    每个市场出现过的日期按升序编号（date_rank），以 (market, date) 为主键、
+    (market, date_rank) 唯一索引，"最近N个交易日"可换算为 date_rank 区间。
+    
+    Args:
+        db_path: 可写的SQLite数据库路径
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='volume_price_data'")
+        if not cursor.fetchone():
+            return
+        cursor.execute(f"DROP TABLE IF EXISTS {CALENDAR_TABLE}")
+        cursor.execute(f'''
+            CREATE TABLE {CALENDAR_TABLE} (
+                market TEXT NOT NULL,
+                date TEXT NOT NULL,
+                date_rank INTEGER NOT NULL,
+                PRIMARY KEY (market, date)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(f'''
+            INSERT INTO {CALENDAR_TABLE} (market, date, date_rank)
+            SELECT market, date, DENSE_RANK() OVER (PARTITION BY market ORDER BY date)
+            FROM (SELECT DISTINCT market, date FROM volume_price_data)
+        ''')
+        cursor.execute(f"CREATE UNIQUE INDEX idx_{CALENDAR_TABLE}_rank ON {CALENDAR_TABLE}(market, date_rank)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def clear_db_cache():
+    """清空解压数据库缓存（包括磁盘上的缓存文件）"""
+    with _db_cache_lock:
+        _db_cache_memo.clear()
+        cache_dir = get_db_cache_dir()
+        if os.path.exists(cache_dir):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+# 只读连接的PRAGMA：内存映射读取、64MB页缓存、禁止写入、临时表放内存
+READONLY_PRAGMAS = (
+    ('mmap_size', 268435456),
+    ('cache_size', -65536),
+    ('query_only', 1),
+    ('temp_store', 'MEMORY'),
+)
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 256
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    连接池中的只读连接
+    
+    close() 只是把连接交还给池（连接保持打开，预编译语句缓存继续有效），
+    真正关闭由 StockDataReaderV2.close() 完成。原有的 conn.close() 调用无需修改。
+    """
+    
+    def close(self):
+        pass
+    
+    def close_pooled(self):
+        super().close()
+
+
+# 只折叠ASCII大小写（与 SQLite LIKE 的大小写规则一致）
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# 量价立方体的字段顺序
+CUBE_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+
+class VolumePriceCube:
+    """
+    稠密量价立方体：股票 × 交易日 × 字段（CUBE_FIELDS）
+    
+    Attributes:
+        symbols: 股票代码数组，values 第0维的行顺序
+        dates: 交易日数组（'YYYY-MM-DD'，升序），values 第1维的列顺序
+        fields: 字段名称元组，values 第2维的顺序
+        values: 量价数值 [股票, 交易日, 字段]，缺失数据为NaN
+        mask: 有效性掩码 [股票, 交易日]，该股票当日有数据行时为True
+    """
+    
+    def __init__(self, symbols: np.ndarray, dates: np.ndarray, values: np.ndarray, mask: np.ndarray,
+                 fields: Tuple[str, ...] = CUBE_FIELDS):
+        self.symbols = symbols
+        self.dates = dates
+        self.fields = tuple(fields)
+        self.values = values
+        self.mask = mask
+        self._symbol_rows = {symbol: row for row, symbol in enumerate(symbols)}
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.values.shape
+    
+    def field(self, name: str) -> np.ndarray:
+        """某个字段的 [股票, 交易日] 视图"""
+        return self.values[:, :, self.fields.index(name)]
+    
+    def row_of(self, symbol: str) -> int:
+        """股票所在行，不存在时返回-1"""
+        return self._symbol_rows.get(symbol, -1)
+    
+    def latest_valid(self, name: str) -> np.ndarray:
+        """每只股票最近一个有效交易日的字段值（无数据时为NaN）"""
+        data = self.field(name)
+        valid = self.mask & ~np.isnan(data)
+        last = data.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        result = data[np.arange(len(data)), last].astype(np.float64) if data.shape[1] else np.full(len(data), np.nan)
+        result[~valid.any(axis=1)] = np.nan
+        return result
+
 
 class StockDataReaderV2:
     """股票数据读取器 V2 - 支持SQLite、压缩SQLite和JSON格式"""
     
-    def __init__(self, db_path: str = "data-lj.dat"):
+    def __init__(self, db_path: str = "data-lj.dat", use_cache: bool = True):
+        """
+        Args:
+            db_path: 数据文件路径
+            use_cache: 压缩SQLite/JSON是否使用共享的解压数据库缓存（见get_cached_database），
+                False时每个读取器解压到自己的临时目录
+        """
         self.original_path = db_path
         self.db_path = db_path
         self.temp_dir = None
+        self.use_cache = use_cache
+        # 只读连接池：每个线程一个连接，首次查询时创建
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, PooledConnection]] = []
+        self._pool_lock = threading.Lock()
+        # 名称/代码子串搜索索引（首次搜索时构建）
+        self._search_table = None
         self.data_format = self._detect_format()
         self._prepare_database()
     
     def __del__(self):
-        """清理临时文件"""
+        """关闭连接并清理临时文件"""
+        self.close()
         if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _connect(self) -> PooledConnection:
+        """
+        获取当前线程的只读连接（线程内复用，线程间互不加锁）
+        
+        解压缓存和临时目录中的数据库不会被修改，以 immutable=1 打开，
+        SQLite跳过文件锁和变更检测；原始SQLite文件可能被更新程序改写，只用 mode=ro。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        from urllib.request import pathname2url
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        if self.data_format != 'sqlite':
+            uri += "&immutable=1"
+        # 连接只在创建它的线程中使用，关闭时可能在其他线程，因此不做同线程检查
+        conn = sqlite3.connect(uri, uri=True, factory=PooledConnection,
+                               cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+        for pragma, value in READONLY_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        
+        self._local.conn = conn
+        with self._pool_lock:
+            # 顺便关闭已结束线程遗留的连接
+            finished = [(thread, old) for thread, old in self._connections if not thread.is_alive()]
+            self._connections = [(thread, old) for thread, old in self._connections if thread.is_alive()]
+            self._connections.append((threading.current_thread(), conn))
+        for _, old in finished:
+            old.close_pooled()
+        return conn
+    
+    def close(self):
+        """关闭连接池中的所有连接（之后的查询会重新建立连接）"""
+        pool_lock = getattr(self, '_pool_lock', None)
+        if pool_lock is None:
+            return
+        with pool_lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for _, conn in connections:
+            try:
+                conn.close_pooled()
+            except Exception:
+                pass
     
     def _detect_format(self) -> str:
         """检测数据文件格式"""
@@ -71,24 +446,57 @@ class StockDataReaderV2:
             self._check_database()
             
         elif self.data_format == 'sqlite_gz':
-            # 解压缩SQLite文件到临时目录
-            self.temp_dir = tempfile.mkdtemp()
-            self.db_path = os.path.join(self.temp_dir, 'temp_db.dat')
-            
-            with gzip.open(self.original_path, 'rb') as f_in:
-                with open(self.db_path, 'wb') as f_out:
-                    shutil.copyfileobj(f_in, f_out)
-            
+            # 解压缩SQLite文件（优先复用缓存）
+            self._use_cached_or_build(self._build_database)
             self._check_database()
             
         elif self.data_format in ['json', 'json_gz']:
-            # 将JSON转换为临时SQLite数据库
-            self.temp_dir = tempfile.mkdtemp()
-            self.db_path = os.path.join(self.temp_dir, 'temp_db.dat')
-            self._convert_json_to_sqlite()
+            # 将JSON转换为SQLite数据库（优先复用缓存）
+            self._use_cached_or_build(self._build_database)
+        
+        # 原始SQLite文件不做修改，只有自带派生表时才使用
+        self.has_latest_table = self._table_exists(LATEST_TABLE)
+        self.has_trading_calendar = self._table_exists(CALENDAR_TABLE)
+    
+    def _build_database(self, target_path: str):
+        """解压/转换源文件到target_path，并构建派生表"""
+        if self.data_format == 'sqlite_gz':
+            self._decompress_sqlite(target_path)
+        else:
+            self._convert_json_to_sqlite(target_path)
+        build_latest_table(target_path)
+        build_trading_calendar(target_path)
+        analyze_database(target_path)
     
-    def _convert_json_to_sqlite(self):
-        """将JSON数据转换为SQLite数据库"""
+    def _table_exists(self, table_name: str) -> bool:
+        """数据库中是否存在指定表"""
+        try:
+            conn = self._connect()
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                               (table_name,)).fetchone()
+            return row is not None
+        except sqlite3.Error:
+            return False
+    
+    def _use_cached_or_build(self, build):
+        """使用缓存数据库；缓存不可用时构建到临时目录"""
+        cached = get_cached_database(self.original_path, self.data_format, build) if self.use_cache else None
+        if cached:
+            self.db_path = cached
+            return
+        
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'temp_db.dat')
+        build(self.db_path)
+    
+    def _decompress_sqlite(self, target_path: str):
+        """解压缩SQLite文件到target_path"""
+        with gzip.open(self.original_path, 'rb') as f_in:
+            with open(target_path, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+    
+    def _convert_json_to_sqlite(self, target_path: str):
+        """将JSON数据转换为SQLite数据库（写入target_path）"""
         try:
             # 读取JSON数据
             if self.data_format == 'json_gz':
@@ -98,11 +506,15 @@ class StockDataReaderV2:
                 with open(self.original_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
             
-            # 创建SQLite数据库
-            conn = sqlite3.connect(self.db_path)
+            # 创建SQLite数据库：目标是待原子替换的新文件，导入期间无需回滚日志和同步落盘
+            conn = sqlite3.connect(target_path, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = OFF')
+            conn.execute('PRAGMA synchronous = OFF')
+            conn.execute('PRAGMA cache_size = -262144')
             
             # 创建表结构
             cursor = conn.cursor()
+            cursor.execute('BEGIN')
             cursor.execute('''
                 CREATE TABLE stock_info (
                     symbol TEXT PRIMARY KEY,
@@ -128,28 +540,23 @@ class StockDataReaderV2:
                     close REAL NOT NULL,
                     volume INTEGER NOT NULL,
                     amount REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(symbol, date)
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
             
-            # 导入数据
-            if 'stock_info' in data:
-                stock_info_df = pd.DataFrame(data['stock_info'])
-                stock_info_df.to_sql('stock_info', conn, if_exists='append', index=False)
+            # 批量导入数据（逐条记录直接写入，不经过DataFrame）
+            for table in ('stock_info', 'volume_price_data'):
+                if table in data:
+                    _bulk_insert_records(cursor, table, data.pop(table))
             
-            if 'volume_price_data' in data:
-                volume_price_df = pd.DataFrame(data['volume_price_data'])
-                volume_price_df.to_sql('volume_price_data', conn, if_exists='append', index=False)
-            
-            # 创建索引
-            cursor.execute('CREATE INDEX idx_symbol_date ON volume_price_data(symbol, date)')
+            # 导入完成后再建索引；(symbol, date) 唯一约束由唯一索引保证
+            cursor.execute('CREATE UNIQUE INDEX idx_symbol_date ON volume_price_data(symbol, date)')
             cursor.execute('CREATE INDEX idx_market ON volume_price_data(market)')
             cursor.execute('CREATE INDEX idx_data_type ON volume_price_data(data_type)')
             cursor.execute('CREATE INDEX idx_date ON volume_price_data(date)')
             cursor.execute('CREATE INDEX idx_industry ON stock_info(industry)')
             
-            conn.commit()
+            cursor.execute('COMMIT')
             conn.close()
             
         except Exception as e:
@@ -158,7 +565,7 @@ class StockDataReaderV2:
     def _check_database(self):
         """检查数据库是否存在且有效"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = cursor.fetchall()
@@ -199,7 +606,7 @@ class StockDataReaderV2:
         Returns:
             包含股票信息的DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         conditions = []
         params = []
@@ -241,7 +648,7 @@ class StockDataReaderV2:
         Returns:
             包含量价数据的DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         # 构建查询条件
         conditions = ["symbol = ?"]
@@ -292,7 +699,7 @@ class StockDataReaderV2:
         Returns:
             包含市场数据的DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         conditions = ["market = ?"]
         params = [market]
@@ -352,7 +759,7 @@ class StockDataReaderV2:
         if not symbols:
             return {}
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 构建批量查询 - 使用 IN 子句
@@ -374,21 +781,38 @@ class StockDataReaderV2:
         
         where_clause = " AND ".join(conditions)
         
-        # 使用子查询获取每个股票的最新数据
-        query = f"""
-            SELECT symbol, {field_list}
-            FROM volume_price_data
-            WHERE {where_clause}
-            AND date = (
-                SELECT MAX(date) 
-                FROM volume_price_data AS vpd2 
-                WHERE vpd2.symbol = volume_price_data.symbol
-                {f'AND vpd2.market = ?' if market else ''}
-            )
-        """
-        
-        if market:
-            params.append(market)  # 为子查询添加market参数
+        if self.has_latest_table:
+            # 派生表按 (symbol, market) 存最新一行：指定市场时直接按索引查找；
+            # 未指定市场时取该股票各市场中日期最大的一行（与原子查询语义一致）
+            query = f"""
+                SELECT symbol, {field_list}
+                FROM {LATEST_TABLE}
+                WHERE {where_clause}
+            """
+            if not market:
+                query += f"""
+                AND date = (
+                    SELECT MAX(date)
+                    FROM {LATEST_TABLE} AS lvp2
+                    WHERE lvp2.symbol = {LATEST_TABLE}.symbol
+                )
+                """
+        else:
+            # 使用子查询获取每个股票的最新数据
+            query = f"""
+                SELECT symbol, {field_list}
+                FROM volume_price_data
+                WHERE {where_clause}
+                AND date = (
+                    SELECT MAX(date) 
+                    FROM volume_price_data AS vpd2 
+                    WHERE vpd2.symbol = volume_price_data.symbol
+                    {f'AND vpd2.market = ?' if market else ''}
+                )
+            """
+            
+            if market:
+                params.append(market)  # 为子查询添加market参数
         
         try:
             cursor.execute(query, params)
@@ -429,10 +853,13 @@ class StockDataReaderV2:
         """
         批量获取多个股票的历史数据（性能优化版本）
         
+        每只股票取截至其最新日期的最近N个交易日（按市场交易日历的 date_rank 区间，
+        停牌日没有数据行，因此返回的行数可能少于N）。
+        
         Args:
             symbols: 股票代码列表
             market: 市场代码 (可选)
-            days: 获取最近N天的数据
+            days: 获取最近N个交易日的数据
         
         Returns:
             字典: {
@@ -455,7 +882,7 @@ class StockDataReaderV2:
         if not symbols:
             return {}
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 构建批量查询
@@ -471,25 +898,44 @@ class StockDataReaderV2:
         
         where_clause = " AND ".join(conditions)
         
-        # 查询最近N天的数据
-        # 使用更简单的方法：先获取每个股票的最新日期，然后获取最近N天
+        # 每只股票的最新日期（有派生表时直接查表）
+        if self.has_latest_table:
+            latest_dates = f"SELECT symbol, market, date AS max_date FROM {LATEST_TABLE} WHERE {where_clause}"
+        else:
+            latest_dates = f"""
+                SELECT symbol, market, MAX(date) AS max_date
+                FROM volume_price_data
+                WHERE {where_clause}
+                GROUP BY symbol, market
+            """
+        
+        # 交易日历：有派生表时按索引查找，否则在查询中临时计算
+        calendar_cte = "" if self.has_trading_calendar else f"""
+            {CALENDAR_TABLE} AS (
+                SELECT market, date, DENSE_RANK() OVER (PARTITION BY market ORDER BY date) AS date_rank
+                FROM (SELECT DISTINCT market, date FROM volume_price_data)
+            ),
+        """
+        
+        # 最近N个交易日 = 日历中 (最新日期的date_rank - N, 最新日期的date_rank] 区间
         query = f"""
-            WITH latest_dates AS (
-                SELECT symbol, MAX(date) as max_date
-            FROM volume_price_data
-            WHERE {where_clause}
-                GROUP BY symbol
+            WITH {calendar_cte}
+            latest_dates AS ({latest_dates}),
+            windows AS (
+                SELECT l.symbol, l.market, l.max_date, s.date AS start_date
+                FROM latest_dates l
+                JOIN {CALENDAR_TABLE} e ON e.market = l.market AND e.date = l.max_date
+                JOIN {CALENDAR_TABLE} s ON s.market = l.market AND s.date_rank = MAX(1, e.date_rank - ? + 1)
             )
             SELECT v.symbol, v.date, v.open, v.high, v.low, v.close, v.volume, v.amount
-            FROM volume_price_data v
-            INNER JOIN latest_dates l ON v.symbol = l.symbol
-            WHERE v.symbol IN ({placeholders})
-            AND v.date >= date(l.max_date, '-' || ? || ' days')
+            FROM windows w
+            JOIN volume_price_data v
+                ON v.symbol = w.symbol AND v.market = w.market
+                AND v.date >= w.start_date AND v.date <= w.max_date
             ORDER BY v.symbol, v.date DESC
         """
         
-        # 添加 days 参数 - 注意：params已经包含symbols和market，只需追加days
-        params_final = params + symbols + [days - 1]
+        params_final = params + [max(1, int(days))]
         
         try:
             cursor.execute(query, params_final)
@@ -533,6 +979,144 @@ class StockDataReaderV2:
             traceback.print_exc()
             return {}
     
+    def get_batch_stock_data(self, symbols: List[str], market: Optional[str] = None,
+                             days: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多个股票/指数最近N条量价数据（一次查询）
+        
+        每只股票的结果与 get_stock_data(symbol, market).tail(days) 相同：按该股票自身的
+        数据行计数（不按交易日历），列与 get_stock_data 一致。
+        
+        Args:
+            symbols: 股票代码列表
+            market: 市场代码 (可选)
+            days: 每只股票最近N条数据，None表示全部
+        
+        Returns:
+            {股票代码: DataFrame}，没有数据的股票不在结果中
+        """
+        if not symbols:
+            return {}
+        
+        conn = self._connect()
+        
+        placeholders = ','.join('?' * len(symbols))
+        conditions = [f"symbol IN ({placeholders})"]
+        params = list(symbols)
+        
+        if market:
+            conditions.append("market = ?")
+            params.append(market)
+        
+        where_clause = " AND ".join(conditions)
+        row_limit = ""
+        if days is not None:
+            row_limit = "WHERE row_num <= ?"
+            params.append(max(0, int(days)))
+        
+        query = f"""
+            SELECT symbol, market, data_type, date, open, high, low, close, volume, amount
+            FROM (
+                SELECT symbol, market, data_type, date, open, high, low, close, volume, amount,
+                       ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY date DESC) AS row_num
+                FROM volume_price_data
+                WHERE {where_clause}
+            )
+            {row_limit}
+            ORDER BY symbol, date
+        """
+        
+        df = pd.read_sql_query(query, conn, params=params)
+        return {symbol: group.reset_index(drop=True) for symbol, group in df.groupby('symbol', sort=False)}
+    
+    def get_volume_price_cube(self, symbols: Optional[List[str]] = None, market: Optional[str] = None,
+                              data_type: Optional[str] = None, days: int = 38,
+                              end_date: Optional[str] = None, dtype=np.float32) -> VolumePriceCube:
+        """
+        批量获取量价立方体（股票 × 最近N个交易日 × OHLCVA）
+        
+        交易日历取所选市场/类型在数据库中出现过的日期，最近N个交易日的数据
+        按 (symbol, date) 顺序一次扫描读出，直接写入稠密数组。
+        成交金额缺失或为0时按 成交量 × 收盘价 补算（与 get_batch_historical_data 一致）。
+        
+        Args:
+            symbols: 股票代码列表（保持顺序，无数据的股票整行mask为False），None表示全部有数据的股票
+            market: 市场代码
+            data_type: 数据类型 ('stock', 'index')
+            days: 交易日数量
+            end_date: 截止日期（含），None表示最新
+            dtype: 数值类型，默认float32
+        
+        Returns:
+            VolumePriceCube
+        """
+        conditions = []
+        params = []
+        if market:
+            conditions.append("market = ?")
+            params.append(market)
+        if data_type:
+            conditions.append("data_type = ?")
+            params.append(data_type)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        
+        conn = self._connect()
+        try:
+            # 交易日历：最近N个交易日
+            date_rows = conn.execute(
+                f"SELECT DISTINCT date FROM volume_price_data WHERE {where_clause} ORDER BY date DESC LIMIT ?",
+                params + [max(0, int(days))]
+            ).fetchall()
+            dates = np.array(sorted(row[0] for row in date_rows), dtype=object)
+            
+            # 指定股票时只读取这些股票的行（交易日历仍按整个市场）
+            row_clause = where_clause
+            row_params = list(params)
+            if symbols is not None:
+                symbol_array = np.array(list(dict.fromkeys(symbols)), dtype=object)
+                placeholders = ','.join('?' * len(symbol_array))
+                row_clause += f" AND symbol IN ({placeholders})"
+                row_params += list(symbol_array)
+            
+            rows = []
+            if len(dates) and (symbols is None or len(symbol_array)):
+                rows = conn.execute(
+                    f"""
+                    SELECT symbol, date, {', '.join(CUBE_FIELDS)}
+                    FROM volume_price_data
+                    WHERE {row_clause} AND date >= ?
+                    ORDER BY symbol, date
+                    """,
+                    row_params + [dates[0]]
+                ).fetchall()
+        finally:
+            conn.close()
+        
+        if symbols is None:
+            symbol_array = np.array(list(dict.fromkeys(row[0] for row in rows)), dtype=object)
+        
+        values = np.full((len(symbol_array), len(dates), len(CUBE_FIELDS)), np.nan, dtype=dtype)
+        mask = np.zeros((len(symbol_array), len(dates)), dtype=bool)
+        if rows:
+            columns = list(zip(*rows))
+            row_idx = pd.Index(symbol_array).get_indexer(np.array(columns[0], dtype=object))
+            col_idx = np.searchsorted(dates, np.array(columns[1], dtype=object))
+            data = np.array(columns[2:], dtype=np.float64).T
+            
+            # 补算缺失的成交金额
+            volume, close, amount = data[:, 4], data[:, 3], data[:, 5]
+            fill = ((np.isnan(amount) | (amount == 0)) & (volume > 0) & (close > 0))
+            amount[fill] = volume[fill] * close[fill]
+            
+            keep = row_idx >= 0
+            values[row_idx[keep], col_idx[keep]] = data[keep]
+            mask[row_idx[keep], col_idx[keep]] = True
+        
+        return VolumePriceCube(symbol_array, dates, values, mask)
+    
     def get_latest_data(self, symbol: Optional[str] = None, market: Optional[str] = None, 
                        data_type: Optional[str] = None, days: int = 1) -> pd.DataFrame:
         """
@@ -547,7 +1131,7 @@ class StockDataReaderV2:
         Returns:
             包含最新数据的DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         # 获取最新日期
         cursor = conn.cursor()
@@ -605,7 +1189,18 @@ class StockDataReaderV2:
         Returns:
             匹配的股票列表
         """
-        conn = sqlite3.connect(self.db_path)
+        # LIKE 通配符需要SQL处理，其余情况使用内存中的子串索引
+        search_table = None if '%' in keyword or '_' in keyword else self._get_search_table()
+        if search_table is not None:
+            stock_info, index = search_table
+            df = stock_info.iloc[index.find(keyword.translate(_ASCII_LOWER))]
+            if market:
+                df = df[df['market'] == market]
+            if data_type:
+                df = df[df['data_type'] == data_type]
+            return df.reset_index(drop=True)
+        
+        conn = self._connect()
         
         conditions = ["(symbol LIKE ? OR name LIKE ?)"]
         params = [f"%{keyword}%", f"%{keyword}%"]
@@ -630,6 +1225,23 @@ class StockDataReaderV2:
         
         return df
     
+    def _get_search_table(self):
+        """
+        (按 market, data_type, symbol 排序的stock_info, 代码+名称的子串索引)
+        
+        与 SQLite LIKE 一致只对ASCII字母不区分大小写；搜索索引模块不可用时返回None。
+        """
+        if self._search_table is None:
+            try:
+                from data.stock_search_index import SubstringIndex
+            except ImportError:
+                return None
+            stock_info = self.get_stock_list()
+            texts = [f"{symbol}\x00{name}".translate(_ASCII_LOWER)
+                     for symbol, name in zip(stock_info['symbol'].astype(str), stock_info['name'].astype(str))]
+            self._search_table = (stock_info, SubstringIndex(texts))
+        return self._search_table
+    
     def get_industry_stocks(self, industry: str, market: Optional[str] = None) -> pd.DataFrame:
         """
         获取指定行业的股票
@@ -641,7 +1253,7 @@ class StockDataReaderV2:
         Returns:
             指定行业的股票列表
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         conditions = ["industry = ?", "data_type = 'stock'"]
         params = [industry]
@@ -669,7 +1281,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         stats = {}
@@ -712,6 +1324,45 @@ class StockDataReaderV2:
         conn.close()
         return stats
     
+    def get_recent_average_amount(self, days: int = 5, data_type: str = 'stock',
+                                  market: Optional[str] = None) -> Dict[str, float]:
+        """
+        最近N个交易日的平均成交金额（一次聚合查询）
+        
+        Args:
+            days: 交易日数量
+            data_type: 数据类型 ('stock' 或 'index')
+            market: 市场代码 (可选)
+            
+        Returns:
+            字典: {symbol: 平均成交金额}，成交金额缺失时用 volume * close 估算
+        """
+        conn = self._connect()
+        
+        market_clause = "AND market = ?" if market else ""
+        query = f"""
+            SELECT symbol,
+                   AVG(CASE WHEN amount IS NULL OR amount = 0 THEN volume * close ELSE amount END)
+            FROM volume_price_data
+            WHERE data_type = ? {market_clause}
+            AND date >= (
+                SELECT MIN(date) FROM (
+                    SELECT DISTINCT date FROM volume_price_data
+                    WHERE data_type = ? {market_clause}
+                    ORDER BY date DESC LIMIT ?
+                )
+            )
+            GROUP BY symbol
+        """
+        params = [data_type] + ([market] if market else [])
+        params += [data_type] + ([market] if market else []) + [days]
+        
+        try:
+            rows = conn.execute(query, params).fetchall()
+            return {symbol: float(amount or 0) for symbol, amount in rows}
+        finally:
+            conn.close()
+    
     def get_top_volume_stocks(self, market: str, data_type: str = 'stock', 
                              date: Optional[str] = None, top_n: int = 10) -> pd.DataFrame:
         """
@@ -726,7 +1377,7 @@ class StockDataReaderV2:
         Returns:
             成交量排序的数据
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         
         if date is None:
             # 获取最新日期
@@ -763,7 +1414,7 @@ class StockDataReaderV2:
         Returns:
             龙虎榜数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查龙虎榜表是否存在
@@ -810,7 +1461,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查龙虎榜表是否存在
@@ -896,7 +1547,7 @@ class StockDataReaderV2:
         Returns:
             排行数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查龙虎榜表是否存在
@@ -947,7 +1598,7 @@ class StockDataReaderV2:
         Returns:
             资金流向数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查资金流向表是否存在
@@ -994,7 +1645,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查资金流向表是否存在
@@ -1070,7 +1721,7 @@ class StockDataReaderV2:
         Returns:
             排行数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查资金流向表是否存在
@@ -1120,7 +1771,7 @@ class StockDataReaderV2:
         Returns:
             涨停板数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板表是否存在
@@ -1171,7 +1822,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板表是否存在
@@ -1250,7 +1901,7 @@ class StockDataReaderV2:
         Returns:
             排行数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板表是否存在
@@ -1292,7 +1943,7 @@ class StockDataReaderV2:
         Returns:
             板块资金流向数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查板块资金流向表是否存在
@@ -1345,7 +1996,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查板块资金流向表是否存在
@@ -1449,7 +2100,7 @@ class StockDataReaderV2:
         Returns:
             排行数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查板块资金流向表是否存在
@@ -1497,7 +2148,7 @@ class StockDataReaderV2:
         Returns:
             涨停板板块统计数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板板块统计表是否存在
@@ -1544,7 +2195,7 @@ class StockDataReaderV2:
         Returns:
             统计信息字典
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板板块统计表是否存在
@@ -1618,7 +2269,7 @@ class StockDataReaderV2:
         Returns:
             排行数据DataFrame
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         # 检查涨停板板块统计表是否存在
@@ -20,8 +20,179 @@ import gzip
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
 
+# 原始数据只有收盘价和成交金额时使用的默认值
+DEFAULT_VOLUME = 1000000  # 默认成交量100万股
+DEFAULT_PRICE = 10.0  # 默认价格
+# 列式存储中统一计算的每日字段
+_DERIVED_DAY_FIELDS = frozenset({'收盘价', '成交金额', '成交量'})
+
+
+class MarketColumns:
+    """
+    单个市场量价数据的列式存储
+    
+    加载时把 {'stocks': {代码: {'股票名称', '交易数据': {日期: {...}}}}} 转换为
+    按股票连续存放的数组（每只股票的日期升序），代码 -> 行号索引：
+    - offsets[i]:offsets[i+1] 为第i只股票在扁平数组中的区间
+    - date_codes: 日期在 calendar（全市场去重排序的日期）中的编号
+    - close / amount / volume: 已按规则补全的收盘价、成交金额和推算的成交量
+    
+    按天数或日期范围过滤只是在股票区间内切片，名称搜索使用预建索引。
+    """
+    
+    def __init__(self, data: Dict[str, Any]):
+        """
+        Args:
+            data: 压缩JSON文件解析后的字典
+        """
+        stocks = data.get('stocks', {})
+        self.summary = data.get('summary', {})
+        self.codes: List[str] = list(stocks)
+        self.code_index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self.names: List[str] = []
+        # 股票级别的其他字段（少见，只保存存在的）
+        self.stock_extras: Dict[int, Dict[str, Any]] = {}
+        # 每日数据中收盘价/成交金额以外的字段（少见，只保存存在的）：{扁平行号: {字段: 值}}
+        self.day_extras: Dict[int, Dict[str, Any]] = {}
+        
+        offsets = [0]
+        date_ids: Dict[str, int] = {}
+        dates: List[int] = []
+        prices: List[float] = []
+        amounts: List[float] = []
+        for i, code in enumerate(self.codes):
+            stock_info = stocks[code]
+            self.names.append(stock_info.get("股票名称", ""))
+            extras = {key: value for key, value in stock_info.items() if key not in ("股票名称", "交易数据")}
+            if extras:
+                self.stock_extras[i] = extras
+            
+            trade_data = stock_info.get("交易数据", {}) or {}
+            for date in sorted(trade_data):
+                day_data = trade_data[date]
+                date_id = date_ids.get(date)
+                if date_id is None:
+                    date_id = date_ids[date] = len(date_ids)
+                dates.append(date_id)
+                prices.append(day_data.get('收盘价', 0) or 0)
+                amounts.append(day_data.get('成交金额', 0) or 0)
+                if not day_data.keys() <= _DERIVED_DAY_FIELDS:
+                    self.day_extras[len(dates) - 1] = {key: value for key, value in day_data.items()
+                                                       if key not in _DERIVED_DAY_FIELDS}
+            offsets.append(len(dates))
+        
+        # 日期编号重排为日历顺序（日期字符串可按字典序比较）
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.calendar = np.array(sorted(date_ids), dtype=object)
+        order = np.empty(len(date_ids), dtype=np.int32)
+        order[[date_ids[date] for date in self.calendar]] = np.arange(len(date_ids), dtype=np.int32)
+        self.date_codes = order[np.array(dates, dtype=np.int64)] if dates else np.array([], dtype=np.int32)
+        
+        # 原始数据只有收盘价和成交金额：成交量 = 成交金额 ÷ 收盘价；
+        # 成交金额缺失时使用默认成交量并反算成交金额，价格无效时使用默认价格
+        price = np.array(prices, dtype=np.float64)
+        amount = np.array(amounts, dtype=np.float64)
+        valid = (price > 0) & (amount > 0)
+        self.close = np.where(price > 0, price, DEFAULT_PRICE)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.volume = np.where(valid, np.trunc(amount / np.where(valid, price, 1.0)), DEFAULT_VOLUME).astype(np.int64)
+        self.amount = np.where(valid, amount, self.close * DEFAULT_VOLUME)
+        
+        self._build_name_index()
+    
+    def __len__(self) -> int:
+        return len(self.codes)
+    
+    def _build_name_index(self):
+        """名称搜索索引：名称 -> 行号列表，以及所有名称拼接成的查找串"""
+        self._name_rows: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.names):
+            self._name_rows.setdefault(name, []).append(i)
+        # 名称之间用不会出现在名称中的分隔符拼接，子串查找在C层完成
+        self._name_text = '\x00'.join(self.names)
+        starts = np.cumsum([0] + [len(name) + 1 for name in self.names[:-1]]) if self.names else []
+        self._name_starts = np.asarray(starts, dtype=np.int64)
+    
+    def search_names(self, keyword: str) -> List[int]:
+        """
+        名称匹配（关键词是名称的子串，或名称是关键词的子串），按原始顺序返回行号
+        
+        Args:
+            keyword: 搜索关键词
+        """
+        if not keyword:
+            return list(range(len(self.names)))
+        
+        rows = set()
+        # 名称是关键词的子串：枚举关键词的所有子串（含空串）查名称索引
+        for start in range(len(keyword) + 1):
+            for end in range(start, len(keyword) + 1):
+                rows.update(self._name_rows.get(keyword[start:end], ()))
+        # 关键词是名称的子串：在拼接串中查找所有出现位置
+        if '\x00' not in keyword:
+            position = self._name_text.find(keyword)
+            while position >= 0:
+                rows.add(int(np.searchsorted(self._name_starts, position, side='right')) - 1)
+                position = self._name_text.find(keyword, position + 1)
+        return sorted(rows)
+    
+    def day_window(self, row: int, days: Optional[int] = None) -> Tuple[int, int]:
+        """第row只股票最近days个交易日在扁平数组中的区间（days为空时为全部）"""
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        if days:
+            start = max(start, end - days)
+        return start, end
+    
+    def date_range_window(self, row: int, start_date: str, end_date: str) -> Tuple[int, int]:
+        """第row只股票日期在 [start_date, end_date] 内的区间"""
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        first_code = np.searchsorted(self.calendar, start_date, side='left')
+        last_code = np.searchsorted(self.calendar, end_date, side='right')
+        codes = self.date_codes[start:end]
+        return (start + int(np.searchsorted(codes, first_code, side='left')),
+                start + int(np.searchsorted(codes, last_code, side='left')))
+    
+    def trade_data(self, start: int, end: int) -> Dict[str, Dict[str, Any]]:
+        """区间内的每日数据 {日期: {'收盘价', '成交金额', ..., '成交量'}}"""
+        result = {}
+        for row in range(start, end):
+            day_data = {'收盘价': float(self.close[row]), '成交金额': float(self.amount[row])}
+            if row in self.day_extras:
+                day_data.update(self.day_extras[row])
+            day_data['成交量'] = int(self.volume[row])
+            result[self.calendar[self.date_codes[row]]] = day_data
+        return result
+    
+    def stock_info(self, row: int, start: int, end: int, summary: bool = True) -> Dict[str, Any]:
+        """
+        构建区间的股票数据字典
+        
+        Args:
+            row: 股票行号
+            start / end: 扁平数组区间
+            summary: True时附带交易日期列表/最早交易日/最新交易日/交易天数，
+                False时附带股票级别的原始字段（与完整数据一致）
+        """
+        if not summary:
+            info = dict(self.stock_extras.get(row, {}))
+            info["股票名称"] = self.names[row]
+            info["交易数据"] = self.trade_data(start, end)
+            return info
+        
+        dates = self.calendar[self.date_codes[start:end]].tolist()
+        return {
+            "股票名称": self.names[row],
+            "交易数据": self.trade_data(start, end),
+            "交易日期列表": dates,
+            "最早交易日": dates[0],
+            "最新交易日": dates[-1],
+            "交易天数": len(dates)
+        }
+
+
 class StockSearchTool:
     """股票搜索工具"""
     
@@ -132,7 +303,8 @@ class StockSearchTool:
         data = self.load_compressed_json(file_path)
         
         if data:
-            self.loaded_data[market] = data
+            # 转换为列式存储，嵌套字典随后释放
+            self.loaded_data[market] = MarketColumns(data)
             return True
         return False
     
@@ -157,18 +329,17 @@ class StockSearchTool:
         if not self.load_market_data(market):
             raise RuntimeError(f"无法加载{market.upper()}市场数据")
             
-        market_data = self.loaded_data[market]
-        stocks = market_data.get('stocks', {})
+        columns = self.loaded_data[market]
         
         # 尝试不同格式的代码
         for search_code in search_codes:
-            if search_code in stocks:
-                stock_info = stocks[search_code]
-                filtered_data = self._filter_by_days(stock_info, days)
+            row = columns.code_index.get(search_code)
+            if row is not None:
+                filtered_data = self._filter_by_days(columns, row, days)
                 results[market] = {
                     "市场": market.upper(),
                     "股票代码": search_code,  # 保存原始格式，在显示时清理
-                    "股票名称": stock_info.get("股票名称", ""),
+                    "股票名称": columns.names[row],
                     "数据": filtered_data
                 }
                 # 找到后停止搜索其他格式
@@ -222,21 +393,17 @@ class StockSearchTool:
         if not self.load_market_data(market):
             raise RuntimeError(f"无法加载{market.upper()}市场数据")
             
-        market_data = self.loaded_data[market]
-        stocks = market_data.get('stocks', {})
-        
-        # 搜索匹配的股票名称
-        for code, stock_info in stocks.items():
-            name = stock_info.get("股票名称", "")
-            if stock_name in name or name in stock_name:
-                filtered_data = self._filter_by_days(stock_info, days)
-                key = f"{market}_{code}"
-                results[key] = {
-                    "市场": market.upper(),
-                    "股票代码": code,
-                    "股票名称": name,
-                    "数据": filtered_data
-                }
+        columns = self.loaded_data[market]
+        
+        # 搜索匹配的股票名称（关键词与名称互为子串，使用预建名称索引）
+        for row in columns.search_names(stock_name):
+            code = columns.codes[row]
+            results[f"{market}_{code}"] = {
+                "市场": market.upper(),
+                "股票代码": code,
+                "股票名称": columns.names[row],
+                "数据": self._filter_by_days(columns, row, days)
+            }
         
         return results
     
@@ -255,8 +422,7 @@ class StockSearchTool:
         if not self.load_market_data(market):
             raise RuntimeError(f"无法加载{market.upper()}市场数据")
             
-        market_data = self.loaded_data[market]
-        stocks = market_data.get('stocks', {})
+        columns = self.loaded_data[market]
         
         # 如果指定了股票代码
         if stock_code:
@@ -264,181 +430,53 @@ class StockSearchTool:
             search_codes = self._prepare_search_codes(stock_code)
             
             for search_code in search_codes:
-                if search_code in stocks:
-                    stock_info = stocks[search_code]
-                    filtered_data = self._filter_by_date_range(stock_info, start_date, end_date)
+                row = columns.code_index.get(search_code)
+                if row is not None:
+                    filtered_data = self._filter_by_date_range(columns, row, start_date, end_date)
                     if filtered_data:
                         results[f"{market}_{search_code}"] = {
                             "市场": market.upper(),
                             "股票代码": search_code,
-                            "股票名称": stock_info.get("股票名称", ""),
+                            "股票名称": columns.names[row],
                             "数据": filtered_data
                         }
                     break  # 找到后停止搜索其他格式
         else:
             # 搜索所有股票在指定日期范围内的数据
-            for code, stock_info in stocks.items():
-                filtered_data = self._filter_by_date_range(stock_info, start_date, end_date)
+            for row, code in enumerate(columns.codes):
+                filtered_data = self._filter_by_date_range(columns, row, start_date, end_date)
                 if filtered_data:
                     results[f"{market}_{code}"] = {
                         "市场": market.upper(),
                         "股票代码": code,
-                        "股票名称": stock_info.get("股票名称", ""),
+                        "股票名称": columns.names[row],
                         "数据": filtered_data
                     }
         
         return results
     
-    def _add_volume_to_stock_info(self, stock_info: Dict[str, Any]) -> Dict[str, Any]:
-        """为股票信息添加成交量字段"""
-        if not stock_info:
-            return stock_info
-            
-        trade_data = stock_info.get("交易数据", {})
-        if not trade_data:
-            return stock_info
-        
-        # 复制股票信息
-        updated_info = stock_info.copy()
-        updated_trade_data = {}
-        
-        # 处理每天的数据，添加成交量字段
-        for date, day_data in trade_data.items():
-            updated_day_data = day_data.copy()
-            price = updated_day_data.get('收盘价', 0)
-            amount = updated_day_data.get('成交金额', 0)
-            
-            # 原始数据只有收盘价和成交金额，需要计算成交量
-            # 计算公式：成交量 = 成交金额 ÷ 收盘价
-            if price > 0 and amount > 0:
-                volume = int(amount / price)  # 成交量 = 成交金额 ÷ 收盘价
-            elif price > 0 and amount == 0:
-                # 如果成交金额为0，使用默认成交量，并重新计算成交金额
-                volume = 1000000  # 默认成交量100万股
-                amount = price * volume  # 成交金额 = 收盘价 × 成交量
-                updated_day_data['成交金额'] = amount
-            else:
-                # 价格为0或无效的情况，使用默认值
-                volume = 1000000
-                if price <= 0:
-                    price = 10.0  # 默认价格
-                    updated_day_data['收盘价'] = price
-                amount = price * volume
-                updated_day_data['成交金额'] = amount
-            
-            updated_day_data['成交量'] = volume
-            updated_trade_data[date] = updated_day_data
-        
-        updated_info["交易数据"] = updated_trade_data
-        return updated_info
-    
-    def _filter_by_days(self, stock_info: Dict[str, Any], days: int = None) -> Dict[str, Any]:
-        """按天数过滤数据"""
-        if not days:
-            # 即使不过滤天数，也要添加成交量字段
-            return self._add_volume_to_stock_info(stock_info)
-        
-        trade_data = stock_info.get("交易数据", {})
-        if not trade_data:
-            return stock_info
-        
-        # 获取排序后的日期列表
-        sorted_dates = sorted(trade_data.keys(), reverse=True)  # 最新的在前
+    def _filter_by_days(self, columns: MarketColumns, row: int, days: int = None) -> Dict[str, Any]:
+        """
+        按天数过滤数据（在列式存储中切片，成交量已在加载时计算）
         
-        # 取最近的指定天数
-        if days < len(sorted_dates):
-            recent_dates = sorted_dates[:days]
-            filtered_trade_data = {}
-            
-            # 处理每天的数据，添加成交量字段
-            for date in recent_dates:
-                day_data = trade_data[date].copy()  # 复制原数据
-                price = day_data.get('收盘价', 0)
-                amount = day_data.get('成交金额', 0)
-                
-                # 原始数据只有收盘价和成交金额，需要计算成交量
-                # 计算公式：成交量 = 成交金额 ÷ 收盘价
-                if price > 0 and amount > 0:
-                    volume = int(amount / price)  # 成交量 = 成交金额 ÷ 收盘价
-                elif price > 0 and amount == 0:
-                    # 如果成交金额为0，使用默认成交量，并重新计算成交金额
-                    volume = 1000000  # 默认成交量100万股
-                    amount = price * volume  # 成交金额 = 收盘价 × 成交量
-                    day_data['成交金额'] = amount
-                else:
-                    # 价格为0或无效的情况，使用默认值
-                    volume = 1000000
-                    if price <= 0:
-                        price = 10.0  # 默认价格
-                        day_data['收盘价'] = price
-                    amount = price * volume
-                    day_data['成交金额'] = amount
-                
-                day_data['成交量'] = volume
-                filtered_trade_data[date] = day_data
-            
-            # 重新构建过滤后的数据
-            filtered_info = {
-                "股票名称": stock_info.get("股票名称", ""),
-                "交易数据": filtered_trade_data,
-                "交易日期列表": sorted(recent_dates),
-                "最早交易日": min(recent_dates),
-                "最新交易日": max(recent_dates),
-                "交易天数": len(recent_dates)
-            }
-            return filtered_info
+        Args:
+            columns: 市场列式数据
+            row: 股票行号
+            days: 最近天数，为空或不少于全部天数时返回完整数据
+        """
+        start, end = columns.day_window(row)
+        if not days or days >= end - start:
+            return columns.stock_info(row, start, end, summary=False)
         
-        return stock_info
+        start, end = columns.day_window(row, days)
+        return columns.stock_info(row, start, end)
     
-    def _filter_by_date_range(self, stock_info: Dict[str, Any], start_date: str, end_date: str) -> Dict[str, Any]:
-        """按日期范围过滤数据"""
-        trade_data = stock_info.get("交易数据", {})
-        if not trade_data:
+    def _filter_by_date_range(self, columns: MarketColumns, row: int, start_date: str, end_date: str) -> Dict[str, Any]:
+        """按日期范围过滤数据（二分查找日期区间后切片）"""
+        start, end = columns.date_range_window(row, start_date, end_date)
+        if start >= end:
             return {}
-        
-        # 过滤日期范围内的数据
-        filtered_trade_data = {}
-        for date, data in trade_data.items():
-            if start_date <= date <= end_date:
-                day_data = data.copy()  # 复制原数据
-                price = day_data.get('收盘价', 0)
-                amount = day_data.get('成交金额', 0)
-                
-                # 原始数据只有收盘价和成交金额，需要计算成交量
-                # 计算公式：成交量 = 成交金额 ÷ 收盘价
-                if price > 0 and amount > 0:
-                    volume = int(amount / price)  # 成交量 = 成交金额 ÷ 收盘价
-                elif price > 0 and amount == 0:
-                    # 如果成交金额为0，使用默认成交量，并重新计算成交金额
-                    volume = 1000000  # 默认成交量100万股
-                    amount = price * volume  # 成交金额 = 收盘价 × 成交量
-                    day_data['成交金额'] = amount
-                else:
-                    # 价格为0或无效的情况，使用默认值
-                    volume = 1000000
-                    if price <= 0:
-                        price = 10.0  # 默认价格
-                        day_data['收盘价'] = price
-                    amount = price * volume
-                    day_data['成交金额'] = amount
-                
-                day_data['成交量'] = volume
-                filtered_trade_data[date] = day_data
-        
-        if not filtered_trade_data:
-            return {}
-        
-        # 重新构建过滤后的数据
-        sorted_dates = sorted(filtered_trade_data.keys())
-        filtered_info = {
-            "股票名称": stock_info.get("股票名称", ""),
-            "交易数据": filtered_trade_data,
-            "交易日期列表": sorted_dates,
-            "最早交易日": sorted_dates[0],
-            "最新交易日": sorted_dates[-1],
-            "交易天数": len(sorted_dates)
-        }
-        return filtered_info
+        return columns.stock_info(row, start, end)
     
     def format_results(self, results: Dict[str, Any], output_format: str = "table") -> str:
         """格式化搜索结果"""
@@ -511,25 +549,17 @@ class StockSearchTool:
         if not self.load_market_data(market):
             return {}
         
-        market_data = self.loaded_data[market]
-        stocks = market_data.get('stocks', {})
-        summary_info = market_data.get('summary', {})
+        columns = self.loaded_data[market]
+        summary_info = columns.summary
         
-        # 统计信息
-        total_stocks = len(stocks)
-        total_trading_days = 0
+        # 统计信息（calendar 即全市场去重排序后的日期）
+        total_stocks = len(columns)
+        total_trading_days = len(columns.calendar)
         date_range = {"earliest": None, "latest": None}
         
-        all_dates = set()
-        for stock_info in stocks.values():
-            trade_data = stock_info.get('交易数据', {})
-            all_dates.update(trade_data.keys())
-        
-        if all_dates:
-            sorted_dates = sorted(all_dates)
-            date_range["earliest"] = sorted_dates[0]
-            date_range["latest"] = sorted_dates[-1]
-            total_trading_days = len(sorted_dates)
+        if total_trading_days:
+            date_range["earliest"] = columns.calendar[0]
+            date_range["latest"] = columns.calendar[-1]
         
         return {
             "市场": market.upper(),
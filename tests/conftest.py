@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共配置 - 把项目根目录加入导入路径，并提供合成评级数据
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+RATINGS = ['大多', '中多', '小多', '微多', '微空', '小空', '中空', '大空']
+
+
+def make_rating_frame(n_stocks: int = 200, n_dates: int = 30, n_index: int = 8,
+                      seed: int = 0) -> pd.DataFrame:
+    """
+    生成合成评级数据（与实际数据文件的列布局一致）
+
+    部分股票前段缺失（新上市）、中段缺失（停牌），前段缺失不超过10个日期。
+
+    Args:
+        n_stocks: 股票数量
+        n_dates: 日期列数量
+        n_index: 属于'指数'行业的行数
+        seed: 随机种子
+
+    Returns:
+        pd.DataFrame: 股票代码、股票名称、行业 + 日期列
+    """
+    rng = np.random.default_rng(seed)
+    dates = [d.strftime('%Y%m%d') for d in pd.bdate_range('2025-06-02', periods=n_dates)]
+    ratings = rng.choice(RATINGS, size=(n_stocks, n_dates)).astype(object)
+
+    late_listed = rng.random(n_stocks) < 0.1
+    for row in np.flatnonzero(late_listed):
+        ratings[row, :rng.integers(1, 10)] = '-'
+    suspended = rng.random((n_stocks, n_dates)) < 0.05
+    suspended[:, 0] = False
+    ratings[suspended] = '-'
+
+    industries = np.array(['银行', '电子', '医药', '化工'], dtype=object)[rng.integers(0, 4, n_stocks)]
+    industries[:n_index] = '指数'
+
+    frame = pd.DataFrame({
+        '股票代码': [f'{i:06d}' for i in range(n_stocks)],
+        '股票名称': [f'股票{i}' for i in range(n_stocks)],
+        '行业': industries,
+    })
+    return pd.concat([frame, pd.DataFrame(ratings, columns=dates)], axis=1)
+
+
+@pytest.fixture
+def rating_frame():
+    """合成评级数据的工厂函数"""
+    return make_rating_frame
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+增强版MSCI测试 - 向量化指数评级路径与原逐日实现对比
+"""
+
+import numpy as np
+import pytest
+
+from algorithms.enhanced_msci_calculator import (
+    INDEX_RATING_SCORE_MAP, build_enhanced_msci_history, calculate_enhanced_msci,
+    calculate_enhanced_msci_series, calculate_index_average_rating, calculate_index_rating_series
+)
+from algorithms.msci_calculator import _calculate_daily_msci, _interpolate_ratings
+
+
+def _index_rating_reference(data, date_col):
+    """原逐日实现：筛选指数行后逐个累加评级分数"""
+    index_stocks = data[data['行业'].str.contains('指数', na=False)]
+    ratings = [r for r in index_stocks[date_col]
+               if r in INDEX_RATING_SCORE_MAP and INDEX_RATING_SCORE_MAP[r] is not None]
+    if not ratings:
+        return (50.0, False)
+    avg_score = sum(INDEX_RATING_SCORE_MAP[r] for r in ratings) / len(ratings)
+    return (round(max(12.5, min(avg_score, 100.0)), 2), True)
+
+
+def _enhanced_history_reference(data, date_columns):
+    """原逐日实现：每个日期分别计算原始MSCI、指数评级和改进MSCI"""
+    history = []
+    last_valid_index_rating = 50.0
+    for date_col in date_columns:
+        daily_msci = _calculate_daily_msci(data, date_col)
+        if not daily_msci:
+            continue
+        index_rating, is_valid = _index_rating_reference(data, date_col)
+        if not is_valid and last_valid_index_rating != 50.0:
+            index_rating = last_valid_index_rating
+        elif is_valid:
+            last_valid_index_rating = index_rating
+
+        enhanced_daily = daily_msci.copy()
+        enhanced_daily['original_msci'] = daily_msci['msci']
+        enhanced_daily['index_rating'] = index_rating
+        enhanced_daily['msci'] = calculate_enhanced_msci(daily_msci['msci'], index_rating)
+        enhanced_daily['enhanced'] = True
+        history.append(enhanced_daily)
+    return history
+
+
+def _date_columns(data):
+    """已排序的日期列"""
+    return sorted(col for col in data.columns if col.startswith('202'))
+
+
+def test_index_rating_series_matches_per_date(rating_frame):
+    """指数评级序列与逐日计算一致（含'-'和空值）"""
+    data = rating_frame(n_index=12, seed=5)
+    date_columns = _date_columns(data)
+    data.loc[data.index[:12], date_columns[4]] = '-'
+    data.loc[data.index[:6], date_columns[7]] = np.nan
+
+    ratings, valid = calculate_index_rating_series(data, date_columns)
+
+    for i, date_col in enumerate(date_columns):
+        expected = _index_rating_reference(data, date_col)
+        assert (round(float(ratings[i]), 2), bool(valid[i])) == expected
+        assert calculate_index_average_rating(data, date_col) == expected
+    assert not valid[4]
+
+
+def test_enhanced_msci_series_matches_scalar():
+    """批量改进MSCI与单值计算一致（包括80上限）"""
+    rng = np.random.default_rng(6)
+    original = np.round(rng.uniform(0, 100, 500), 2)
+    index_rating = np.round(rng.uniform(12.5, 100, 500), 2)
+
+    series = calculate_enhanced_msci_series(original, index_rating)
+
+    assert [round(float(v), 2) for v in series] == [
+        calculate_enhanced_msci(o, r) for o, r in zip(original, index_rating)]
+    assert series.max() == pytest.approx(80.0)
+
+
+def test_enhanced_history_matches_per_date(rating_frame):
+    """改进MSCI历史与原逐日实现一致（指数评级缺失的日期沿用上一次有效评级）"""
+    data = rating_frame(n_index=10, seed=7)
+    date_columns = _date_columns(data)
+    interpolated = _interpolate_ratings(data)
+    # 全部指数行在前3个日期（此前无有效评级）和第13个日期（沿用上一日）没有评级
+    interpolated.loc[interpolated.index[:10], date_columns[:3]] = '-'
+    interpolated.loc[interpolated.index[:10], date_columns[12]] = '-'
+
+    history = build_enhanced_msci_history(interpolated, date_columns)
+
+    assert len(history) == len(date_columns)
+    assert history == _enhanced_history_reference(interpolated, date_columns)
+    assert history[12]['index_rating'] == history[11]['index_rating']
+    assert history[0]['index_rating'] == 50.0
+
+
+def test_enhanced_history_without_index_rows(rating_frame):
+    """没有指数行时指数评级为中性值50，与原实现一致"""
+    data = _interpolate_ratings(rating_frame(n_index=0, seed=8))
+    date_columns = _date_columns(data)
+
+    history = build_enhanced_msci_history(data, date_columns)
+
+    assert history == _enhanced_history_reference(data, date_columns)
+    assert {record['index_rating'] for record in history} == {50.0}
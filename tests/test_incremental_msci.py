@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+增量MSCI计算器测试 - 与完整计算（calculate_market_sentiment_composite_index）对比
+"""
+
+import numpy as np
+import pytest
+
+from algorithms.incremental_msci import IncrementalMSCICalculator
+from algorithms.msci_calculator import calculate_market_sentiment_composite_index
+
+
+def _assert_same_result(incremental, full):
+    """增量结果与完整计算结果一致（历史、当前值、趋势、状态）"""
+    assert full.get('enhanced') is True
+    assert [h['date'] for h in incremental['history']] == [h['date'] for h in full['history']]
+    assert [h['msci'] for h in incremental['history']] == [h['msci'] for h in full['history']]
+    assert [h['original_msci'] for h in incremental['history']] == [h['original_msci'] for h in full['history']]
+    assert [h['index_rating'] for h in incremental['history']] == [h['index_rating'] for h in full['history']]
+    assert incremental['current_msci'] == full['current_msci']
+    assert incremental['trend_5d'] == pytest.approx(full['trend_5d'])
+    assert incremental['volatility'] == pytest.approx(full['volatility'])
+    assert incremental['market_state'] == full['market_state']
+
+
+def test_rebuild_matches_full_calculation(rating_frame, tmp_path):
+    """首次计算（完整重建）与完整计算结果一致"""
+    data = rating_frame()
+    calculator = IncrementalMSCICalculator(state_path=str(tmp_path / 'msci_state.npz'))
+
+    result = calculator.update(data)
+
+    assert calculator.stats['rebuilds'] == 1
+    _assert_same_result(result, calculate_market_sentiment_composite_index(data, use_enhanced=True))
+
+
+def test_append_day_matches_full_calculation(rating_frame, tmp_path):
+    """新增交易日只增量计算一天，结果与完整计算一致"""
+    data = rating_frame()
+    date_columns = [col for col in data.columns if col.startswith('202')]
+    state_path = str(tmp_path / 'msci_state.npz')
+
+    IncrementalMSCICalculator(state_path=state_path).update(data.drop(columns=date_columns[-1]))
+
+    # 从磁盘恢复状态后追加最新日期
+    calculator = IncrementalMSCICalculator(state_path=state_path)
+    result = calculator.update(data)
+
+    assert calculator.stats['loaded_from_disk'] is True
+    assert calculator.stats['rebuilds'] == 0
+    assert calculator.stats['incremental_days'] == 1
+    _assert_same_result(result, calculate_market_sentiment_composite_index(data, use_enhanced=True))
+
+
+def test_apply_row_changes_matches_full_calculation(rating_frame):
+    """部分股票评级被改写时差量更新，结果与完整计算一致"""
+    old_data = rating_frame()
+    calculator = IncrementalMSCICalculator()
+    calculator.update(old_data)
+
+    new_data = old_data.copy()
+    date_columns = [col for col in new_data.columns if col.startswith('202')]
+    rows = new_data.index[[0, 3, 50, 120, 199]]  # 包含指数行
+    new_data.loc[rows, date_columns] = np.where(
+        new_data.loc[rows, date_columns] == '大多', '大空', '大多')
+
+    applied = calculator.apply_row_changes(old_data, new_data, old_data.loc[rows], new_data.loc[rows])
+
+    assert applied is True
+    assert calculator.stats['row_updates'] == len(rows)
+    assert calculator.stats['rebuilds'] == 1
+    _assert_same_result(calculator.get_result(), calculate_market_sentiment_composite_index(new_data, use_enhanced=True))
+
+
+def test_revised_history_triggers_rebuild(rating_frame, tmp_path):
+    """已处理的历史日期被改写时完整重建，而不是沿用旧状态"""
+    data = rating_frame()
+    date_columns = [col for col in data.columns if col.startswith('202')]
+    calculator = IncrementalMSCICalculator(state_path=str(tmp_path / 'msci_state.npz'))
+    calculator.update(data)
+
+    revised = data.copy()
+    revised[date_columns[10]] = '大空'
+    result = calculator.update(revised)
+
+    assert calculator.stats['rebuilds'] == 2
+    assert calculator.stats['incremental_days'] == 0
+    _assert_same_result(result, calculate_market_sentiment_composite_index(revised, use_enhanced=True))
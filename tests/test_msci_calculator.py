@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+MSCI计算器测试 - 向量化历史计算与逐日计算（_calculate_daily_msci）对比
+"""
+
+import numpy as np
+
+from algorithms.msci_calculator import (
+    _calculate_daily_msci, _calculate_msci_history, _interpolate_ratings
+)
+
+
+def _daily_history(data, date_columns):
+    """逐日计算的MSCI历史（向量化之前的实现）"""
+    history = []
+    for date_col in date_columns:
+        daily_msci = _calculate_daily_msci(data, date_col)
+        if daily_msci:
+            history.append(daily_msci)
+    return history
+
+
+def test_history_matches_daily_calculation(rating_frame):
+    """插值后数据：向量化历史与逐日计算的每条记录完全一致"""
+    data = _interpolate_ratings(rating_frame())
+    date_columns = sorted(col for col in data.columns if col.startswith('202'))
+
+    history = _calculate_msci_history(data, date_columns)
+
+    assert len(history) == len(date_columns)
+    assert history == _daily_history(data, date_columns)
+
+
+def test_history_matches_daily_calculation_with_missing_values(rating_frame):
+    """未插值数据（含'-'、空值和未知评级）与逐日计算一致"""
+    data = rating_frame(seed=3)
+    date_columns = sorted(col for col in data.columns if col.startswith('202'))
+    data.loc[data.index[:15], date_columns[2]] = np.nan
+    data.loc[data.index[15:20], date_columns[3]] = '未知'
+
+    history = _calculate_msci_history(data, date_columns)
+
+    assert history == _daily_history(data, date_columns)
+
+
+def test_history_skips_dates_with_few_ratings(rating_frame):
+    """有效评级不足30只的日期与逐日计算一样被跳过"""
+    data = rating_frame(n_stocks=60, seed=4)
+    date_columns = sorted(col for col in data.columns if col.startswith('202'))
+    data[date_columns[5]] = '-'
+    data.loc[data.index[:40], date_columns[6]] = '-'
+
+    history = _calculate_msci_history(data, date_columns)
+
+    assert [record['date'] for record in history] == [d for d in date_columns if d not in date_columns[5:7]]
+    assert history == _daily_history(data, date_columns)
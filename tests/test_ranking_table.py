@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+个股排名表测试 - top_n_indices 与稳定排序（list.sort(reverse=True)）的结果对比
+"""
+
+import numpy as np
+
+from algorithms.ranking_table import top_n_indices
+
+
+def _stable_top_n(scores, n):
+    """按分数降序的稳定排序（同分保持原顺序），NaN排在最后"""
+    keyed = [(-np.inf if np.isnan(s) else s, i) for i, s in enumerate(scores)]
+    keyed.sort(key=lambda item: item[0], reverse=True)
+    return [i for _, i in keyed[:n]]
+
+
+def test_ties_keep_position_order():
+    """同分按位置升序，第n名的同分者只取靠前的"""
+    scores = np.array([5.0, 7.0, 5.0, 7.0, 5.0, 1.0, 5.0])
+
+    assert top_n_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_n_indices(scores, 4).tolist() == [1, 3, 0, 2]
+    assert top_n_indices(scores, 7).tolist() == [1, 3, 0, 2, 4, 6, 5]
+
+
+def test_nan_scores_rank_last():
+    """NaN分数排在所有有效分数之后（之间仍按位置升序）"""
+    scores = np.array([np.nan, 2.0, np.nan, -3.0, 2.0])
+
+    assert top_n_indices(scores, 5).tolist() == [1, 4, 3, 0, 2]
+    assert top_n_indices(scores, 3).tolist() == [1, 4, 3]
+
+
+def test_matches_stable_sort_on_many_ties():
+    """大量同分（含NaN）时与稳定排序逐个一致"""
+    rng = np.random.default_rng(9)
+    scores = rng.integers(0, 20, 2000).astype(float)
+    scores[rng.random(2000) < 0.05] = np.nan
+
+    for n in (1, 10, 97, 500, 2000, 3000):
+        assert top_n_indices(scores, n).tolist() == _stable_top_n(scores, n)
+
+
+def test_empty_and_non_positive_n():
+    """n<=0或空数组时返回空结果"""
+    assert top_n_indices(np.array([1.0, 2.0]), 0).tolist() == []
+    assert top_n_indices(np.array([]), 5).tolist() == []
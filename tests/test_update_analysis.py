@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+增量更新分析测试 - update_analysis 与新引擎完整计算的结果对比
+"""
+
+import numpy as np
+import pandas as pd
+
+from algorithms.realtime_engine import RealtimeAnalysisEngine
+from data.stock_dataset import StockDataSet
+
+# 每次运行都会不同的字段（计时字段；MSCI的volume_ratio带随机波动）
+_VOLATILE_KEYS = {'calculation_time', 'analysis_time', 'timestamp', 'calculation_timestamp',
+                  'analysis_timestamp', 'processing_time', 'volume_ratio'}
+
+
+def _strip_volatile(value):
+    """去掉计时字段，NaN统一为字符串以便直接比较"""
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in _VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_strip_volatile(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return 'nan'
+    return value
+
+
+def _engine_with_results(data: pd.DataFrame) -> RealtimeAnalysisEngine:
+    """完成一次完整计算的全新引擎（顺序模式，不读写结果快照）"""
+    engine = RealtimeAnalysisEngine(StockDataSet(data), enable_multithreading=False)
+    engine.config['result_snapshot'] = False
+    engine.calculate_all_metrics(force_refresh=True, enable_emergency_timeout=False)
+    return engine
+
+
+def _rewrite_ratings(data: pd.DataFrame, rows, seed: int = 1) -> pd.DataFrame:
+    """改写指定行在首日、中间日期和最新日期的评级"""
+    data = data.copy()
+    date_columns = [col for col in data.columns if col.startswith('202')]
+    rng = np.random.default_rng(seed)
+    for row in rows:
+        for date_col in (date_columns[0], date_columns[len(date_columns) // 2], date_columns[-1]):
+            data.at[row, date_col] = rng.choice(['大多', '小空', '中空', '微多'])
+    return data
+
+
+def _assert_same_results(incremental, full):
+    """个股、行业、市场三部分结果一致"""
+    assert list(incremental.stocks) == list(full.stocks)
+    assert _strip_volatile(incremental.stocks) == _strip_volatile(full.stocks)
+    assert _strip_volatile(incremental.industries) == _strip_volatile(full.industries)
+    assert _strip_volatile(incremental.market) == _strip_volatile(full.market)
+
+
+def test_update_analysis_matches_full_recompute(rating_frame):
+    """部分股票评级被改写后，增量更新（含MSCI差量更新）与完整重算一致"""
+    old_data = rating_frame()
+    engine = _engine_with_results(old_data)
+    new_data = _rewrite_ratings(old_data, (0, 20, 75, 150))  # 第0行是指数
+
+    status = engine.update_analysis(new_data)
+
+    assert status['status'] == 'success'
+    assert status['mode'] == 'incremental'
+    assert status['updated_stocks'] == 4
+    assert engine._incremental_msci.stats['row_updates'] == 4
+    _assert_same_results(engine.results_cache, _engine_with_results(new_data).results_cache)
+
+
+def test_update_analysis_with_added_and_removed_stocks(rating_frame):
+    """股票被删除、新增时，增量更新与完整重算一致"""
+    old_data = rating_frame()
+    engine = _engine_with_results(old_data)
+    new_data = _rewrite_ratings(old_data, (20, 75))
+    added = old_data.iloc[[30]].assign(股票代码='NEW001', 股票名称='新股')
+    new_data = pd.concat([new_data.drop(index=5), added], ignore_index=True)
+
+    status = engine.update_analysis(new_data)
+
+    assert status['mode'] == 'incremental'
+    assert status['updated_stocks'] == 3
+    assert status['removed_stocks'] == 1
+    assert '000005' not in engine.results_cache.stocks and 'NEW001' in engine.results_cache.stocks
+    _assert_same_results(engine.results_cache, _engine_with_results(new_data).results_cache)
+
+
+def test_update_analysis_with_new_date_recomputes(rating_frame):
+    """新增交易日（列结构变化）时完整重算"""
+    data = rating_frame()
+    date_columns = [col for col in data.columns if col.startswith('202')]
+    engine = _engine_with_results(data.drop(columns=date_columns[-1]))
+
+    status = engine.update_analysis(data)
+
+    assert status['mode'] == 'full'
+    _assert_same_results(engine.results_cache, _engine_with_results(data).results_cache)
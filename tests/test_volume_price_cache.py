@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+量价缓存测试 - 较长窗口切片复用与LRU淘汰（不访问数据源）
+"""
+
+import pytest
+
+from cache.volume_price_cache import VolumePriceCacheManager
+
+
+def _formatted_data(stock_code: str, market: str, days: int) -> dict:
+    """与 _format_volume_price_data 相同结构的量价数据（日期正序）"""
+    rows = [{'date': f'2025{i // 28 + 1:02d}{i % 28 + 1:02d}', 'close_price': 10.0 + i, 'volume': 1000 + i}
+            for i in range(days)]
+    return {'market': market, 'stock_code': stock_code, 'stock_name': stock_code,
+            'total_days': days, 'requested_days': days, 'data': rows, 'data_source': 'test'}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """不持久化、不联网的缓存管理器，数据获取被替换为记录调用的假数据源"""
+    manager = VolumePriceCacheManager(max_entries=3, persist=False, use_network=False)
+    manager.fetches = []
+
+    def fetch(stock_code, market, days):
+        manager.fetches.append((stock_code, days))
+        return _formatted_data(stock_code, market, days)
+
+    monkeypatch.setattr(manager, '_fetch_volume_price_data', fetch)
+    return manager
+
+
+def test_shorter_window_is_sliced_from_longer(manager):
+    """已缓存较长窗口时，较短的请求直接切片最近的天数，不再获取"""
+    full = manager.get_volume_price_data('00700', 'hk', 30)
+    short = manager.get_volume_price_data('00700', 'hk', 10)
+
+    assert manager.fetches == [('00700', 30)]
+    assert short['data'] == full['data'][-10:]
+    assert short['total_days'] == 10
+    assert short['requested_days'] == 10
+    # 切片不改动缓存中的完整窗口
+    assert manager.get_volume_price_data('00700', 'hk', 30) == full
+    assert len(full['data']) == 30
+    assert manager.fetches == [('00700', 30)]
+
+
+def test_longer_request_refetches_and_keeps_longest(manager):
+    """请求超过已缓存窗口时重新获取；之后存入的较短窗口不覆盖较长窗口"""
+    manager.get_volume_price_data('00700', 'hk', 10)
+    manager.get_volume_price_data('00700', 'hk', 40)
+    manager._store(('hk', '00700'), 20, _formatted_data('00700', 'hk', 20))
+
+    assert manager.fetches == [('00700', 10), ('00700', 40)]
+    assert manager._cache[('hk', '00700')][0] == 40
+    assert manager.get_volume_price_data('00700', 'hk', 38)['total_days'] == 38
+    assert len(manager.fetches) == 2
+
+
+def test_lru_eviction_keeps_recently_used(manager):
+    """超出max_entries时淘汰最久未使用的股票，命中会刷新使用顺序"""
+    for code in ('00001', '00002', '00003'):
+        manager.get_volume_price_data(code, 'hk', 20)
+    manager.get_volume_price_data('00001', 'hk', 5)  # 命中，移到最近使用
+    manager.get_volume_price_data('00004', 'hk', 20)
+
+    assert list(manager._cache) == [('hk', '00003'), ('hk', '00001'), ('hk', '00004')]
+    assert manager._cache_stats['evictions'] == 1
+
+    manager.get_volume_price_data('00002', 'hk', 20)
+    assert manager.fetches[-1] == ('00002', 20)
+    assert ('hk', '00003') not in manager._cache
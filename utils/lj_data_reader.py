@@ -16,6 +16,7 @@
 
 import os
 import sys
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
@@ -109,6 +110,7 @@ class LJDataReader:
         """
         self.verbose = verbose
         self.readers = {}  # 缓存不同市场的读取器
+        self._reader_lock = threading.RLock()  # 多线程首次获取时只创建一个读取器
         self.use_ljs_for_markets = set()  # 需要使用ljs.py的市场
         self.ljs_readers = {}  # ljs.py读取器缓存
         
@@ -222,6 +224,11 @@ class LJDataReader:
     
     def _get_reader(self, market: str):
         """获取指定市场的数据读取器"""
+        with self._reader_lock:
+            return self._get_reader_unlocked(market)
+    
+    def _get_reader_unlocked(self, market: str):
+        """获取指定市场的数据读取器（调用方持有self._reader_lock）"""
         if market not in self.data_files and market not in self.use_ljs_for_markets:
             self.log(f"不支持的市场类型: {market}", "ERROR")
             return None
@@ -344,45 +351,112 @@ class LJDataReader:
                 if days and days > 0:
                     df = df.tail(days)
                 
-                # 获取股票信息
-                stock_info_df = reader.search_stocks(clean_code, market.upper())
-                stock_name = ""
-                if not stock_info_df.empty:
-                    stock_name = stock_info_df.iloc[0]['name']
-                
-                # 转换为ljs.py兼容的格式
-                trade_data = {}
-                for _, row in df.iterrows():
-                    date_str = row['date']
-                    trade_data[date_str] = {
-                        '开盘价': row['open'] if pd.notna(row['open']) else row['close'],
-                        '最高价': row['high'] if pd.notna(row['high']) else row['close'],
-                        '最低价': row['low'] if pd.notna(row['low']) else row['close'],
-                        '收盘价': row['close'],
-                        '成交量': int(row['volume']) if pd.notna(row['volume']) else 0,
-                        '成交额': row['amount'] if pd.notna(row['amount']) else 0
-                    }
-                
-                results[market] = {
-                    "市场": market.upper(),
-                    "股票代码": stock_code,
-                    "股票名称": stock_name,
-                    "数据": {
-                        "交易数据": trade_data,
-                        "基本信息": {
-                            "股票名称": stock_name,
-                            "市场": market.upper()
-                        }
-                    }
-                }
+                results[market] = self._to_ljs_stock_data(reader, stock_code, clean_code, market, df)
                 
-                self.log(f"成功获取股票 {stock_code} 的数据，共 {len(trade_data)} 天")
+                self.log(f"成功获取股票 {stock_code} 的数据，共 {len(df)} 天")
             
         except Exception as e:
             self.log(f"搜索股票 {stock_code} 失败: {e}", "ERROR")
             
         return results
     
+    def _get_stock_name(self, reader, clean_code: str, market: str, names: Dict[str, str] = None) -> str:
+        """股票名称：优先取代码完全一致的记录，否则取第一条模糊匹配"""
+        if names is not None and clean_code in names:
+            return names[clean_code]
+        stock_info_df = reader.search_stocks(clean_code, market.upper())
+        if stock_info_df.empty:
+            return ""
+        exact = stock_info_df[stock_info_df['symbol'] == clean_code]
+        return (exact if not exact.empty else stock_info_df).iloc[0]['name']
+    
+    def _to_ljs_stock_data(self, reader, stock_code: str, clean_code: str, market: str,
+                           df: pd.DataFrame, names: Dict[str, str] = None) -> Dict[str, Any]:
+        """把lj_read的量价DataFrame转换为ljs.py兼容的单市场数据格式"""
+        # 获取股票信息
+        stock_name = self._get_stock_name(reader, clean_code, market, names)
+        
+        # 转换为ljs.py兼容的格式
+        trade_data = {}
+        for date_str, open_price, high, low, close, volume, amount in zip(
+                df['date'], df['open'], df['high'], df['low'], df['close'], df['volume'], df['amount']):
+            trade_data[date_str] = {
+                '开盘价': open_price if pd.notna(open_price) else close,
+                '最高价': high if pd.notna(high) else close,
+                '最低价': low if pd.notna(low) else close,
+                '收盘价': close,
+                '成交量': int(volume) if pd.notna(volume) else 0,
+                '成交额': amount if pd.notna(amount) else 0
+            }
+        
+        return {
+            "市场": market.upper(),
+            "股票代码": stock_code,
+            "股票名称": stock_name,
+            "数据": {
+                "交易数据": trade_data,
+                "基本信息": {
+                    "股票名称": stock_name,
+                    "市场": market.upper()
+                }
+            }
+        }
+    
+    def search_stocks_by_codes(self, stock_codes: List[str], market: str, days: int = None) -> Dict[str, Dict[str, Any]]:
+        """
+        批量根据股票代码获取数据（lj_read.py数据源一次查询完成）
+        
+        每只股票的数据与 search_stock_by_code(code, market, days)[market] 相同。
+        
+        Args:
+            stock_codes: 股票代码列表
+            market: 市场类型 ('cn', 'hk', 'us')
+            days: 获取天数
+            
+        Returns:
+            {股票代码: ljs.py兼容的单市场数据}，没有数据的股票不在结果中
+        """
+        market = market.lower()
+        reader = self._get_reader(market)
+        if not reader or not stock_codes:
+            return {}
+        
+        # ljs.py读取器（.dat文件/备用实现）数据已在内存中，逐只获取
+        if market in self.use_ljs_for_markets or self.use_fallback:
+            results = {}
+            for stock_code in stock_codes:
+                found = self.search_stock_by_code(stock_code, market, days)
+                if found:
+                    results[stock_code] = list(found.values())[0]
+            return results
+        
+        clean_codes = {stock_code: self._clean_stock_code(stock_code) for stock_code in stock_codes}
+        try:
+            frames = reader.get_batch_stock_data(list(set(clean_codes.values())), market.upper(),
+                                                 days if days and days > 0 else None)
+        except Exception as e:
+            self.log(f"批量获取 {len(stock_codes)} 只股票失败: {e}", "ERROR")
+            return {}
+        
+        # 名称表只构建一次（与逐只获取相同：同代码取第一条记录）
+        names = {}
+        stock_list = reader.get_stock_list(market.upper())
+        for symbol, name in zip(stock_list['symbol'], stock_list['name']):
+            names.setdefault(symbol, name)
+        
+        results = {}
+        for stock_code, clean_code in clean_codes.items():
+            df = frames.get(clean_code)
+            if df is None or df.empty:
+                continue
+            try:
+                results[stock_code] = self._to_ljs_stock_data(reader, stock_code, clean_code, market, df, names)
+            except Exception as e:
+                self.log(f"转换股票 {stock_code} 数据失败: {e}", "ERROR")
+        
+        self.log(f"批量获取完成: {len(results)}/{len(stock_codes)} 只股票({market.upper()})")
+        return results
+    
     def _clean_stock_code(self, stock_code: str) -> str:
         """清理股票代码格式"""
         if not stock_code: